@@ -8,4 +8,7 @@ from contracts.position_mgr import PositionInfo
 namespace IUserPositionMgr {
     func get_pool_address(token0: felt, token1: felt, fee: felt) -> (pool_address: felt) {
     }
+
+    func compute_pool_address(token0: felt, token1: felt, fee: felt) -> (pool_address: felt) {
+    }
 }
\ No newline at end of file
@@ -0,0 +1,97 @@
+%lang starknet
+
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.hash import hash2
+from starkware.starknet.core.os.contract_address.contract_address import get_contract_address
+
+from contracts.math_utils import Utils
+
+const INITIALIZER_SELECTOR = 1295919550572838631247819983596733806859788957403169325509326258146877103642;
+
+// the pool addresses are derived the same way the user position manager deploys the pools:
+// salt = hash2(token0, token1) of the sorted tokens, deployer = the user position manager,
+// class hash = the swap pool proxy and constructor calldata = the proxy initializer call of the swap pool
+namespace PoolAddress {
+    // @notice Returns the tick spacing of a fee level
+    func get_tick_spacing{range_check_ptr}(fee: felt) -> felt {
+        if (fee == 500) {
+            return 10;
+        }
+        if (fee == 3000) {
+            return 60;
+        }
+        if (fee == 10000) {
+            return 200;
+        }
+        if (fee == 50000) {
+            return 1000;
+        }
+
+        with_attr error_message("invalid fee level") {
+            assert 0 = 1;
+        }
+        return 0;
+    }
+
+    // @notice Returns the salt of the pool of two tokens
+    func get_salt{pedersen_ptr: HashBuiltin*, range_check_ptr}(token0: felt, token1: felt) -> felt {
+        let token_a = Utils.min(token0, token1);
+        let token_b = Utils.max(token0, token1);
+        let (salt) = hash2{hash_ptr=pedersen_ptr}(token_a, token_b);
+        return salt;
+    }
+
+    // @notice Returns the constructor calldata of the swap pool proxy
+    // @param init_swap_pool_hash The class hash of the swap pool when the user position manager was initialized
+    func get_constructor_calldata{range_check_ptr}(
+        init_swap_pool_hash: felt,
+        token0: felt,
+        token1: felt,
+        fee: felt,
+        user_position_mgr: felt
+    ) -> (calldata_len: felt, calldata: felt*) {
+        alloc_locals;
+
+        let tick_spacing = get_tick_spacing(fee);
+        let token_a = Utils.min(token0, token1);
+        let token_b = Utils.max(token0, token1);
+
+        let (local calldata: felt*) = alloc();
+        // always use init_swap_pool_hash for computing pool address
+        // INITIALIZER_SELECTOR should not be passed from calldata for security
+        assert calldata[0] = init_swap_pool_hash;
+        assert calldata[1] = INITIALIZER_SELECTOR;
+        assert calldata[2] = 5; // calldata_len
+        assert calldata[3] = tick_spacing;
+        assert calldata[4] = fee;
+        assert calldata[5] = token_a;
+        assert calldata[6] = token_b;
+        assert calldata[7] = user_position_mgr;
+        return (8, calldata);
+    }
+
+    // @notice Computes the address of a pool without reading the pool registry
+    // @dev The pool may not be deployed yet
+    func compute{pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        user_position_mgr: felt,
+        swap_pool_proxy_hash: felt,
+        init_swap_pool_hash: felt,
+        token0: felt,
+        token1: felt,
+        fee: felt
+    ) -> felt {
+        alloc_locals;
+
+        let salt = get_salt(token0, token1);
+        let (calldata_len, calldata) = get_constructor_calldata(init_swap_pool_hash, token0, token1, fee, user_position_mgr);
+        let (pool_address) = get_contract_address{hash_ptr=pedersen_ptr}(
+            salt=salt,
+            class_hash=swap_pool_proxy_hash,
+            constructor_calldata_size=calldata_len,
+            constructor_calldata=calldata,
+            deployer_address=user_position_mgr,
+        );
+        return pool_address;
+    }
+}
@@ -0,0 +1,75 @@
+%lang starknet
+
+from starkware.cairo.common.cairo_builtins import HashBuiltin
+
+from contracts.interface.IUserPositionMgr import IUserPositionMgr
+from contracts.math_utils import Utils
+
+// pool addresses resolved through the user position manager, keyed by the sorted tokens and the fee
+@storage_var
+func PoolAddressCache_data(token0: felt, token1: felt, fee: felt) -> (address: felt) {
+}
+
+namespace PoolAddressCache {
+    // @notice Returns the cached address of a pool, 0 if it is not cached
+    func get{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        token0: felt,
+        token1: felt,
+        fee: felt
+    ) -> felt {
+        let token_a = Utils.min(token0, token1);
+        let token_b = Utils.max(token0, token1);
+        let (address) = PoolAddressCache_data.read(token_a, token_b, fee);
+        return address;
+    }
+
+    // @notice Resolves the address of a pool through the user position manager, on a cache miss
+    // @param populate Caches the resolved address, FALSE in views
+    func resolve{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        user_position_mgr: felt,
+        token0: felt,
+        token1: felt,
+        fee: felt,
+        populate: felt
+    ) -> felt {
+        alloc_locals;
+
+        let (pool_address) = IUserPositionMgr.get_pool_address(
+            contract_address=user_position_mgr,
+            token0=token0,
+            token1=token1,
+            fee=fee
+        );
+
+        // a pool address never changes once the pool is created, a missing pool is not cached
+        if (populate * pool_address != 0) {
+            let token_a = Utils.min(token0, token1);
+            let token_b = Utils.max(token0, token1);
+            PoolAddressCache_data.write(token_a, token_b, fee, pool_address);
+            return pool_address;
+        }
+        return pool_address;
+    }
+
+    // @notice Replaces the cached address of a pool with the one of the user position manager
+    func update{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        user_position_mgr: felt,
+        token0: felt,
+        token1: felt,
+        fee: felt
+    ) -> felt {
+        alloc_locals;
+
+        let (pool_address) = IUserPositionMgr.get_pool_address(
+            contract_address=user_position_mgr,
+            token0=token0,
+            token1=token1,
+            fee=fee
+        );
+
+        let token_a = Utils.min(token0, token1);
+        let token_b = Utils.max(token0, token1);
+        PoolAddressCache_data.write(token_a, token_b, fee, pool_address);
+        return pool_address;
+    }
+}
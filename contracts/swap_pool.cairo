@@ -21,7 +21,7 @@ from starkware.cairo.common.uint256 import (
     uint256_check
 )
 from starkware.cairo.common.bool import FALSE, TRUE
-from starkware.cairo.common.math import unsigned_div_rem, assert_in_range
+from starkware.cairo.common.math import unsigned_div_rem, assert_in_range, assert_le
 from starkware.cairo.common.math_cmp import is_le, is_nn
 
 from openzeppelin.token.erc20.IERC20 import IERC20
@@ -135,6 +135,15 @@ func _token0() -> (address: felt) {
 func _token1() -> (address: felt) {
 }
 
+// uint128 token balances the pool accounts for, callback payments are checked against them
+@storage_var
+func _reserve0() -> (reserve: felt) {
+}
+
+@storage_var
+func _reserve1() -> (reserve: felt) {
+}
+
 @event
 func Initializer(
     tick_spacing: felt, 
@@ -216,6 +225,10 @@ func TransferToken(token_contract: felt, to: felt, amount: Uint256) {
 func SetFeeProtocol(fee_protocol0: felt, fee_protocol1: felt) {
 }
 
+@event
+func Sync(reserve0: felt, reserve1: felt) {
+}
+
 @constructor
 func constructor{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
     return ();
@@ -352,6 +365,15 @@ func balance1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}()
     return (balance,);
 }
 
+@view
+func get_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+    reserve0: felt, reserve1: felt
+) {
+    let (reserve0) = _reserve0.read();
+    let (reserve1) = _reserve1.read();
+    return (reserve0, reserve1);
+}
+
 @view
 func get_position_token_fee{
     syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
@@ -410,18 +432,91 @@ func _transfer_token{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check
     return ();
 }
 
-func _transfer_token_cond{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    cond: felt, token_contract: felt, recipient: felt, value: Uint256
+func _transfer_token0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    recipient: felt, amount: Uint256
 ) {
     alloc_locals;
+    let (reserve0) = _reserve0.read();
+    // reverts on pools upgraded in place until `sync` sets their reserves
+    with_attr error_message("insufficient reserve0") {
+        assert amount.high = 0;
+        assert_le(amount.low, reserve0);
+    }
+    _reserve0.write(reserve0 - amount.low);
+    let (token0) = _token0.read();
+    _transfer_token(token0, recipient, amount);
+    return ();
+}
+
+func _transfer_token1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    recipient: felt, amount: Uint256
+) {
+    alloc_locals;
+    let (reserve1) = _reserve1.read();
+    with_attr error_message("insufficient reserve1") {
+        assert amount.high = 0;
+        assert_le(amount.low, reserve1);
+    }
+    _reserve1.write(reserve1 - amount.low);
+    let (token1) = _token1.read();
+    _transfer_token(token1, recipient, amount);
+    return ();
+}
+
+func _transfer_token0_cond{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    cond: felt, recipient: felt, amount: Uint256
+) {
+    if (cond == TRUE) {
+        _transfer_token0(recipient, amount);
+        return ();
+    }
+    return ();
+}
 
+func _transfer_token1_cond{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    cond: felt, recipient: felt, amount: Uint256
+) {
     if (cond == TRUE) {
-        _transfer_token(token_contract, recipient, value);
+        _transfer_token1(recipient, amount);
         return ();
     }
     return ();
 }
 
+// @notice Checks that a callback paid `amount` of token0 on top of the reserve and adds it to the reserve
+// @dev One balanceOf call, the balance before the callback is the reserve
+func _receive_token0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    amount: Uint256
+) -> (is_valid: felt) {
+    alloc_locals;
+    let (reserve0) = _reserve0.read();
+    let new_reserve0 = reserve0 + amount.low;
+    with_attr error_message("reserve0 overflow") {
+        assert amount.high = 0;
+        Utils.assert_is_uint128(new_reserve0);
+    }
+    let (balance: Uint256) = balance0();
+    let (is_valid) = uint256_le(Uint256(new_reserve0, 0), balance);
+    _reserve0.write(new_reserve0);
+    return (is_valid,);
+}
+
+func _receive_token1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    amount: Uint256
+) -> (is_valid: felt) {
+    alloc_locals;
+    let (reserve1) = _reserve1.read();
+    let new_reserve1 = reserve1 + amount.low;
+    with_attr error_message("reserve1 overflow") {
+        assert amount.high = 0;
+        Utils.assert_is_uint128(new_reserve1);
+    }
+    let (balance: Uint256) = balance1();
+    let (is_valid) = uint256_le(Uint256(new_reserve1, 0), balance);
+    _reserve1.write(new_reserve1);
+    return (is_valid,);
+}
+
 func _lock{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
     let (slot_unlocked) = _slot_unlocked.read();
     with_attr error_message("swap is locked") {
@@ -559,6 +654,8 @@ func _compute_swap_step{
     exact_input: felt,
     zero_for_one: felt,
     sqrt_price_limit_x96: Uint256,
+    tick_spacing: felt,
+    fee: felt,
 ) -> (state: SwapState) {
     alloc_locals;
 
@@ -569,11 +666,7 @@ func _compute_swap_step{
         return (state,);
     }
 
-    let (tick_spacing) = _tick_spacing.read();
-
-    let (tick_next, initialized) = TickBitmap.next_valid_tick_within_one_word(
-        state.tick, tick_spacing, zero_for_one
-    );
+    let (tick_next, initialized) = TickBitmap.next_valid_tick(state.tick, tick_spacing, zero_for_one);
 
     let sqrt_price_start_x96: Uint256 = state.sqrt_price_x96;
 
@@ -595,7 +688,6 @@ func _compute_swap_step{
         flag, sqrt_price_limit_x96, sqrt_price_next_x96
     );
 
-    let (fee) = _fee.read();
     let (
         state_sqrt_price_x96: Uint256, amount_in: Uint256, amount_out: Uint256, fee_amount: Uint256
     ) = SwapMath.compute_swap_step(
@@ -637,7 +729,9 @@ func _compute_swap_step{
         liquidity=state_liquidity,
     );
 
-    return _compute_swap_step(new_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96);
+    return _compute_swap_step(
+        new_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96, tick_spacing, fee
+    );
 }
 
 // @notice: get the swap fee rate according to swap direction
@@ -733,15 +827,11 @@ func _swap_transfer_token{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_
     if (zero_for_one == TRUE) {
         let (flag) = uint256_signed_nn(amount1);
         let (is_valid) = Utils.is_eq(flag, 0);
-        let (token1) = _token1.read();
         let (abs_amount1: Uint256) = uint256_neg(amount1);
-        _transfer_token_cond(is_valid, token1, recipient, abs_amount1);
-        let (balance_before) = balance0();
+        _transfer_token1_cond(is_valid, recipient, abs_amount1);
         ISwapPoolCallback.swap_callback(contract_address=caller, amount0=amount0, amount1=amount1, sender=sender, data_len=data_len, data=data);
-        let (balance_after: Uint256) = balance0();
-        let (tmp: Uint256) = SafeUint256.add(balance_before, amount0);
+        let (is_valid) = _receive_token0(amount0);
         with_attr error_message("transfer token0 failed") {
-            let (is_valid) = uint256_le(tmp, balance_after);
             assert is_valid = TRUE;
         }
         return ();
@@ -750,14 +840,10 @@ func _swap_transfer_token{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_
     let (flag) = uint256_signed_nn(amount0);
     let (is_valid) = Utils.is_eq(flag, 0);
     let (abs_amount0: Uint256) = uint256_neg(amount0);
-    let (token0) = _token0.read();
-    _transfer_token_cond(is_valid, token0, recipient, abs_amount0);
-    let (balance1_before) = balance1();
+    _transfer_token0_cond(is_valid, recipient, abs_amount0);
     ISwapPoolCallback.swap_callback(contract_address=caller, amount0=amount0, amount1=amount1, sender=sender, data_len=data_len, data=data);
-    let (balance_after: Uint256) = balance1();
-    let (tmp: Uint256) = SafeUint256.add(balance1_before, amount1);
+    let (is_valid) = _receive_token1(amount1);
     with_attr error_message("transfer token1 failed") {
-        let (is_valid) = uint256_le(tmp, balance_after);
         assert is_valid = TRUE;
     }
     return ();
@@ -816,8 +902,12 @@ func get_swap_results{
         liquidity=liquidity_start,
     );
 
+    // pool constants, read once instead of on every step
+    let (tick_spacing) = _tick_spacing.read();
+    let (fee) = _fee.read();
+
     let (state: SwapState) = _compute_swap_step(
-        init_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96
+        init_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96, tick_spacing, fee
     );
 
     let (amount0: Uint256, amount1: Uint256) = _swap_cal_res(
@@ -876,8 +966,12 @@ func swap{
         liquidity=liquidity_start,
     );
 
+    // pool constants, read once instead of on every step
+    let (tick_spacing) = _tick_spacing.read();
+    let (fee) = _fee.read();
+
     let (state: SwapState) = _compute_swap_step(
-        init_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96
+        init_state, fee_protocol, exact_input, zero_for_one, sqrt_price_limit_x96, tick_spacing, fee
     );
 
     _slot0.write(SlotState(
@@ -1097,27 +1191,9 @@ func _modify_position{
     return (position, Uint256(0, 0), Uint256(0, 0));
 }
 
-func _add_liquidity_callback_1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(flag: felt) -> (res: Uint256) {
+func _add_liquidity_callback_1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(flag: felt, amount0: Uint256) {
     if (flag == TRUE) {
-        let (balance: Uint256) = balance0();
-        return (balance,);
-    }
-    return (Uint256(0, 0),);
-}
-
-func _add_liquidity_callback_2{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(flag: felt) -> (res: Uint256) {
-    if (flag == TRUE) {
-        let (balance: Uint256) = balance1();
-        return (balance,);
-    }
-    return (Uint256(0, 0),);
-}
-
-func _add_liquidity_callback_3{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(flag: felt, balance0_before: Uint256, amount0: Uint256) {
-    if (flag == TRUE) {
-        let (balance0_after) = balance0();
-        let (tmp: Uint256) = SafeUint256.add(balance0_before, amount0);
-        let (is_valid) = uint256_le(tmp, balance0_after);
+        let (is_valid) = _receive_token0(amount0);
         with_attr error_message("token0 balance illegal") {
             assert is_valid = TRUE;
         }
@@ -1136,22 +1212,18 @@ func _add_liquidity_callback{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, ran
     let (flag1) = uint256_lt(Uint256(0, 0), amount0);
     let (flag2) = uint256_lt(Uint256(0, 0), amount1);
 
-    let (balance0_before: Uint256) = _add_liquidity_callback_1(flag1);
-    let (balance1_before: Uint256) = _add_liquidity_callback_2(flag2);
-
     let (caller) = get_caller_address();
     let (token0) = _token0.read();
     let (token1) = _token1.read();
     let (fee) = _fee.read();
     ISwapPoolCallback.add_liquidity_callback(contract_address=caller, token0=token0, token1=token1, fee=fee, amount0=amount0, amount1=amount1, data=data);
 
-    _add_liquidity_callback_3(flag1, balance0_before, amount0);
+    // the balances before the callback are the reserves
+    _add_liquidity_callback_1(flag1, amount0);
 
     if (flag2 == TRUE) {
-        let (balance1_after) = balance1();
-        let (tmp: Uint256) = SafeUint256.add(balance1_before, amount1);
+        let (is_valid) = _receive_token1(amount1);
         with_attr error_message("token1 balance illegal") {
-            let (is_valid) = uint256_le(tmp, balance1_after);
             assert is_valid = TRUE;
         }
         return ();
@@ -1333,11 +1405,8 @@ func _collect_1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}
         );
         PositionMgr.set(owner, tick_lower, tick_upper, new_position);
 
-        let (token0) = _token0.read();
-        _transfer_token_cond(flag1, token0, recipient, Uint256(amount0, 0));
-
-        let (token1) = _token1.read();
-        _transfer_token_cond(flag2, token1, recipient, Uint256(amount1, 0));
+        _transfer_token0_cond(flag1, recipient, Uint256(amount0, 0));
+        _transfer_token1_cond(flag2, recipient, Uint256(amount1, 0));
         return ();
     }
     return ();
@@ -1387,15 +1456,14 @@ func _collect_protocol_1{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_c
     let (is_valid) = Utils.is_gt(amount, 0);
     if (is_valid == TRUE) {
         // ensure that the slot is not cleared, for gas savings
-        let (token0) = _token0.read();
         if (protocol_fee_token == amount) {
             let new_amount = amount - 1;
             _protocol_fee_token0.write(protocol_fee_token - new_amount);
-            _transfer_token(token0, recipient, Uint256(new_amount, 0));
+            _transfer_token0(recipient, Uint256(new_amount, 0));
             return (new_amount,);
         }
         _protocol_fee_token0.write(protocol_fee_token - amount);
-        _transfer_token(token0, recipient, Uint256(amount, 0));
+        _transfer_token0(recipient, Uint256(amount, 0));
         return (amount,);
     }
 
@@ -1409,15 +1477,14 @@ func _collect_protocol_2{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_c
     let (is_valid) = Utils.is_gt(amount, 0);
     if (is_valid == TRUE) {
         // ensure that the slot is not cleared, for gas savings
-        let (token1) = _token1.read();
         if (protocol_fee_token == amount) {
             let new_amount = amount - 1;
             _protocol_fee_token1.write(protocol_fee_token - new_amount);
-            _transfer_token(token1, recipient, Uint256(new_amount, 0));
+            _transfer_token1(recipient, Uint256(new_amount, 0));
             return (new_amount,);
         }
         _protocol_fee_token1.write(protocol_fee_token - amount);
-        _transfer_token(token1, recipient, Uint256(amount, 0));
+        _transfer_token1(recipient, Uint256(amount, 0));
         return (amount,);
     }
 
@@ -1456,3 +1523,76 @@ func collect_protocol{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_chec
 
     return (new_amount0, new_amount1);
 }
+
+// @notice Sets the reserves to the token balances of the pool
+// @dev Absorbs donations, and sets the reserves of pools upgraded in place before reserves were tracked
+@external
+func sync{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    _lock();
+
+    let (token0_balance: Uint256) = balance0();
+    let (token1_balance: Uint256) = balance1();
+    with_attr error_message("balance overflow") {
+        assert token0_balance.high = 0;
+        assert token1_balance.high = 0;
+    }
+    _reserve0.write(token0_balance.low);
+    _reserve1.write(token1_balance.low);
+
+    _unlock();
+
+    Sync.emit(token0_balance.low, token1_balance.low);
+    return ();
+}
+
+func _skim_cond{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    token_contract: felt, recipient: felt, balance: Uint256, reserve: felt
+) -> (amount: Uint256) {
+    alloc_locals;
+    let (is_valid) = uint256_lt(Uint256(reserve, 0), balance);
+    if (is_valid == TRUE) {
+        let (amount: Uint256) = uint256_sub(balance, Uint256(reserve, 0));
+        _transfer_token(token_contract, recipient, amount);
+        return (amount,);
+    }
+    return (Uint256(0, 0),);
+}
+
+// @notice Transfers the token balances above the reserves, e.g. donations, to `recipient`
+// @dev Owner only, the whole balance of a pool upgraded in place is above its zero reserves until `sync`
+@external
+func skim{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(recipient: felt) -> (
+    amount0: Uint256, amount1: Uint256
+) {
+    alloc_locals;
+
+    Ownable.assert_only_owner();
+
+    _lock();
+
+    let (token0) = _token0.read();
+    let (token1) = _token1.read();
+    let (token0_balance: Uint256) = balance0();
+    let (token1_balance: Uint256) = balance1();
+    let (reserve0) = _reserve0.read();
+    let (reserve1) = _reserve1.read();
+    let (amount0: Uint256) = _skim_cond(token0, recipient, token0_balance, reserve0);
+    let (amount1: Uint256) = _skim_cond(token1, recipient, token1_balance, reserve1);
+
+    _unlock();
+
+    return (amount0, amount1);
+}
+
+// @notice Marks a tick bitmap word in the summary bitmap swaps search for initialized ticks
+// @dev Only needed for words written before the summary existed, i.e. in pools upgraded in place
+// @param word_pos The position of the word, compressed tick // 256
+@external
+func sync_tick_bitmap_summary{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
+}(word_pos: felt) {
+    TickBitmap.sync_summary(word_pos);
+    return ();
+}
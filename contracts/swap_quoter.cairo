@@ -4,13 +4,13 @@ from starkware.cairo.common.alloc import alloc
 from starkware.cairo.common.cairo_builtins import HashBuiltin, BitwiseBuiltin
 from starkware.cairo.common.uint256 import Uint256, uint256_le, uint256_add, uint256_lt, uint256_sub, uint256_neg, uint256_eq, uint256_signed_lt, uint256_check
 from starkware.cairo.common.math_cmp import is_le_felt
-from starkware.cairo.common.math import unsigned_div_rem
+from starkware.cairo.common.math import unsigned_div_rem, assert_not_zero
 from starkware.cairo.common.bool import TRUE, FALSE
 
 from contracts.interface.ISwapPool import ISwapPool
 from contracts.math_utils import Utils
-from contracts.interface.IUserPositionMgr import IUserPositionMgr
 from contracts.swap_utils import SwapUtils
+from contracts.pool_address_cache import PoolAddressCache
 
 @storage_var
 func _user_position_mgr_address() -> (res: felt) {
@@ -28,17 +28,34 @@ func _get_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_che
     token1: felt,
     fee: felt
 ) -> felt {
-    let (address) = _user_position_mgr_address.read();
-    let (pool_address) = IUserPositionMgr.get_pool_address(
-        contract_address=address,
-        token0=token0,
-        token1=token1,
-        fee=fee
-    );
+    alloc_locals;
+
+    let pool_address = PoolAddressCache.get(token0, token1, fee);
+    if (pool_address != 0) {
+        return pool_address;
+    }
 
+    let (address) = _user_position_mgr_address.read();
+    let pool_address = PoolAddressCache.resolve(address, token0, token1, fee, FALSE);
     return pool_address;
 }
 
+// @notice Re-reads the cached address of a pool from the user position manager
+// @param token0 The contract address of a token of the pool
+// @param token1 The contract address of the other token of the pool
+// @param fee The fee tier of the pool
+// @return pool_address The address of the pool, 0 if it doesn't exist
+@external
+func update_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    token0: felt,
+    token1: felt,
+    fee: felt
+) -> (pool_address: felt) {
+    let (address) = _user_position_mgr_address.read();
+    let pool_address = PoolAddressCache.update(address, token0, token1, fee);
+    return (pool_address,);
+}
+
 func _get_exact_output_internal{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     path_len: felt,
     path: felt*,
@@ -52,6 +69,18 @@ func _get_exact_output_internal{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*,
 
     let pool_address = _get_pool_address(token_in, token_out, fee);
 
+    let (amount_in: Uint256) = _quote_exact_output(pool_address, token_in, token_out, amount_out);
+    return (amount_in,);
+}
+
+func _quote_exact_output{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    pool_address: felt,
+    token_in: felt,
+    token_out: felt,
+    amount_out: Uint256
+) -> (amount_in: Uint256) {
+    alloc_locals;
+
     // unsined int
     let zero_for_one = is_le_felt(token_in, token_out);
      
@@ -134,6 +163,18 @@ func _get_exact_input_internal{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, r
     let token_out = path[2];
     let pool_address = _get_pool_address(token_in, token_out, fee);
 
+    let (amount_out: Uint256) = _quote_exact_input(pool_address, token_in, token_out, amount_in);
+    return (amount_out,);
+}
+
+func _quote_exact_input{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    pool_address: felt,
+    token_in: felt,
+    token_out: felt,
+    amount_in: Uint256
+) -> (amount_out: Uint256) {
+    alloc_locals;
+
     let zero_for_one = is_le_felt(token_in, token_out);
 
     let (limit_price: Uint256) = SwapUtils.get_limit_price(Uint256(0, 0), zero_for_one);
@@ -203,4 +244,228 @@ func get_exact_input_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, rang
     let (amount_out: Uint256) = _get_exact_input_router(path_len, path, amount_in);
 
     return (amount_out,);
-}
\ No newline at end of file
+}
+
+// batch
+
+// @notice Resolves the pool of every hop of a path, pools[i] is the pool between path[2 * i] and path[2 * i + 2]
+func _get_pool_addresses{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_len: felt,
+    path: felt*,
+    pools: felt*
+) {
+    if (path_len == 1) {
+        return ();
+    }
+
+    let pool_address = _get_pool_address(path[0], path[2], path[1]);
+    assert pools[0] = pool_address;
+
+    return _get_pool_addresses(path_len - 2, path + 2, pools + 1);
+}
+
+func _get_exact_input_pools{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_len: felt,
+    path: felt*,
+    pools: felt*,
+    amount_in: Uint256
+) -> (amount_out: Uint256) {
+    alloc_locals;
+
+    let (amount_out: Uint256) = _quote_exact_input(pools[0], path[0], path[2], amount_in);
+
+    let (has_multiple_pools) = Utils.is_gt(path_len, 3);
+    if (has_multiple_pools == TRUE) {
+        let (new_amount_out: Uint256) = _get_exact_input_pools(path_len - 2, path + 2, pools + 1, amount_out);
+        return (new_amount_out,);
+    }
+
+    return (amount_out,);
+}
+
+func _get_exact_output_pools{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_len: felt,
+    path: felt*,
+    pools: felt*,
+    amount_out: Uint256
+) -> (amount_in: Uint256) {
+    alloc_locals;
+
+    let (amount_in: Uint256) = _quote_exact_output(pools[0], path[2], path[0], amount_out);
+
+    let (has_multiple_pools) = Utils.is_gt(path_len, 3);
+    if (has_multiple_pools == TRUE) {
+        let (new_amount_in: Uint256) = _get_exact_output_pools(path_len - 2, path + 2, pools + 1, amount_in);
+        return (new_amount_in,);
+    }
+
+    return (amount_in,);
+}
+
+func _check_path{range_check_ptr}(path_len: felt) {
+    let (pool_num, rem) = unsigned_div_rem(path_len, 2);
+    with_attr error_message("path_len illeagl") {
+        assert rem = 1;
+        assert_not_zero(pool_num);
+    }
+    return ();
+}
+
+func _get_exact_input_amounts{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_len: felt,
+    path: felt*,
+    pools: felt*,
+    amounts_len: felt,
+    amounts_in: Uint256*,
+    amounts_out: Uint256*
+) {
+    if (amounts_len == 0) {
+        return ();
+    }
+
+    uint256_check(amounts_in[0]);
+    let (amount_out: Uint256) = _get_exact_input_pools(path_len, path, pools, amounts_in[0]);
+    assert amounts_out[0] = amount_out;
+
+    return _get_exact_input_amounts(path_len, path, pools, amounts_len - 1, amounts_in + Uint256.SIZE, amounts_out + Uint256.SIZE);
+}
+
+func _get_exact_output_amounts{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_len: felt,
+    path: felt*,
+    pools: felt*,
+    amounts_len: felt,
+    amounts_out: Uint256*,
+    amounts_in: Uint256*
+) {
+    if (amounts_len == 0) {
+        return ();
+    }
+
+    let (amount_in: Uint256) = _get_exact_output_pools(path_len, path, pools, amounts_out[0]);
+    assert amounts_in[0] = amount_in;
+
+    return _get_exact_output_amounts(path_len, path, pools, amounts_len - 1, amounts_out + Uint256.SIZE, amounts_in + Uint256.SIZE);
+}
+
+// @notice Quotes every (path, amount) pair, the pools of a path are resolved once for all its amounts
+func _get_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    exact_input: felt,
+    path_lens_len: felt,
+    path_lens: felt*,
+    paths: felt*,
+    amount_counts: felt*,
+    amounts: Uint256*,
+    results: Uint256*
+) {
+    alloc_locals;
+
+    if (path_lens_len == 0) {
+        return ();
+    }
+
+    let path_len = path_lens[0];
+    let amounts_len = amount_counts[0];
+    _check_path(path_len);
+
+    let (local pools: felt*) = alloc();
+    _get_pool_addresses(path_len, paths, pools);
+
+    if (exact_input == TRUE) {
+        _get_exact_input_amounts(path_len, paths, pools, amounts_len, amounts, results);
+    } else {
+        _get_exact_output_amounts(path_len, paths, pools, amounts_len, amounts, results);
+    }
+
+    return _get_batch(
+        exact_input,
+        path_lens_len - 1,
+        path_lens + 1,
+        paths + path_len,
+        amount_counts + 1,
+        amounts + amounts_len * Uint256.SIZE,
+        results + amounts_len * Uint256.SIZE
+    );
+}
+
+func _sum(arr_len: felt, arr: felt*) -> felt {
+    if (arr_len == 0) {
+        return 0;
+    }
+    let rest = _sum(arr_len - 1, arr + 1);
+    return arr[0] + rest;
+}
+
+func _check_batch(
+    path_lens_len: felt,
+    path_lens: felt*,
+    paths_len: felt,
+    amount_counts_len: felt,
+    amount_counts: felt*,
+    amounts_len: felt
+) {
+    alloc_locals;
+
+    let paths_total = _sum(path_lens_len, path_lens);
+    let amounts_total = _sum(amount_counts_len, amount_counts);
+    with_attr error_message("batch lengths mismatch") {
+        assert path_lens_len = amount_counts_len;
+        assert paths_total = paths_len;
+        assert amounts_total = amounts_len;
+    }
+    return ();
+}
+
+// @notice Quotes many amounts along many paths in one call, as get_exact_input_router
+// @param path_lens The length of every path
+// @param paths The paths, concatenated
+// @param amount_counts The number of amounts quoted along every path
+// @param amounts_in The amounts of the sent token, grouped by path in the order of the paths
+// @return amounts_out The amounts of the received token, in the order of amounts_in
+@view
+func get_exact_input_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_lens_len: felt,
+    path_lens: felt*,
+    paths_len: felt,
+    paths: felt*,
+    amount_counts_len: felt,
+    amount_counts: felt*,
+    amounts_in_len: felt,
+    amounts_in: Uint256*
+) -> (amounts_out_len: felt, amounts_out: Uint256*) {
+    alloc_locals;
+
+    _check_batch(path_lens_len, path_lens, paths_len, amount_counts_len, amount_counts, amounts_in_len);
+
+    let (local amounts_out: Uint256*) = alloc();
+    _get_batch(TRUE, path_lens_len, path_lens, paths, amount_counts, amounts_in, amounts_out);
+
+    return (amounts_in_len, amounts_out);
+}
+
+// @notice Quotes many amounts along many paths in one call, as get_exact_output_router
+// @param path_lens The length of every path
+// @param paths The paths, concatenated, every path starts with its token out
+// @param amount_counts The number of amounts quoted along every path
+// @param amounts_out The amounts of the received token, grouped by path in the order of the paths
+// @return amounts_in The amounts of the sent token, in the order of amounts_out
+@view
+func get_exact_output_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    path_lens_len: felt,
+    path_lens: felt*,
+    paths_len: felt,
+    paths: felt*,
+    amount_counts_len: felt,
+    amount_counts: felt*,
+    amounts_out_len: felt,
+    amounts_out: Uint256*
+) -> (amounts_in_len: felt, amounts_in: Uint256*) {
+    alloc_locals;
+
+    _check_batch(path_lens_len, path_lens, paths_len, amount_counts_len, amount_counts, amounts_out_len);
+
+    let (local amounts_in: Uint256*) = alloc();
+    _get_batch(FALSE, path_lens_len, path_lens, paths, amount_counts, amounts_out, amounts_in);
+
+    return (amounts_out_len, amounts_in);
+}
@@ -13,8 +13,8 @@ from openzeppelin.token.erc20.IERC20 import IERC20
 from contracts.interface.ISwapPool import ISwapPool
 from contracts.tickmath import TickMath
 from contracts.math_utils import Utils
-from contracts.interface.IUserPositionMgr import IUserPositionMgr
 from contracts.swap_utils import SwapUtils
+from contracts.pool_address_cache import PoolAddressCache
 
 @storage_var
 func _initialized() -> (res: felt) {
@@ -55,17 +55,34 @@ func _get_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_che
     token1: felt,
     fee: felt
 ) -> felt {
-    let (address) = _user_position_mgr_address.read();
-    let (pool_address) = IUserPositionMgr.get_pool_address(
-        contract_address=address,
-        token0=token0,
-        token1=token1,
-        fee=fee
-    );
+    alloc_locals;
+
+    let pool_address = PoolAddressCache.get(token0, token1, fee);
+    if (pool_address != 0) {
+        return pool_address;
+    }
 
+    let (address) = _user_position_mgr_address.read();
+    let pool_address = PoolAddressCache.resolve(address, token0, token1, fee, TRUE);
     return pool_address;
 }
 
+// @notice Re-reads the cached address of a pool from the user position manager
+// @param token0 The contract address of a token of the pool
+// @param token1 The contract address of the other token of the pool
+// @param fee The fee tier of the pool
+// @return pool_address The address of the pool, 0 if it doesn't exist
+@external
+func update_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    token0: felt,
+    token1: felt,
+    fee: felt
+) -> (pool_address: felt) {
+    let (address) = _user_position_mgr_address.read();
+    let pool_address = PoolAddressCache.update(address, token0, token1, fee);
+    return (pool_address,);
+}
+
 // external
 
 
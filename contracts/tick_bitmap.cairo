@@ -22,6 +22,11 @@ from contracts.bitmath import BitMath
 func TickBitmap_data(tick: felt) -> (value: Uint256) {
 }
 
+// bit word_pos % 256 of TickBitmap_summary(word_pos // 256) is set iff TickBitmap_data(word_pos) is not zero
+@storage_var
+func TickBitmap_summary(summary_pos: felt) -> (value: Uint256) {
+}
+
 namespace TickBitmap {
     const bound = 2 ** 127;
 
@@ -57,6 +62,57 @@ namespace TickBitmap {
         let (state: Uint256) = uint256_xor(cur_state, mask);
 
         TickBitmap_data.write(word_pos, state);
+
+        // the word became non-empty or empty
+        let (was_empty) = uint256_eq(cur_state, Uint256(0, 0));
+        let (is_empty) = uint256_eq(state, Uint256(0, 0));
+        if (was_empty + is_empty != 0) {
+            _flip_summary(word_pos);
+            return ();
+        }
+        return ();
+    }
+
+    func _flip_summary{
+        syscall_ptr: felt*,
+        pedersen_ptr: HashBuiltin*,
+        range_check_ptr,
+        bitwise_ptr: BitwiseBuiltin*,
+    }(word_pos: felt) {
+        alloc_locals;
+
+        let (summary_pos, bit_pos) = position(word_pos);
+        let (mask: Uint256) = uint256_pow2(Uint256(bit_pos, 0));
+        let (cur_state: Uint256) = TickBitmap_summary.read(summary_pos);
+
+        let (state: Uint256) = uint256_xor(cur_state, mask);
+
+        TickBitmap_summary.write(summary_pos, state);
+        return ();
+    }
+
+    // @notice sets the summary bit of a word written before the summary existed
+    func sync_summary{
+        syscall_ptr: felt*,
+        pedersen_ptr: HashBuiltin*,
+        range_check_ptr,
+        bitwise_ptr: BitwiseBuiltin*,
+    }(word_pos: felt) {
+        alloc_locals;
+
+        let (word: Uint256) = TickBitmap_data.read(word_pos);
+        let (is_empty) = uint256_eq(word, Uint256(0, 0));
+
+        let (summary_pos, bit_pos) = position(word_pos);
+        let (mask: Uint256) = uint256_pow2(Uint256(bit_pos, 0));
+        let (cur_state: Uint256) = TickBitmap_summary.read(summary_pos);
+        let (bit: Uint256) = uint256_and(cur_state, mask);
+        let (is_unset) = uint256_eq(bit, Uint256(0, 0));
+
+        if (is_empty == is_unset) {
+            return ();
+        }
+        _flip_summary(word_pos);
         return ();
     }
 
@@ -110,4 +166,67 @@ namespace TickBitmap {
         let next = (compressed + 1 + 255 - bit_pos) * tick_spacing;
         return (next, FALSE);
     }
+
+    // @notice next_valid_tick_within_one_word, but an empty word is skipped to the next non-empty word
+    // found in the summary bitmap, so at most one step is taken per 256 words
+    // @return tick_next the initialized tick or the last tick of the summary word in the direction of the search
+    func next_valid_tick{
+        syscall_ptr: felt*,
+        pedersen_ptr: HashBuiltin*,
+        range_check_ptr,
+        bitwise_ptr: BitwiseBuiltin*,
+    }(tick: felt, tick_spacing: felt, lte: felt) -> (tick_next: felt, initialized: felt) {
+        alloc_locals;
+
+        let (tick_next, initialized) = next_valid_tick_within_one_word(tick, tick_spacing, lte);
+        if (initialized == TRUE) {
+            return (tick_next, TRUE);
+        }
+
+        // tick_next is the last tick of the searched word
+        let (compressed, _) = signed_div_rem(tick_next, tick_spacing, bound);
+        let (word_pos, _) = position(compressed);
+        let (summary_pos, bit_pos) = position(word_pos);
+
+        let (tmp: Uint256) = uint256_pow2(Uint256(bit_pos, 0));
+        let (cur_state: Uint256) = TickBitmap_summary.read(summary_pos);
+
+        if (lte == TRUE) {
+            // the words below word_pos
+            let (mask: Uint256) = uint256_sub(tmp, Uint256(1, 0));
+            let (state: Uint256) = uint256_and(cur_state, mask);
+
+            let (is_valid) = uint256_eq(state, Uint256(0, 0));
+            if (is_valid == FALSE) {
+                let (msb) = BitMath.most_significant_bit(state);
+                let next_word_pos = summary_pos * 256 + msb;
+                let (word: Uint256) = TickBitmap_data.read(next_word_pos);
+                let (msb) = BitMath.most_significant_bit(word);
+                let next = (next_word_pos * 256 + msb) * tick_spacing;
+                return (next, TRUE);
+            }
+
+            let next = summary_pos * 256 * 256 * tick_spacing;
+            return (next, FALSE);
+        }
+
+        // the words above word_pos
+        let (tmp2: Uint256) = uint256_sub(tmp, Uint256(1, 0));
+        let (tmp3: Uint256, _) = uint256_add(tmp, tmp2);
+        let (mask: Uint256) = uint256_not(tmp3);
+        let (state: Uint256) = uint256_and(cur_state, mask);
+
+        let (is_valid) = uint256_eq(state, Uint256(0, 0));
+        if (is_valid == FALSE) {
+            let (lsb) = BitMath.least_significant_bit(state);
+            let next_word_pos = summary_pos * 256 + lsb;
+            let (word: Uint256) = TickBitmap_data.read(next_word_pos);
+            let (lsb) = BitMath.least_significant_bit(word);
+            let next = (next_word_pos * 256 + lsb) * tick_spacing;
+            return (next, TRUE);
+        }
+
+        let next = (summary_pos * 256 * 256 + 256 * 256 - 1) * tick_spacing;
+        return (next, FALSE);
+    }
 }
@@ -22,6 +22,7 @@ from starkware.cairo.common.math import abs_value
 from starkware.cairo.common.cairo_builtins import BitwiseBuiltin
 from starkware.cairo.common.math_cmp import is_nn, is_le
 from starkware.cairo.common.bool import TRUE, FALSE
+from starkware.cairo.common.registers import get_label_location
 
 from contracts.math_utils import Utils
 
@@ -37,105 +38,68 @@ namespace TickMath {
     const MAX_SQRT_RATIO_LOW = 0xefd1fc6a506488495d951d5263988d26;
     const MAX_SQRT_RATIO_HIGH = 0xfffd8963;
 
-    func get_sqrt_arg{range_check_ptr}(bit: felt) -> (res: felt) {
-        if (bit == 0x2) {
-            return (0xfff97272373d413259a46990580e213a,);
-        }
-        if (bit == 0x4) {
-            return (0xfff2e50f5f656932ef12357cf3c7fdcc,);
-        }
-        if (bit == 0x8) {
-            return (0xffe5caca7e10e4e61c3624eaa0941cd0,);
-        }
-        if (bit == 0x10) {
-            return (0xffcb9843d60f6159c9db58835c926644,);
-        }
-        if (bit == 0x20) {
-            return (0xff973b41fa98c081472e6896dfb254c0,);
-        }
-        if (bit == 0x40) {
-            return (0xff2ea16466c96a3843ec78b326b52861,);
-        }
-        if (bit == 0x80) {
-            return (0xfe5dee046a99a2a811c461f1969c3053,);
-        }
-        if (bit == 0x100) {
-            return (0xfcbe86c7900a88aedcffc83b479aa3a4,);
-        }
-        if (bit == 0x200) {
-            return (0xf987a7253ac413176f2b074cf7815e54,);
-        }
-        if (bit == 0x400) {
-            return (0xf3392b0822b70005940c7a398e4b70f3,);
-        }
-        if (bit == 0x800) {
-            return (0xe7159475a2c29b7443b29c7fa6e889d9,);
-        }
-        if (bit == 0x1000) {
-            return (0xd097f3bdfd2022b8845ad8f792aa5825,);
-        }
-        if (bit == 0x2000) {
-            return (0xa9f746462d870fdf8a65dc1f90e061e5,);
-        }
-        if (bit == 0x4000) {
-            return (0x70d869a156d2a1b890bb3df62baf32f7,);
-        }
-        if (bit == 0x8000) {
-            return (0x31be135f97d08fd981231505542fcfa6,);
-        }
-        if (bit == 0x10000) {
-            return (0x9aa508b5b7a84e1c677de54f3e99bc9,);
-        }
-        if (bit == 0x20000) {
-            return (0x5d6af8dedb81196699c329225ee604,);
-        }
-        if (bit == 0x40000) {
-            return (0x2216e584f5fa1ea926041bedfe98,);
-        }
-        if (bit == 0x80000) {
-            return (0x48a170391f7dc42444e8fa2,);
-        }
-
-        // revert
-        assert bit = 0x2;
-        return (0,);
+    // @dev Q128.128 multipliers of the bits 0x2 to 0x80000 of abs_tick, indexed by bit position - 1
+    func get_sqrt_args() -> (args: felt*) {
+        let (args_address) = get_label_location(sqrt_args);
+        return (args=cast(args_address, felt*));
+
+        sqrt_args:
+        dw 0xfff97272373d413259a46990580e213a;
+        dw 0xfff2e50f5f656932ef12357cf3c7fdcc;
+        dw 0xffe5caca7e10e4e61c3624eaa0941cd0;
+        dw 0xffcb9843d60f6159c9db58835c926644;
+        dw 0xff973b41fa98c081472e6896dfb254c0;
+        dw 0xff2ea16466c96a3843ec78b326b52861;
+        dw 0xfe5dee046a99a2a811c461f1969c3053;
+        dw 0xfcbe86c7900a88aedcffc83b479aa3a4;
+        dw 0xf987a7253ac413176f2b074cf7815e54;
+        dw 0xf3392b0822b70005940c7a398e4b70f3;
+        dw 0xe7159475a2c29b7443b29c7fa6e889d9;
+        dw 0xd097f3bdfd2022b8845ad8f792aa5825;
+        dw 0xa9f746462d870fdf8a65dc1f90e061e5;
+        dw 0x70d869a156d2a1b890bb3df62baf32f7;
+        dw 0x31be135f97d08fd981231505542fcfa6;
+        dw 0x9aa508b5b7a84e1c677de54f3e99bc9;
+        dw 0x5d6af8dedb81196699c329225ee604;
+        dw 0x2216e584f5fa1ea926041bedfe98;
+        dw 0x48a170391f7dc42444e8fa2;
     }
 
+    // @dev Multiplies ratio by the multiplier of every set bit of rest, `args` is the multiplier of `bit`.
+    // rest has no bit below `bit`, so the recursion ends after its highest set bit
     func get_sqrt_price{range_check_ptr, bitwise_ptr: BitwiseBuiltin*}(
-        ratio: Uint256, abs_tick: felt, bit: felt
+        ratio: Uint256, rest: felt, bit: felt, args: felt*
     ) -> (res: Uint256) {
-        alloc_locals;
-        // check if bit > 0x80000
-        let is_valid = is_nn(0x80000 - bit);
-        if (is_valid == FALSE) {
+        if (rest == 0) {
             return (ratio,);
         }
 
-        let (is_valid) = bitwise_and(abs_tick, bit);
+        let (is_valid) = bitwise_and(rest, bit);
         if (is_valid != 0) {
-            let (arg) = get_sqrt_arg(bit);
-            let (res1: Uint256, _) = uint256_mul(ratio, Uint256(arg, 0));
-            let (res2: Uint256) = uint256_shr(res1, Uint256(128, 0));
-            let (res3: Uint256) = get_sqrt_price(res2, abs_tick, bit * 2);
-            return (res3,);
+            // ratio <= 2 ** 128 and the multipliers are < 2 ** 128, so the product fits in 256 bits
+            // and shifting it right by 128 is its high part
+            let (product: Uint256, _) = uint256_mul(ratio, Uint256([args], 0));
+            let (res: Uint256) = get_sqrt_price(Uint256(product.high, 0), rest - bit, bit * 2, args + 1);
+            return (res,);
         }
 
-        let (res: Uint256) = get_sqrt_price(ratio, abs_tick, bit * 2);
+        let (res: Uint256) = get_sqrt_price(ratio, rest, bit * 2, args + 1);
         return (res,);
     }
 
     func get_sqrt_ratio_at_tick_abs{range_check_ptr, bitwise_ptr: BitwiseBuiltin*}(
         abs_tick: felt
     ) -> (res: Uint256) {
+        let (args) = get_sqrt_args();
         let (is_valid) = bitwise_and(abs_tick, 0x1);
 
         if (is_valid != 0) {
             let res1 = Uint256(0xfffcb933bd6fad37aa2d162d1a594001, 0);
-            let (res2: Uint256) = get_sqrt_price(res1, abs_tick, 0x2);
+            let (res2: Uint256) = get_sqrt_price(res1, abs_tick - 1, 0x2, args);
             return (res2,);
         }
 
-        let (res: Uint256) = get_sqrt_price(Uint256(0, 1), abs_tick, 0x2);
+        let (res: Uint256) = get_sqrt_price(Uint256(0, 1), abs_tick, 0x2, args);
         return (res,);
     }
 
@@ -8,7 +8,6 @@ from starkware.cairo.common.math_cmp import is_le, is_le_felt
 from starkware.cairo.common.math import unsigned_div_rem
 from starkware.cairo.common.bool import TRUE, FALSE
 from starkware.cairo.common.bitwise import bitwise_or
-from starkware.cairo.common.hash import hash2
 
 from openzeppelin.token.erc20.IERC20 import IERC20
 from openzeppelin.access.ownable.library import Ownable
@@ -25,6 +24,7 @@ from contracts.position_mgr import PositionInfo
 from contracts.sqrt_price_math import SqrtPriceMath
 from contracts.default_config import Config
 from contracts.swap_utils import SwapUtils
+from contracts.pool_address import PoolAddress
 
 struct UserPosition {
     pool_address: felt,
@@ -43,9 +43,6 @@ struct PoolInfo {
     fee: felt,
 }
 
-// get_selector_from_name('initializer')
-const INITIALIZER_SELECTOR = 1295919550572838631247819983596733806859788957403169325509326258146877103642;
-
 // storage
 @storage_var
 func _initialized() -> (res: felt) {
@@ -157,6 +154,22 @@ func get_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_chec
     return (address,);
 }
 
+// @notice Computes the address of a pool created with the current swap pool proxy class hash, without reading the registry
+// @dev The pool may not exist, use get_pool_address to check
+@view
+func compute_pool_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    token0: felt,
+    token1: felt,
+    fee: felt
+) -> (address: felt) {
+    alloc_locals;
+    let (this_address) = get_contract_address();
+    let (init_swap_pool_hash) = _init_swap_pool_hash.read();
+    let (swap_pool_proxy_hash) = _swap_pool_proxy_hash.read();
+    let address = PoolAddress.compute(this_address, swap_pool_proxy_hash, init_swap_pool_hash, token0, token1, fee);
+    return (address,);
+}
+
 @view
 func owner{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (owner: felt) {
     return Ownable.owner();
@@ -262,29 +275,6 @@ func get_position_token_amounts{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*,
 //  external
 //
 
-func _get_tickSpacing{range_check_ptr}(
-    fee: felt
-) -> felt {
-
-    if (fee == 500) {
-        return 10;
-    } 
-    if (fee == 3000) {
-        return 60;
-    } 
-    if (fee == 10000) {
-        return 200;
-    }
-    if (fee == 50000) {
-        return 1000;
-    }
-
-    with_attr error_message("invalid fee level") {
-        assert 0 = 1;
-    }
-    return 0;
-}
-
 func _upgrade_swap_pool{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(init_swap_pool_hash: felt, pool_address: felt) {
     let (swap_pool_hash) = _swap_pool_hash.read();
 
@@ -322,7 +312,6 @@ func create_and_initialize_pool{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*,
 
     let (this_address) = get_contract_address();
 
-    let tick_spacing = _get_tickSpacing(fee);
     let (init_swap_pool_hash) = _init_swap_pool_hash.read();
     let (swap_pool_proxy_hash) = _swap_pool_proxy_hash.read();
     let (owner) = Ownable.owner();
@@ -330,25 +319,15 @@ func create_and_initialize_pool{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*,
     let sorted_token0 = Utils.min(token0, token1); 
     let sorted_token1 = Utils.max(token0, token1);
 
-    let (salt) = hash2{hash_ptr=pedersen_ptr}(sorted_token0, sorted_token1);
-
-    let (local calldata: felt*) = alloc();
-    // always use init_swap_pool_hash for computing pool address
-    // INITIALIZER_SELECTOR should not be passed from calldata for security
-    assert calldata[0] = init_swap_pool_hash;
-    assert calldata[1] = INITIALIZER_SELECTOR;
-    assert calldata[2] = 5; // calldata_len
-    assert calldata[3] = tick_spacing;
-    assert calldata[4] = fee;
-    assert calldata[5] = sorted_token0;
-    assert calldata[6] = sorted_token1;
-    assert calldata[7] = this_address;
+    // the salt and calldata of PoolAddress.compute, so that pool addresses can be derived off the registry
+    let salt = PoolAddress.get_salt(sorted_token0, sorted_token1);
+    let (calldata_len, calldata) = PoolAddress.get_constructor_calldata(init_swap_pool_hash, sorted_token0, sorted_token1, fee, this_address);
 
     // deploy contract
     let (pool_address) = deploy(
         class_hash=swap_pool_proxy_hash,
         contract_address_salt=salt,
-        constructor_calldata_size=8,
+        constructor_calldata_size=calldata_len,
         constructor_calldata=calldata,
         deploy_from_zero=0,
     );
@@ -0,0 +1,218 @@
+"""Load benchmark of contracts/swap_pool.cairo: many traders swapping against one pool.
+
+Deploys a pool through common_proxy.cairo with several nested liquidity layers
+(the `swap_pool.layers` snapshot), funds a set of trader accounts and runs a
+seeded random stream of exact input / exact output swaps from them through
+tests/mocks/swap_target.cairo. The state executes transactions one at a time,
+like a sequencer, so the traders are interleaved rather than parallel.
+
+Reports the throughput (swaps/sec), the p50/p99 latency of a swap, and the Cairo
+steps and initialized ticks crossed per swap. With --signed every trader is an
+Account contract and the swaps are signed transactions, presigned ahead of the
+run by a PipelinedSigner, so the numbers include the account validation.
+
+Usage:
+
+    python tests/bench_swap_pool.py [--swaps N] [--traders N] [--seed N]
+                                    [--signed] [--workers N] [--out REPORT]
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import random
+import sys
+import time
+
+from profile_swap_pool import ProfiledPool, iter_call_infos
+from signers import PipelinedSigner
+from snapshots import snapshot, fork, address
+from starkware.starknet.public.abi import get_selector_from_name
+from test_tickmath import MIN_SQRT_RATIO, MAX_SQRT_RATIO
+from utils import (
+    to_uint, felt_to_int, get_min_tick, get_max_tick, TICK_SPACINGS, FeeAmount,
+    expand_to_18decimals, Account
+)
+
+tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+
+LAYER_LIQUIDITY = expand_to_18decimals(1)
+# the positions [-k, k) * tick_spacing * 10 of the `swap_pool.layers` snapshot, on top of the full range one
+LAYERS = [1, 2, 5, 10, 20, 50]
+INITIALIZED_TICKS = sorted(
+    [get_min_tick(tick_spacing), get_max_tick(tick_spacing)] +
+    [tick for k in LAYERS for tick in (-k * tick_spacing * 10, k * tick_spacing * 10)]
+)
+
+# swap amounts are log-uniform in [MIN_AMOUNT, MAX_AMOUNT]
+MIN_AMOUNT = 10 ** 14
+MAX_AMOUNT = 10 ** 18
+
+TRADER_FUNDS = 2 ** 100
+
+SWAP_SELECTOR = get_selector_from_name('Swap')
+
+signer = PipelinedSigner(987654321123456789)
+
+
+@snapshot('swap_pool.layers', parent='swap_pool.zero_tick')
+async def build_layers(starknet, info):
+    pool = ProfiledPool(starknet, info)
+    for k in LAYERS:
+        await pool.add_liquidity(-k * tick_spacing * 10, k * tick_spacing * 10, LAYER_LIQUIDITY)
+
+
+def random_swaps(n, traders, seed):
+    """Returns n (trader index, zero_for_one, amount specified) swaps, a negative amount is an exact output"""
+    rng = random.Random(seed)
+    swaps = []
+    for _ in range(n):
+        amount = int(10 ** rng.uniform(math.log10(MIN_AMOUNT), math.log10(MAX_AMOUNT)))
+        swaps.append((rng.randrange(traders), rng.random() < 0.5, amount if rng.random() < 0.5 else -amount))
+    return swaps
+
+
+def ticks_crossed(tick_before, tick_after):
+    """Initialized ticks crossed by a swap moving the current tick from tick_before to tick_after"""
+    if tick_after < tick_before:
+        # crossing a tick down moves the current tick below it
+        return bisect.bisect_right(INITIALIZED_TICKS, tick_before) - bisect.bisect_right(INITIALIZED_TICKS, tick_after)
+    return bisect.bisect_right(INITIALIZED_TICKS, tick_after) - bisect.bisect_right(INITIALIZED_TICKS, tick_before)
+
+
+def swap_tick(call_info):
+    """The current tick after the swap, from its Swap event"""
+    for call in iter_call_infos(call_info):
+        for event in call.events:
+            if event.keys == [SWAP_SELECTOR]:
+                return felt_to_int(event.data[14])
+    raise ValueError("no Swap event")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class LoadBenchmark:
+    """A forked `swap_pool.layers` pool and its funded traders"""
+
+    def __init__(self, pool, traders, signed):
+        self.pool = pool
+        self.traders = traders
+        self.signed = signed
+
+    @classmethod
+    async def create(cls, n_traders, signed=False):
+        pool = ProfiledPool(*await fork('swap_pool.layers'))
+        pool.checkpoint()
+        if signed:
+            traders = [
+                await pool.starknet.deploy(contract_class=Account.get_class, constructor_calldata=[signer.public_key], contract_address_salt=i)
+                for i in range(n_traders)
+            ]
+        else:
+            traders = [address + 1 + i for i in range(n_traders)]
+
+        for trader in traders:
+            trader_address = trader.contract_address if signed else trader
+            for token in [pool.token0, pool.token1]:
+                await token.transfer(trader_address, to_uint(TRADER_FUNDS)).execute(caller_address=address)
+                await token.approve(pool.swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=trader_address)
+        return cls(pool, traders, signed)
+
+    def swap_calls(self, trader_address, zero_for_one, amount):
+        pool = self.pool
+        token0, token1 = pool.token0.contract_address, pool.token1.contract_address
+        path = [token0, FeeAmount.MEDIUM, token1] if zero_for_one else [token1, FeeAmount.MEDIUM, token0]
+        sqrt_price_limit = MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+        amount_specified = to_uint(amount if amount >= 0 else 2 ** 256 + amount)
+        return pool.swap_target.swap(trader_address, zero_for_one, amount_specified, to_uint(sqrt_price_limit), pool.swap_pool.contract_address, path)
+
+    async def prepare(self, swaps, workers=1):
+        """Builds, and signs with --signed, the calls of the swaps ahead of the timed run"""
+        if not self.signed:
+            return [(self.traders[i], self.swap_calls(self.traders[i], zero_for_one, amount)) for i, zero_for_one, amount in swaps]
+
+        by_trader = {}
+        for n, (i, zero_for_one, amount) in enumerate(swaps):
+            invocation = self.swap_calls(self.traders[i].contract_address, zero_for_one, amount)
+            by_trader.setdefault(i, []).append((n, [(invocation.contract_address, 'swap', invocation.calldata)]))
+
+        txs = [None] * len(swaps)
+        for i, calls in by_trader.items():
+            signed = await signer.sign_transactions(self.traders[i], [call for _, call in calls], workers=workers)
+            for (n, _), tx in zip(calls, signed):
+                txs[n] = (self.traders[i], tx)
+        return txs
+
+    async def execute(self, prepared):
+        trader, call = prepared
+        if self.signed:
+            execution_info, = await signer.execute_transactions(trader, [call])
+            return execution_info.call_info
+        return await self.pool.run(call, trader)
+
+    async def run(self, swaps, workers=1):
+        """Runs the swaps in order, returns the report"""
+        prepared = await self.prepare(swaps, workers)
+
+        res = await self.pool.swap_pool.get_cur_state().call()
+        tick = felt_to_int(res.call_info.result[2])
+
+        latencies, steps, crossed = [], [], []
+        begin = time.time()
+        for item in prepared:
+            start = time.perf_counter()
+            call_info = await self.execute(item)
+            latencies.append(time.perf_counter() - start)
+
+            steps.append(call_info.execution_resources.n_steps)
+            new_tick = swap_tick(call_info)
+            crossed.append(ticks_crossed(tick, new_tick))
+            tick = new_tick
+        elapsed = time.time() - begin
+
+        return {
+            'swaps': len(swaps),
+            'traders': len(self.traders),
+            'signed': self.signed,
+            'elapsed': elapsed,
+            'swaps_per_sec': len(swaps) / elapsed,
+            'latency_p50_ms': percentile(latencies, 50) * 1000,
+            'latency_p99_ms': percentile(latencies, 99) * 1000,
+            'steps_per_swap': sum(steps) / len(steps),
+            'steps_p99': percentile(steps, 99),
+            'ticks_crossed_per_swap': sum(crossed) / len(crossed),
+            'ticks_crossed_max': max(crossed),
+        }
+
+
+async def bench(n_swaps, n_traders, seed=0, signed=False, workers=1):
+    benchmark = await LoadBenchmark.create(n_traders, signed)
+    return await benchmark.run(random_swaps(n_swaps, n_traders, seed), workers)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks random swaps from many traders against one swap pool")
+    parser.add_argument("--swaps", type=int, default=1000, help="number of swaps")
+    parser.add_argument("--traders", type=int, default=16, help="number of trader accounts")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random swap stream")
+    parser.add_argument("--signed", action="store_true", help="sends the swaps as signed transactions of Account contracts")
+    parser.add_argument("--workers", type=int, default=1, help="processes presigning the transactions with --signed")
+    parser.add_argument("--out", default=None, help="writes the JSON report to this file")
+    args = parser.parse_args(argv[1:])
+
+    report = asyncio.run(bench(args.swaps, args.traders, args.seed, args.signed, args.workers))
+    for key, value in report.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
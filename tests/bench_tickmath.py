@@ -0,0 +1,102 @@
+"""Step count benchmark of TickMath.get_sqrt_ratio_at_tick across the tick range.
+
+Calls tests/mocks/tickmath_mock.cairo on 0, +-2 ** k, +-(2 ** (k + 1) - 1), the
+tick limits and seeded random ticks, and reports the Cairo steps and builtins
+of a call by bit length of abs(tick), the one thing its cost depends on. A
+report diffed against a baseline report shows the change per bit length.
+
+Usage:
+
+    python tests/bench_tickmath.py [--random N] [--seed N] [--out REPORT]
+                                   [--baseline REPORT]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from reference.tickmath import MIN_TICK, MAX_TICK
+from utils import contract_path, init_contract
+
+CONTRACT_FILE = contract_path("tests/mocks/tickmath_mock.cairo")
+
+METRICS = ['n_steps', 'range_check', 'bitwise']
+
+
+def bench_ticks(n_random=100, seed=0):
+    rng = random.Random(seed)
+    ticks = {0, MIN_TICK, MAX_TICK}
+    for k in range(MAX_TICK.bit_length()):
+        for tick in (2 ** k, 2 ** (k + 1) - 1):
+            if tick <= MAX_TICK:
+                ticks.update((tick, -tick))
+    ticks.update(rng.randint(MIN_TICK, MAX_TICK) for _ in range(n_random))
+    return sorted(ticks)
+
+
+def call_resources(call_info):
+    resources = call_info.execution_resources
+    return {
+        'n_steps': resources.n_steps,
+        'range_check': resources.builtin_instance_counter.get('range_check_builtin', 0),
+        'bitwise': resources.builtin_instance_counter.get('bitwise_builtin', 0),
+    }
+
+
+async def bench(n_random=100, seed=0):
+    """Returns {bit length of abs(tick): {metric: (min, mean, max)}}, and the mean of every call"""
+    _, contract = await init_contract(CONTRACT_FILE)
+
+    by_bits = {}
+    for tick in bench_ticks(n_random, seed):
+        res = await contract.get_sqrt_ratio_at_tick(tick).execute()
+        by_bits.setdefault(abs(tick).bit_length(), []).append(call_resources(res.call_info))
+
+    report = {}
+    every = []
+    for bits, items in sorted(by_bits.items()):
+        every += items
+        report[str(bits)] = {
+            metric: (min(item[metric] for item in items), sum(item[metric] for item in items) / len(items), max(item[metric] for item in items))
+            for metric in METRICS
+        }
+    report['all'] = {
+        metric: (min(item[metric] for item in every), sum(item[metric] for item in every) / len(every), max(item[metric] for item in every))
+        for metric in METRICS
+    }
+    return report
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the steps of TickMath.get_sqrt_ratio_at_tick")
+    parser.add_argument("--random", type=int, default=100, help="random ticks besides the powers of 2")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random ticks")
+    parser.add_argument("--out", default=None, help="writes the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="JSON report to diff the mean steps against")
+    args = parser.parse_args(argv[1:])
+
+    report = asyncio.run(bench(args.random, args.seed))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'bits':>4} {'steps min/mean/max':>24} {'range_check':>12} {'bitwise':>8}" + (f" {'baseline':>9} {'diff':>7}" if baseline else ""))
+    for bits, item in report.items():
+        low, mean, high = item['n_steps']
+        line = f"{bits:>4} {low:>7} {mean:>8.1f} {high:>7} {item['range_check'][1]:>12.1f} {item['bitwise'][1]:>8.1f}"
+        if baseline and bits in baseline:
+            base = baseline[bits]['n_steps'][1]
+            line += f" {base:>9.1f} {(mean - base) / base * 100:>+6.1f}%"
+        print(line)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,222 @@
+"""Content-addressed on-disk cache for compiled contract classes.
+
+The cache key is a hash of the transitive ``contracts/`` import closure of the
+compiled files, the compiler flags and the installed cairo-lang / openzeppelin
+versions, so every test process (including xdist workers) reuses a serialized
+class as long as nothing it depends on changed.
+
+Usage:
+
+    python tests/compile_cache.py stats     # hit/miss statistics
+    python tests/compile_cache.py clear     # invalidate every cached class
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).parent.parent
+
+CACHE_DIR = Path(os.environ.get("DONEX_COMPILE_CACHE_DIR", str(_root / ".compile_cache")))
+CACHE_DISABLED = os.environ.get("DONEX_COMPILE_CACHE", "1") == "0"
+CACHE_VERSION = 1
+
+STATS_FILE = "stats.log"
+
+_IMPORT_RE = re.compile(r"^\s*from\s+([\w.]+)\s+import", re.MULTILINE)
+
+
+class CompileCacheStats:
+    """Per-process hit/miss counters, also appended to the shared stats log."""
+
+    hits = 0
+    misses = 0
+    saved_time = 0.0
+
+
+def _package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+def _resolve_file(path):
+    path = Path(path)
+    if not path.is_absolute() and not path.exists():
+        path = _root / path
+    return path.resolve()
+
+
+def _resolve_module(module):
+    """Returns the local source file of a cairo module, None for library modules."""
+    path = _root.joinpath(*module.split(".")).with_suffix(".cairo")
+    if path.exists():
+        return path.resolve()
+    return None
+
+
+def import_closure(files):
+    """Returns every local cairo file reachable from `files` through imports."""
+    seen = {}
+    stack = [_resolve_file(f) for f in files]
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        source = path.read_bytes()
+        seen[path] = source
+        for module in _IMPORT_RE.findall(source.decode()):
+            dep = _resolve_module(module)
+            if dep is not None and dep not in seen:
+                stack.append(dep)
+    return seen
+
+
+def _relative(path):
+    try:
+        return str(path.relative_to(_root.resolve()))
+    except ValueError:
+        return str(path)
+
+
+def cache_key(files, **flags):
+    """Returns the content hash identifying the compiled class of `files`."""
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "version": CACHE_VERSION,
+        "cairo-lang": _package_version("cairo-lang"),
+        "openzeppelin": _package_version("openzeppelin-cairo-contracts"),
+        "files": [_relative(_resolve_file(f)) for f in files],
+        "flags": flags,
+    }, sort_keys=True).encode())
+
+    closure = import_closure(files)
+    for path in sorted(closure, key=_relative):
+        h.update(_relative(path).encode())
+        h.update(hashlib.sha256(closure[path]).digest())
+    return h.hexdigest()
+
+
+def _record(event, name, seconds):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(CACHE_DIR / STATS_FILE, "a") as f:
+            f.write(f"{event} {seconds:.3f} {name}\n")
+    except OSError:
+        pass
+
+
+def _atomic_write(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(data)
+    os.replace(tmp, path)
+
+
+def compile_cached(files, debug_info=True, disable_hint_validation=False, **kwargs):
+    """Drop-in replacement of compile_starknet_files backed by the on-disk cache."""
+    from starkware.starknet.compiler.compile import compile_starknet_files
+    from starkware.starknet.services.api.contract_class import ContractClass
+
+    flags = dict(debug_info=debug_info, disable_hint_validation=disable_hint_validation, **kwargs)
+    if CACHE_DISABLED:
+        return compile_starknet_files(files=files, **flags)
+
+    name = ",".join(_relative(_resolve_file(f)) for f in files)
+    key = cache_key(files, **flags)
+    entry = CACHE_DIR / f"{key}.json"
+    meta = CACHE_DIR / f"{key}.meta.json"
+
+    if entry.exists():
+        try:
+            contract_class = ContractClass.loads(entry.read_text())
+            compile_time = json.loads(meta.read_text())["compile_time"] if meta.exists() else 0.0
+            CompileCacheStats.hits += 1
+            CompileCacheStats.saved_time += compile_time
+            _record("hit", name, compile_time)
+            return contract_class
+        except Exception:
+            # a corrupted entry is treated as a miss and rewritten below
+            pass
+
+    begin = time.time()
+    contract_class = compile_starknet_files(files=files, **flags)
+    compile_time = time.time() - begin
+
+    CompileCacheStats.misses += 1
+    _record("miss", name, compile_time)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _atomic_write(entry, contract_class.dumps())
+    _atomic_write(meta, json.dumps({
+        "files": name,
+        "flags": flags,
+        "compile_time": compile_time,
+        "created": time.time(),
+    }))
+    return contract_class
+
+
+def read_stats():
+    """Aggregates the shared stats log into per-file hit/miss counters."""
+    stats = {}
+    path = CACHE_DIR / STATS_FILE
+    if not path.exists():
+        return stats
+    for line in path.read_text().splitlines():
+        try:
+            event, seconds, name = line.split(" ", 2)
+        except ValueError:
+            continue
+        item = stats.setdefault(name, {"hit": 0, "miss": 0, "compile_time": 0.0, "saved_time": 0.0})
+        item[event] += 1
+        if event == "miss":
+            item["compile_time"] += float(seconds)
+        else:
+            item["saved_time"] += float(seconds)
+    return stats
+
+
+def clear():
+    """Removes every cached class and the stats log, returns the number of entries removed."""
+    if not CACHE_DIR.exists():
+        return 0
+    count = 0
+    for path in CACHE_DIR.iterdir():
+        if path.name.endswith(".json") and not path.name.endswith(".meta.json"):
+            count += 1
+        path.unlink()
+    return count
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "stats"
+    if command == "clear":
+        print(f"removed {clear()} cached classes from {CACHE_DIR}")
+        return 0
+
+    if command == "stats":
+        stats = read_stats()
+        entries = list(CACHE_DIR.glob("*.meta.json")) if CACHE_DIR.exists() else []
+        hits = sum(item["hit"] for item in stats.values())
+        misses = sum(item["miss"] for item in stats.values())
+        total = hits + misses
+        print(f"cache dir: {CACHE_DIR}")
+        print(f"entries: {len(entries)}")
+        print(f"hits: {hits} misses: {misses} hit ratio: {hits / total if total else 0:.2%}")
+        for name, item in sorted(stats.items()):
+            print(f"  {name}: hit={item['hit']} miss={item['miss']} "
+                  f"compile={item['compile_time']:.1f}s saved={item['saved_time']:.1f}s")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
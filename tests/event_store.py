@@ -0,0 +1,429 @@
+"""Decoder of SwapPool events into a columnar, append-only store.
+
+Raw events, `Event(from_address, keys, data)` of execution infos or one JSON
+object per line in a recorded event stream
+
+    {"block_number", "from_address", "keys", "data"}
+
+are decoded by selector into typed rows (signed ticks, uint256 amounts, ...),
+and appended to one fixed-width binary file per column, partitioned by event,
+pool and block range:
+
+    <root>/<event>/<pool address>/<first block>/<column>.col
+
+A partition's `_meta.json` records its committed row count, written last, so
+a crash while appending leaves the partition at its previous rows. Every flush
+also rebuilds the sorted indexes of the partitions it touched, on the tick
+columns and the recipient, and keeps the block and tick range of a partition
+in its meta so scans skip partitions without decoding them.
+
+Usage:
+
+    python tests/event_store.py ingest EVENTS STORE [--blocks-per-partition N]
+    python tests/event_store.py stats STORE
+"""
+
+import argparse
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+
+from starkware.starknet.public.abi import get_selector_from_name
+
+BLOCKS_PER_PARTITION = 10000
+# rows buffered by EventStore.append before a flush
+FLUSH_ROWS = 10000
+
+META_FILE = "_meta.json"
+
+# column type: (width in bytes, felts of the event data)
+COLUMN_TYPES = {
+    'int64': (8, 1),    # signed felt, ticks and small values
+    'uint128': (16, 1),
+    'felt': (32, 1),
+    'uint256': (32, 2),
+    'int256': (32, 2),  # two's complement Uint256, the signed swap amounts
+}
+
+# the columns of every event of contracts/swap_pool.cairo, in the order of its data
+SCHEMAS = {
+    'Initializer': [
+        ('tick_spacing', 'int64'), ('fee', 'int64'), ('token_a', 'felt'), ('token_b', 'felt'), ('owner', 'felt'),
+    ],
+    'InitializePrice': [('sqrt_price_x96', 'uint256')],
+    'AddLiquidity': [
+        ('recipient', 'felt'), ('tick_lower', 'int64'), ('tick_upper', 'int64'), ('amount', 'uint128'),
+        ('data', 'felt'), ('amount0', 'uint256'), ('amount1', 'uint256'),
+    ],
+    'RemoveLiquidity': [
+        ('recipient', 'felt'), ('tick_lower', 'int64'), ('tick_upper', 'int64'), ('amount', 'uint128'),
+        ('amount0', 'uint256'), ('amount1', 'uint256'),
+    ],
+    'Swap': [
+        ('recipient', 'felt'), ('zero_for_one', 'int64'), ('amount_specified', 'int256'),
+        ('sqrt_price_limit_x96', 'uint256'), ('sender', 'felt'), ('amount0', 'int256'), ('amount1', 'int256'),
+        ('sqrt_price_x96', 'uint256'), ('liquidity', 'uint128'), ('tick', 'int64'),
+    ],
+    'Collect': [
+        ('caller', 'felt'), ('recipient', 'felt'), ('tick_lower', 'int64'), ('tick_upper', 'int64'),
+        ('amount0_requested', 'uint128'), ('amount1_requested', 'uint128'), ('amount0', 'uint128'),
+        ('amount1', 'uint128'),
+    ],
+    'CollectProtocol': [
+        ('recipient', 'felt'), ('amount0_requested', 'uint128'), ('amount1_requested', 'uint128'),
+        ('amount0', 'uint128'), ('amount1', 'uint128'),
+    ],
+    'TransferToken': [('token_contract', 'felt'), ('to', 'felt'), ('amount', 'uint256')],
+    'SetFeeProtocol': [('fee_protocol0', 'int64'), ('fee_protocol1', 'int64')],
+    'Sync': [('reserve0', 'uint128'), ('reserve1', 'uint128')],
+}
+
+# columns of every row, before the event columns
+ROW_COLUMNS = [('block_number', 'int64'), ('event_index', 'int64')]
+
+INDEXED_COLUMNS = ['tick', 'tick_lower', 'tick_upper', 'recipient']
+
+P = 2 ** 251 + 17 * 2 ** 192 + 1
+
+
+class EventStoreError(Exception):
+    pass
+
+
+def _to_int(value):
+    """An int of a JSON number or a decimal / hex string"""
+    return value if isinstance(value, int) else int(value, 0)
+
+
+def _felt_to_int(value):
+    return value - P if value > P // 2 else value
+
+
+def _encode(kind, value):
+    if kind == 'int64':
+        return value.to_bytes(8, 'little', signed=True)
+    if kind == 'int256':
+        return (value % 2 ** 256).to_bytes(32, 'little')
+    return value.to_bytes(COLUMN_TYPES[kind][0], 'little')
+
+
+def _decode_column(kind, data):
+    if kind == 'int64':
+        values = array('q')
+        values.frombytes(data)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+    width = COLUMN_TYPES[kind][0]
+    values = [int.from_bytes(data[i:i + width], 'little') for i in range(0, len(data), width)]
+    if kind == 'int256':
+        return [value - 2 ** 256 if value >= 2 ** 255 else value for value in values]
+    return values
+
+
+def _index_key(kind, value):
+    """Fixed-width big-endian encoding of a column value whose byte order is its numeric order"""
+    if kind == 'int64':
+        return (value + 2 ** 63).to_bytes(8, 'big')
+    return value.to_bytes(32, 'big')
+
+
+def _bisect(data, width, key_width, key, right):
+    """bisect_left / bisect_right of key in the sorted fixed-width records of an index"""
+    low, high = 0, len(data) // width
+    while low < high:
+        mid = (low + high) // 2
+        record_key = data[mid * width:mid * width + key_width]
+        if record_key < key or (right and record_key == key):
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+class EventDecoder:
+    """Decodes raw SwapPool events into (event name, pool address, row)"""
+
+    def __init__(self, schemas=SCHEMAS):
+        self.schemas = schemas
+        self.selectors = {get_selector_from_name(name): name for name in schemas}
+
+    def decode(self, from_address, keys, data):
+        """Returns (name, pool, {column: value}), None for an event of another contract"""
+        name = self.selectors.get(keys[0]) if len(keys) == 1 else None
+        if name is None:
+            return None
+
+        schema = self.schemas[name]
+        size = sum(COLUMN_TYPES[kind][1] for _, kind in schema)
+        if len(data) != size:
+            raise EventStoreError(f"{name} event of {len(data)} felts, expected {size}")
+
+        row = {}
+        i = 0
+        for column, kind in schema:
+            if COLUMN_TYPES[kind][1] == 2:
+                row[column] = data[i] + (data[i + 1] << 128)
+                if kind == 'int256' and row[column] >= 2 ** 255:
+                    row[column] -= 2 ** 256
+            elif kind == 'int64':
+                row[column] = _felt_to_int(data[i])
+            else:
+                row[column] = data[i]
+            i += COLUMN_TYPES[kind][1]
+        return name, from_address, row
+
+
+def iter_events(execution_info):
+    """The raw events of a StarknetCallInfo, CallInfo or TransactionExecutionInfo, in emission order"""
+    if hasattr(execution_info, 'raw_events'):
+        return iter(execution_info.raw_events)
+    return iter(execution_info.get_sorted_events())
+
+
+def read_event_stream(path):
+    """Yields (block_number, from_address, keys, data) of a recorded event stream, one JSON object per line"""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            yield (
+                _to_int(item['block_number']), _to_int(item['from_address']),
+                [_to_int(key) for key in item['keys']], [_to_int(value) for value in item['data']]
+            )
+
+
+class Partition:
+    """The rows of one event of one pool in one block range"""
+
+    def __init__(self, path, name, schema):
+        self.path = Path(path)
+        self.name = name
+        self.columns = ROW_COLUMNS + schema
+        self.kinds = dict(self.columns)
+        self.meta = self._load_meta()
+
+    def _load_meta(self):
+        meta_path = self.path / META_FILE
+        if not meta_path.exists():
+            return {'rows': 0}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    def column_path(self, column):
+        return self.path / f"{column}.col"
+
+    def index_path(self, column):
+        return self.path / f"{column}.idx"
+
+    def append(self, rows):
+        self.path.mkdir(parents=True, exist_ok=True)
+        for column, kind in self.columns:
+            width = COLUMN_TYPES[kind][0]
+            with open(self.column_path(column), 'ab') as f:
+                # drops the bytes of an append interrupted before its meta was written
+                f.truncate(self.rows * width)
+                f.write(b''.join(_encode(kind, row[column]) for row in rows))
+
+        meta = dict(self.meta, rows=self.rows + len(rows))
+        blocks = [row['block_number'] for row in rows]
+        meta['block_min'] = min(blocks + ([self.meta['block_min']] if self.rows else []))
+        meta['block_max'] = max(blocks + ([self.meta['block_max']] if self.rows else []))
+        for column in INDEXED_COLUMNS:
+            if self.kinds.get(column) == 'int64':
+                values = [row[column] for row in rows]
+                meta[f'{column}_min'] = min(values + ([self.meta[f'{column}_min']] if self.rows else []))
+                meta[f'{column}_max'] = max(values + ([self.meta[f'{column}_max']] if self.rows else []))
+
+        self._build_indexes(meta['rows'])
+        tmp_path = self.path / (META_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.path / META_FILE)
+        self.meta = meta
+
+    def _build_indexes(self, rows):
+        for column in INDEXED_COLUMNS:
+            kind = self.kinds.get(column)
+            if kind is None:
+                continue
+            values = self._read(column, rows)
+            entries = sorted((_index_key(kind, value), row) for row, value in enumerate(values))
+            with open(self.index_path(column), 'wb') as f:
+                f.write(b''.join(key + row.to_bytes(4, 'little') for key, row in entries))
+
+    def _read(self, column, rows):
+        width = COLUMN_TYPES[self.kinds[column]][0]
+        with open(self.column_path(column), 'rb') as f:
+            return _decode_column(self.kinds[column], f.read(rows * width))
+
+    def read(self, column):
+        """The committed values of a column"""
+        if column not in self.kinds:
+            raise EventStoreError(f"{self.name} has no column {column}")
+        if self.rows == 0:
+            return []
+        return self._read(column, self.rows)
+
+    def read_rows(self, rows):
+        """The given rows as dicts, reading only their bytes of every column"""
+        items = [{} for _ in rows]
+        for column, kind in self.columns:
+            width = COLUMN_TYPES[kind][0]
+            with open(self.column_path(column), 'rb') as f:
+                for item, row in zip(items, rows):
+                    f.seek(row * width)
+                    item[column] = _decode_column(kind, f.read(width))[0]
+        return items
+
+    def lookup(self, column, low, high=None):
+        """The rows whose `column` is in [low, high], in increasing value order, through its index"""
+        kind = self.kinds.get(column)
+        if column not in INDEXED_COLUMNS or kind is None:
+            raise EventStoreError(f"{self.name} has no index on {column}")
+        if self.rows == 0:
+            return []
+
+        high = low if high is None else high
+        key_width = len(_index_key(kind, 0))
+        width = key_width + 4
+        with open(self.index_path(column), 'rb') as f:
+            data = f.read()
+        begin = _bisect(data, width, key_width, _index_key(kind, low), right=False)
+        end = _bisect(data, width, key_width, _index_key(kind, high), right=True)
+        rows = [int.from_bytes(data[i * width + key_width:(i + 1) * width], 'little') for i in range(begin, end)]
+        # the index may cover rows of an append interrupted after it was built
+        return [row for row in rows if row < self.rows]
+
+
+class EventStore:
+    """An append-only store of decoded SwapPool events under a root directory"""
+
+    def __init__(self, root, blocks_per_partition=BLOCKS_PER_PARTITION, flush_rows=FLUSH_ROWS, decoder=None):
+        self.root = Path(root)
+        self.blocks_per_partition = blocks_per_partition
+        self.flush_rows = flush_rows
+        self.decoder = decoder or EventDecoder()
+        self.pending = {}
+        self.n_pending = 0
+        self.event_index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def partition(self, name, pool, block_start):
+        return Partition(self.root / name / hex(pool) / str(block_start), name, self.decoder.schemas[name])
+
+    def append_raw(self, block_number, from_address, keys, data):
+        """Decodes and buffers one raw event, returns its event name or None if it is not a SwapPool event"""
+        decoded = self.decoder.decode(from_address, keys, data)
+        if decoded is None:
+            return None
+        name, pool, row = decoded
+
+        # events are numbered in their block in append order
+        index = self.event_index.get(block_number, 0)
+        self.event_index = {block_number: index + 1}
+        row['block_number'] = block_number
+        row['event_index'] = index
+
+        block_start = block_number - block_number % self.blocks_per_partition
+        self.pending.setdefault((name, pool, block_start), []).append(row)
+        self.n_pending += 1
+        if self.n_pending >= self.flush_rows:
+            self.flush()
+        return name
+
+    def append(self, block_number, execution_info):
+        """Decodes and buffers the SwapPool events of an execution info"""
+        for event in iter_events(execution_info):
+            self.append_raw(block_number, event.from_address, event.keys, event.data)
+
+    def flush(self):
+        for (name, pool, block_start), rows in self.pending.items():
+            self.partition(name, pool, block_start).append(rows)
+        self.pending = {}
+        self.n_pending = 0
+
+    def partitions(self, name, pool=None, blocks=None):
+        """The partitions of an event, of one pool and overlapping the block range [first, last] if given"""
+        event_dir = self.root / name
+        if not event_dir.exists():
+            return []
+        pool_dirs = [event_dir / hex(pool)] if pool is not None else sorted(event_dir.iterdir())
+        partitions = []
+        for pool_dir in pool_dirs:
+            if not pool_dir.exists():
+                continue
+            for block_dir in sorted(pool_dir.iterdir(), key=lambda path: int(path.name)):
+                partition = Partition(block_dir, name, self.decoder.schemas[name])
+                if partition.rows == 0:
+                    continue
+                if blocks and (partition.meta['block_max'] < blocks[0] or partition.meta['block_min'] > blocks[1]):
+                    continue
+                partitions.append(partition)
+        return partitions
+
+    def scan(self, name, columns, pool=None, blocks=None):
+        """Yields ({column: values}, partition) for every partition of an event, block filtered by partition"""
+        for partition in self.partitions(name, pool, blocks):
+            yield {column: partition.read(column) for column in columns}, partition
+
+    def find(self, name, column, low, high=None, pool=None, blocks=None):
+        """Returns the rows of an event whose indexed `column` is in [low, high], as dicts"""
+        found = []
+        for partition in self.partitions(name, pool, blocks):
+            meta = partition.meta
+            if f'{column}_min' in meta and (meta[f'{column}_max'] < low or meta[f'{column}_min'] > (low if high is None else high)):
+                continue
+            for item in partition.read_rows(sorted(partition.lookup(column, low, high))):
+                if not blocks or blocks[0] <= item['block_number'] <= blocks[1]:
+                    found.append(item)
+        return found
+
+    def stats(self):
+        """{event: {'partitions', 'rows'}} of the store"""
+        stats = {}
+        for name in self.decoder.schemas:
+            partitions = self.partitions(name)
+            if partitions:
+                stats[name] = {'partitions': len(partitions), 'rows': sum(p.rows for p in partitions)}
+        return stats
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Decodes SwapPool events into a columnar store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="appends a recorded event stream to a store")
+    ingest.add_argument("events", help="event stream, one JSON object per line")
+    ingest.add_argument("store", help="store directory")
+    ingest.add_argument("--blocks-per-partition", type=int, default=BLOCKS_PER_PARTITION)
+    stats = subparsers.add_parser("stats", help="rows and partitions of every event")
+    stats.add_argument("store", help="store directory")
+    args = parser.parse_args(argv[1:])
+
+    if args.command == "ingest":
+        n = 0
+        with EventStore(args.store, args.blocks_per_partition) as store:
+            for block_number, from_address, keys, data in read_event_stream(args.events):
+                n += store.append_raw(block_number, from_address, keys, data) is not None
+        print(f"{n} events appended")
+    else:
+        for name, item in EventStore(args.store).stats().items():
+            print(f"{name}: {item['rows']} rows in {item['partitions']} partitions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
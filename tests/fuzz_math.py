@@ -0,0 +1,369 @@
+"""Differential fuzzer of the cairo math libraries against their python references.
+
+Generates random inputs for FullMath, SqrtPriceMath, SwapMath and
+LiquidityAmounts, mixing boundary values (0, 1, 2 ** k, 2 ** k - 1, the sqrt
+price limits) with bit-length-uniform ones, and evaluates them with the
+exact-integer ports of tests/reference. That is cheap enough for millions of
+inputs, so only the interesting ones are sent to the cairo mocks: the first
+input of every outcome class (revert, bit lengths of the arguments and the
+results) plus a random sample. The mocks run in batches on worker processes.
+
+A divergence, a different result or a revert on one side only, is shrunk to a
+minimal input and appended to tests/test_data/fuzz_regressions.json, which
+test_fuzz_math.py replays.
+
+Usage:
+
+    python tests/fuzz_math.py [--iterations N] [--sample N] [--workers N]
+                              [--seed N] [--only PREFIX] [--max-cases N]
+                              [--no-save]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from compile_cache import compile_cached
+from reference import fullmath, liquidity_amounts, sqrt_price_math, swapmath
+from reference.fullmath import MAX_UINT256
+from reference.tickmath import MIN_SQRT_RATIO, MAX_SQRT_RATIO
+from starkware.starknet.testing.starknet import Starknet
+from starkware.starkware_utils.error_handling import StarkException
+from utils import to_uint, from_uint, int_to_felt, contract_path
+
+REGRESSIONS_FILE = Path(__file__).parent / "test_data" / "fuzz_regressions.json"
+
+Q96 = 2 ** 96
+MAX_UINT128 = 2 ** 128 - 1
+
+BATCH_SIZE = 100
+# the cairo mocks run a few calls per second, more interesting inputs than this are sampled
+MAX_CASES = 500
+# cairo evaluations spent shrinking one divergence
+MAX_SHRINK_STEPS = 200
+
+
+def random_bits(rng, bits):
+    """A uint of at most `bits` bits, boundary values 1/4 of the time, else with a uniform bit length"""
+    if rng.random() < 0.25:
+        k = rng.randrange(bits)
+        return rng.choice([0, 1, 2 ** k, 2 ** (k + 1) - 1, 2 ** bits - 1])
+    k = rng.randint(1, bits)
+    return rng.getrandbits(k) | (1 << (k - 1))
+
+
+class Kind:
+    """An argument type: its random values, its encoding in the mock ABI and the values shrinking may try"""
+
+    def __init__(self, name, gen, encode, valid):
+        self.name = name
+        self.gen = gen
+        self.encode = encode
+        self.valid = valid
+
+
+def _gen_price(rng):
+    r = rng.random()
+    if r < 0.4:
+        return rng.randint(MIN_SQRT_RATIO, MAX_SQRT_RATIO)
+    if r < 0.6:
+        return rng.choice([MIN_SQRT_RATIO, MAX_SQRT_RATIO, Q96]) + rng.randint(-2 ** 16, 2 ** 16)
+    return random_bits(rng, 160)
+
+
+def _gen_int256(rng):
+    value = random_bits(rng, 255)
+    return value if rng.random() < 0.5 else -value
+
+
+def _gen_signed_liquidity(rng):
+    value = random_bits(rng, 127)
+    return value if rng.random() < 0.5 else -value
+
+
+def _gen_fee(rng):
+    if rng.random() < 0.5:
+        return rng.choice([0, 100, 500, 3000, 10000, 50000, 999999])
+    return rng.randrange(1000000)
+
+
+UINT256 = Kind("uint256", lambda rng: random_bits(rng, 256), to_uint, lambda v: 0 <= v <= MAX_UINT256)
+PRICE = Kind("price", _gen_price, to_uint, lambda v: 0 <= v < 2 ** 160)
+INT256 = Kind("int256", _gen_int256, lambda v: to_uint(v & MAX_UINT256), lambda v: -2 ** 255 < v < 2 ** 255)
+LIQUIDITY = Kind("liquidity", lambda rng: random_bits(rng, 128), lambda v: v, lambda v: 0 <= v <= MAX_UINT128)
+SIGNED_LIQUIDITY = Kind("signed_liquidity", _gen_signed_liquidity, int_to_felt, lambda v: -2 ** 127 < v < 2 ** 127)
+BOOL = Kind("bool", lambda rng: rng.randint(0, 1), lambda v: v, lambda v: v in (0, 1))
+FEE = Kind("fee", _gen_fee, lambda v: v, lambda v: 0 <= v < 1000000)
+
+
+class Target:
+    """A mock function and its python reference, which returns uint256 results unless `felt_result`"""
+
+    def __init__(self, name, mock, function, kinds, reference, felt_result=False):
+        self.name = name
+        self.mock = mock
+        self.function = function
+        self.kinds = kinds
+        self.reference = reference
+        self.felt_result = felt_result
+
+    def random_args(self, rng):
+        return [kind.gen(rng) for kind in self.kinds]
+
+    def evaluate(self, args):
+        """Returns the results as flat felts, like the mock returns them, or None on a revert"""
+        try:
+            res = self.reference(*args)
+        except (ValueError, ArithmeticError):
+            return None
+        if self.felt_result:
+            return [res]
+        if not isinstance(res, tuple):
+            res = (res,)
+        return [felt for value in res for felt in to_uint(value & MAX_UINT256)]
+
+    def outcome_class(self, args, res):
+        """Inputs with the same class exercise the same paths, roughly"""
+        sizes = tuple(abs(arg).bit_length() // 128 for arg in args)
+        if res is None:
+            return (sizes, None)
+        results = res if self.felt_result else [from_uint(res[i:i + 2]) for i in range(0, len(res), 2)]
+        return (sizes, tuple(value.bit_length() // 32 for value in results))
+
+
+def _mock(name):
+    return contract_path(f"tests/mocks/{name}")
+
+
+TARGETS = [
+    Target("fullmath.uint256_mul_div", _mock("fullmath_mock.cairo"), "uint256_mul_div",
+           [UINT256, UINT256, UINT256], lambda a, b, c: fullmath.mul_div(a, b, c)[0]),
+    Target("fullmath.uint256_mul_div_roundingup", _mock("fullmath_mock.cairo"), "uint256_mul_div_roundingup",
+           [UINT256, UINT256, UINT256], fullmath.mul_div_roundingup),
+    Target("fullmath.uint256_div_roundingup", _mock("fullmath_mock.cairo"), "uint256_div_roundingup",
+           [UINT256, UINT256], fullmath.div_roundingup),
+    Target("sqrt_price_math.get_amount0_delta", _mock("sqrt_price_math_mock.cairo"), "get_amount0_delta",
+           [PRICE, PRICE, LIQUIDITY, BOOL], sqrt_price_math.get_amount0_delta),
+    Target("sqrt_price_math.get_amount1_delta", _mock("sqrt_price_math_mock.cairo"), "get_amount1_delta",
+           [PRICE, PRICE, LIQUIDITY, BOOL], sqrt_price_math.get_amount1_delta),
+    Target("sqrt_price_math.get_amount0_delta2", _mock("sqrt_price_math_mock.cairo"), "get_amount0_delta2",
+           [PRICE, PRICE, SIGNED_LIQUIDITY], sqrt_price_math.get_amount0_delta2),
+    Target("sqrt_price_math.get_amount1_delta2", _mock("sqrt_price_math_mock.cairo"), "get_amount1_delta2",
+           [PRICE, PRICE, SIGNED_LIQUIDITY], sqrt_price_math.get_amount1_delta2),
+    Target("sqrt_price_math.get_next_sqrt_price_from_input", _mock("sqrt_price_math_mock.cairo"),
+           "get_next_sqrt_price_from_input", [PRICE, LIQUIDITY, UINT256, BOOL],
+           sqrt_price_math.get_next_sqrt_price_from_input),
+    Target("sqrt_price_math.get_next_sqrt_price_from_output", _mock("sqrt_price_math_mock.cairo"),
+           "get_next_sqrt_price_from_output", [PRICE, LIQUIDITY, UINT256, BOOL],
+           sqrt_price_math.get_next_sqrt_price_from_output),
+    Target("swapmath.compute_swap_step", _mock("swapmath_mock.cairo"), "compute_swap_step",
+           [PRICE, PRICE, LIQUIDITY, INT256, FEE], swapmath.compute_swap_step),
+    Target("liquidity_amounts.get_amounts_for_liquidity", _mock("liquidity_amounts_mock.cairo"),
+           "get_amounts_for_liquidity", [PRICE, PRICE, PRICE, LIQUIDITY],
+           liquidity_amounts.get_amounts_for_liquidity),
+    Target("liquidity_amounts.get_liquidity_for_amounts", _mock("liquidity_amounts_mock.cairo"),
+           "get_liquidity_for_amounts", [PRICE, PRICE, PRICE, UINT256, UINT256],
+           liquidity_amounts.get_liquidity_for_amounts, felt_result=True),
+]
+
+TARGETS_BY_NAME = {target.name: target for target in TARGETS}
+
+
+def select_targets(only=None):
+    return [target for target in TARGETS if only is None or target.name.startswith(only)]
+
+
+def reference_search(target_name, iterations, seed):
+    """Evaluates `iterations` random inputs with the reference, returns {outcome class: args}"""
+    target = TARGETS_BY_NAME[target_name]
+    rng = random.Random(seed)
+    interesting = {}
+    for _ in range(iterations):
+        args = target.random_args(rng)
+        key = target.outcome_class(args, target.evaluate(args))
+        if key not in interesting:
+            interesting[key] = args
+    return interesting
+
+
+# deployed mocks of this process, by mock file
+_contracts = {}
+
+
+async def _get_mock(mock):
+    if mock not in _contracts:
+        starknet = await Starknet.empty()
+        contract_class = compile_cached([mock], debug_info=True, disable_hint_validation=True)
+        _contracts[mock] = await starknet.deploy(contract_class=contract_class)
+    return _contracts[mock]
+
+
+async def cairo_evaluate(target, args):
+    """Returns the results of the mock as flat felts, or None on a revert"""
+    contract = await _get_mock(target.mock)
+    encoded = [kind.encode(arg) for kind, arg in zip(target.kinds, args)]
+    try:
+        # the mocks are stateless, execute() skips the state copy of call()
+        res = await getattr(contract, target.function)(*encoded).execute()
+    except StarkException:
+        return None
+    return list(res.call_info.result)
+
+
+async def _compare_batch(target, batch):
+    divergences = []
+    for args in batch:
+        expected = target.evaluate(args)
+        res = await cairo_evaluate(target, args)
+        if res != expected:
+            divergences.append((args, expected, res))
+    return divergences
+
+
+def compare_batch(target_name, batch):
+    """Runs a batch of inputs on the mock, returns the (args, reference, cairo) divergences"""
+    return asyncio.run(_compare_batch(TARGETS_BY_NAME[target_name], batch))
+
+
+def _shrink_candidates(kind, value):
+    magnitude = abs(value)
+    candidates = [0, 1, magnitude >> 1, magnitude >> 16, magnitude - 1, magnitude & (magnitude - 1)]
+    if magnitude:
+        candidates.append(1 << (magnitude.bit_length() - 1))
+    seen = set()
+    for candidate in candidates:
+        candidate = -candidate if value < 0 else candidate
+        if abs(candidate) < magnitude and candidate not in seen and kind.valid(candidate):
+            seen.add(candidate)
+            yield candidate
+
+
+async def shrink(target, args, max_steps=MAX_SHRINK_STEPS):
+    """Greedily shrinks the arguments of a divergence toward 0 while it still diverges"""
+    args = list(args)
+    steps = 0
+    progress = True
+    while progress and steps < max_steps:
+        progress = False
+        for i, kind in enumerate(target.kinds):
+            for candidate in _shrink_candidates(kind, args[i]):
+                trial = args[:i] + [candidate] + args[i + 1:]
+                steps += 1
+                if await cairo_evaluate(target, trial) != target.evaluate(trial):
+                    args = trial
+                    progress = True
+                    break
+                if steps >= max_steps:
+                    return args
+    return args
+
+
+def load_regressions(path=REGRESSIONS_FILE):
+    if not Path(path).exists():
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_regression(target, args, expected, res, path=REGRESSIONS_FILE):
+    regressions = load_regressions(path)
+    entry = {"target": target.name, "args": [str(arg) for arg in args], "reference": expected, "cairo": res}
+    if any(item["target"] == entry["target"] and item["args"] == entry["args"] for item in regressions):
+        return
+    regressions.append(entry)
+    with open(path, "w") as f:
+        json.dump(regressions, f, indent=2)
+        f.write("\n")
+
+
+def _split(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _map(executor, fn, *iterables):
+    if executor is None:
+        return list(map(fn, *iterables))
+    return list(executor.map(fn, *iterables))
+
+
+def fuzz(iterations, sample=100, workers=1, seed=0, only=None, save=True, max_cases=MAX_CASES, log=print):
+    """Fuzzes the targets, returns a report with the minimized divergences of each"""
+    report = {}
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for target in select_targets(only):
+            begin = time.time()
+            # the reference search is split in one chunk per worker, with its own seed
+            chunks = [iterations // workers + (i < iterations % workers) for i in range(workers)]
+            seeds = [f"{seed}:{target.name}:{i}" for i in range(workers)]
+            interesting = {}
+            for found in _map(executor, reference_search, [target.name] * workers, chunks, seeds):
+                for key, args in found.items():
+                    interesting.setdefault(key, args)
+            reference_time = time.time() - begin
+
+            rng = random.Random(f"{seed}:{target.name}:sample")
+            cases = list(interesting.values())
+            if len(cases) > max_cases:
+                cases = rng.sample(cases, max_cases)
+            cases += [target.random_args(rng) for _ in range(sample)]
+            batches = _split(cases, BATCH_SIZE)
+            divergences = [
+                divergence
+                for found in _map(executor, compare_batch, [target.name] * len(batches), batches)
+                for divergence in found
+            ]
+
+            minimized = []
+            for args, _, _ in divergences:
+                args = asyncio.run(shrink(target, args))
+                expected, res = target.evaluate(args), asyncio.run(cairo_evaluate(target, args))
+                if args not in [item[0] for item in minimized]:
+                    minimized.append((args, expected, res))
+                    if save:
+                        save_regression(target, args, expected, res)
+
+            report[target.name] = {
+                "iterations": iterations,
+                "classes": len(interesting),
+                "cairo_cases": len(cases),
+                "divergences": minimized,
+                "reference_per_sec": iterations / max(reference_time, 1e-9),
+                "elapsed": time.time() - begin,
+            }
+            log(f"{target.name}: {iterations} inputs, {len(interesting)} classes, "
+                f"{len(cases)} on cairo, {len(minimized)} divergences ({time.time() - begin:.1f}s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return report
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Fuzzes the cairo math libraries against their python references")
+    parser.add_argument("--iterations", type=int, default=1000000, help="reference inputs per target")
+    parser.add_argument("--sample", type=int, default=100, help="random inputs per target also run on cairo")
+    parser.add_argument("--max-cases", type=int, default=MAX_CASES, help="interesting inputs per target run on cairo")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random inputs")
+    parser.add_argument("--only", default=None, help="only fuzzes the targets starting with this prefix")
+    parser.add_argument("--no-save", action="store_true", help="does not save the divergences as regressions")
+    args = parser.parse_args(argv[1:])
+
+    report = fuzz(args.iterations, args.sample, args.workers, args.seed, args.only, not args.no_save, args.max_cases)
+    failed = False
+    for name, item in report.items():
+        for args_, expected, res in item["divergences"]:
+            failed = True
+            print(f"DIVERGENCE {name}{tuple(args_)}: reference {expected}, cairo {res}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -13,6 +13,14 @@ func flip_tick{
     return ();
 }
 
+@external
+func sync_summary{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
+}(word_pos: felt) {
+    TickBitmap.sync_summary(word_pos);
+    return ();
+}
+
 @view
 func next_valid_tick_within_one_word{
     syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
@@ -23,6 +31,14 @@ func next_valid_tick_within_one_word{
     return (tick_next, initialized);
 }
 
+@view
+func next_valid_tick{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
+}(tick: felt, tick_spacing: felt, lte: felt) -> (tick_next: felt, initialized: felt) {
+    let (tick_next, initialized) = TickBitmap.next_valid_tick(tick, tick_spacing, lte);
+    return (tick_next, initialized);
+}
+
 @view
 func is_initialized{
     syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr, bitwise_ptr: BitwiseBuiltin*
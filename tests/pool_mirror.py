@@ -0,0 +1,160 @@
+"""Off-chain mirror of the tick state of a swap pool, maintained from its events.
+
+`PoolStateMirror` keeps a `SwapPoolSimulator` (tests/reference/swap_pool.py) of
+one pool in sync with the events the pool emits, decoded by
+tests/event_store.py:
+
+* InitializePrice sets the price and its tick,
+* AddLiquidity / RemoveLiquidity run `TickMgr.update` on both ticks, flip
+  them in the bitmap like `TickBitmap.flip_tick`, clear the ticks a removal
+  uninitialized and update the in-range liquidity, as `_modify_position`,
+* Swap replays the swap, which crosses ticks with `TickMgr.cross`, and checks
+  its price, tick, liquidity and amounts against the event, since the events
+  carry no fee growth,
+* SetFeeProtocol / CollectProtocol update the protocol fee state.
+
+Quotes are then `mirror.simulator.get_swap_results(...)`, without a view call
+per tick. `checkpoint` pickles the mirror with the (block, event index) of
+the last applied event, a restored mirror skips the events up to it so a
+restart resumes from the checkpoint instead of the pool's first event.
+"""
+
+import os
+import pickle
+
+from event_store import EventDecoder, iter_events
+from reference.swap_pool import SwapPoolSimulator
+from reference.tick_mgr import get_max_liquidity_per_tick, u128_safe_add
+from reference.tickmath import get_tick_at_sqrt_ratio
+
+CHECKPOINT_VERSION = 1
+
+
+class MirrorError(Exception):
+    pass
+
+
+class PoolStateMirror:
+
+    def __init__(self, pool, tick_spacing, fee, simulator=None):
+        self.pool = pool
+        self.tick_spacing = tick_spacing
+        self.max_liquidity_per_tick = get_max_liquidity_per_tick(tick_spacing)
+        self.simulator = simulator or SwapPoolSimulator(0, 0, 0, tick_spacing, fee)
+        # (block_number, event_index) of the last applied event, None before the first one
+        self.position = None
+        self.decoder = EventDecoder()
+
+    def apply(self, name, row):
+        """Applies a decoded event of the pool, returns False if it was applied before the checkpoint"""
+        if 'block_number' in row:
+            position = (row['block_number'], row['event_index'])
+            if self.position is not None and position <= self.position:
+                return False
+            self.position = position
+
+        handler = getattr(self, f'_apply_{name}', None)
+        if handler is not None:
+            handler(row)
+        return True
+
+    def apply_raw(self, from_address, keys, data, block_number=None, event_index=None):
+        """Decodes and applies a raw event, events of other contracts are ignored"""
+        if from_address != self.pool:
+            return False
+        decoded = self.decoder.decode(from_address, keys, data)
+        if decoded is None:
+            return False
+        name, _, row = decoded
+        if block_number is not None:
+            row['block_number'], row['event_index'] = block_number, event_index
+        return self.apply(name, row)
+
+    def apply_execution_info(self, execution_info):
+        for event in iter_events(execution_info):
+            self.apply_raw(event.from_address, event.keys, event.data)
+
+    def apply_store(self, store):
+        """Applies the events of the pool in an EventStore, in (block, event index) order"""
+        rows = []
+        for name in ['Initializer', 'InitializePrice', 'AddLiquidity', 'RemoveLiquidity', 'Swap', 'SetFeeProtocol', 'CollectProtocol']:
+            for partition in store.partitions(name, pool=self.pool):
+                columns = {column: partition.read(column) for column, _ in partition.columns}
+                for i in range(partition.rows):
+                    rows.append((columns['block_number'][i], columns['event_index'][i], name, {column: values[i] for column, values in columns.items()}))
+        rows.sort(key=lambda item: item[:2])
+        return sum(self.apply(name, row) for _, _, name, row in rows)
+
+    def _apply_Initializer(self, row):
+        self.tick_spacing = self.simulator.tick_spacing = row['tick_spacing']
+        self.simulator.fee = row['fee']
+        self.max_liquidity_per_tick = get_max_liquidity_per_tick(row['tick_spacing'])
+
+    def _apply_InitializePrice(self, row):
+        self.simulator.sqrt_price_x96 = row['sqrt_price_x96']
+        self.simulator.tick = get_tick_at_sqrt_ratio(row['sqrt_price_x96'])
+
+    def _modify_position(self, tick_lower, tick_upper, liquidity_delta):
+        sim = self.simulator
+        if liquidity_delta == 0:
+            return
+
+        flipped = []
+        for tick, upper in [(tick_lower, False), (tick_upper, True)]:
+            if sim.tick_mgr.update(
+                tick, sim.tick, liquidity_delta, sim.fee_growth_global0_x128, sim.fee_growth_global1_x128,
+                upper, self.max_liquidity_per_tick
+            ):
+                sim.bitmap.flip_tick(tick, self.tick_spacing)
+                flipped.append(tick)
+
+        if liquidity_delta < 0:
+            for tick in flipped:
+                sim.tick_mgr.clear(tick)
+
+        if tick_lower <= sim.tick < tick_upper:
+            sim.liquidity = u128_safe_add(sim.liquidity, liquidity_delta)
+
+    def _apply_AddLiquidity(self, row):
+        self._modify_position(row['tick_lower'], row['tick_upper'], row['amount'])
+
+    def _apply_RemoveLiquidity(self, row):
+        self._modify_position(row['tick_lower'], row['tick_upper'], -row['amount'])
+
+    def _apply_Swap(self, row):
+        result = self.simulator.swap(row['zero_for_one'] == 1, row['amount_specified'], row['sqrt_price_limit_x96'])
+        expected = (row['sqrt_price_x96'], row['tick'], row['liquidity'], row['amount0'], row['amount1'])
+        actual = (result.sqrt_price_x96, result.tick, result.liquidity, result.amount0, result.amount1)
+        if actual != expected:
+            # the replay already moved the mirror, restore it from a checkpoint
+            raise MirrorError(f"swap at {self.position} replayed to {actual}, the event has {expected}")
+
+    def _apply_SetFeeProtocol(self, row):
+        self.simulator.fee_protocol0 = row['fee_protocol0']
+        self.simulator.fee_protocol1 = row['fee_protocol1']
+
+    def _apply_CollectProtocol(self, row):
+        self.simulator.protocol_fee_token0 -= row['amount0']
+        self.simulator.protocol_fee_token1 -= row['amount1']
+
+    def initialized_ticks(self):
+        """{tick: TickInfo} of the initialized ticks, in tick order"""
+        return {tick: self.simulator.tick_mgr.get_tick(tick) for tick in sorted(self.simulator.tick_mgr.ticks)}
+
+    def checkpoint(self, path):
+        """Pickles the mirror, atomically replacing the previous checkpoint"""
+        state = (CHECKPOINT_VERSION, self.pool, self.tick_spacing, self.position, self.simulator)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def restore(cls, path):
+        with open(path, 'rb') as f:
+            version, pool, tick_spacing, position, simulator = pickle.load(f)
+        if version != CHECKPOINT_VERSION:
+            raise MirrorError(f"checkpoint version {version}, expected {CHECKPOINT_VERSION}")
+        mirror = cls(pool, tick_spacing, simulator.fee, simulator)
+        mirror.position = position
+        return mirror
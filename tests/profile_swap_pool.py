@@ -0,0 +1,309 @@
+"""Execution resources profile of the entry points of contracts/swap_pool.cairo.
+
+Runs the external functions of SwapPool over a matrix of scenarios (swaps
+crossing 0/1/10/100 initialized ticks, adding and removing liquidity in and out
+of range, collecting, ...), each on a fork of a swap pool snapshot, and records
+the Cairo steps, builtin usage, storage accesses and contract calls of every
+call into a JSON report. A report diffed against a baseline report shows cost regressions.
+
+Usage:
+
+    python tests/profile_swap_pool.py [--out REPORT] [--baseline REPORT]
+                                      [--threshold PCT] [--only SUBSTRING]
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import sys
+import time
+
+from reference.tickmath import get_sqrt_ratio_at_tick
+from snapshots import snapshot, fork, fork_state, address
+from starkware.starknet.definitions.general_config import StarknetGeneralConfig
+from starkware.starknet.testing.starknet import Starknet
+from utils import (
+    MAX_UINT128, to_uint, cached_contract, int_to_felt, encode_price_sqrt, get_max_tick,
+    TICK_SPACINGS, FeeAmount, expand_to_18decimals
+)
+
+METRICS = ['n_steps', 'n_memory_holes', 'range_check', 'bitwise', 'pedersen', 'storage_reads', 'storage_writes', 'contract_calls']
+
+# initialized ticks crossed by the swap scenarios
+CROSSED_TICKS = [0, 1, 10, 100]
+
+# step limit of the profiled calls, calls above the network limit are still measured and reported
+PROFILE_MAX_STEPS = 10 ** 8
+
+tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+max_tick = get_max_tick(tick_spacing)
+
+POSITION_LIQUIDITY = expand_to_18decimals(1)
+# in range and out of range (above the price) positions of the `swap_pool.positions` snapshot
+IN_RANGE = (-tick_spacing * 2, tick_spacing * 2)
+OUT_OF_RANGE = (tick_spacing * 10, tick_spacing * 20)
+
+_scenarios = []
+
+
+class ProfiledPool:
+    """The contracts of a scenario, bound to a fork of its snapshot"""
+
+    def __init__(self, starknet, info):
+        self.info = info
+        self.bind(starknet)
+
+    def bind(self, starknet):
+        self.starknet = starknet
+        state = starknet.state
+        self.swap_pool = cached_contract(state, self.info['contract_def'], self.info['contract'])
+        self.swap_target = cached_contract(state, self.info['swap_target_def'], self.info['swap_target'])
+        self.token0 = cached_contract(state, self.info['token0_def'], self.info['token0'])
+        self.token1 = cached_contract(state, self.info['token1_def'], self.info['token1'])
+
+    def checkpoint(self):
+        """Forks the current state, storage written by the scenario before the checkpoint is not counted"""
+        state = fork_state(self.starknet.state)
+        state.general_config = dataclasses.replace(state.general_config, invoke_tx_max_n_steps=PROFILE_MAX_STEPS)
+        self.bind(Starknet(state))
+
+    def storage_writes(self):
+        return len(self.starknet.state.state.cache._storage_writes)
+
+    async def run(self, invocation, caller_address=0):
+        """Executes a contract function invocation on the fork, returns the raw CallInfo
+
+        `execute()` only returns the lean FunctionInvocation, which has no storage reads.
+        """
+        return await self.starknet.state.execute_entry_point_raw(
+            contract_address=invocation.contract_address,
+            selector=invocation.name,
+            calldata=invocation.calldata,
+            caller_address=caller_address,
+        )
+
+    async def swap(self, zero_for_one, amount, sqrt_price_limit):
+        token0, token1 = self.token0.contract_address, self.token1.contract_address
+        path = [token0, FeeAmount.MEDIUM, token1] if zero_for_one else [token1, FeeAmount.MEDIUM, token0]
+        return await self.run(self.swap_target.swap(address, zero_for_one, to_uint(amount), to_uint(sqrt_price_limit), self.swap_pool.contract_address, path), address)
+
+    async def add_liquidity(self, tick_lower, tick_upper, liquidity):
+        return await self.run(self.swap_target.add_liquidity(address, int_to_felt(tick_lower), int_to_felt(tick_upper), liquidity, self.swap_pool.contract_address), address)
+
+
+def scenario(name, snapshot_name):
+    """Registers `async def scenario(pool) -> CallInfo` (see `ProfiledPool.run`) run on a fork of `snapshot_name`"""
+    def register(func):
+        _scenarios.append((name, snapshot_name, func))
+        return func
+    return register
+
+
+def iter_call_infos(call_info):
+    yield call_info
+    for internal_call in call_info.internal_calls:
+        yield from iter_call_infos(internal_call)
+
+
+def call_metrics(call_info, storage_writes):
+    """Resources of a call including its internal calls, storage_writes is the number of storage keys written"""
+    resources = call_info.execution_resources
+    builtins = resources.builtin_instance_counter
+    return {
+        'n_steps': resources.n_steps,
+        'n_memory_holes': resources.n_memory_holes,
+        'range_check': builtins.get('range_check_builtin', 0),
+        'bitwise': builtins.get('bitwise_builtin', 0),
+        'pedersen': builtins.get('pedersen_builtin', 0),
+        'storage_reads': sum(len(call.storage_read_values) for call in iter_call_infos(call_info)),
+        'storage_writes': storage_writes,
+        # calls to other contracts, i.e. token transfers, balanceOf and callbacks
+        'contract_calls': sum(1 for _ in iter_call_infos(call_info)) - 1,
+    }
+
+
+async def profile(only=None):
+    """Runs the scenarios whose name contains `only` (all if None), returns the report {scenario: metrics}"""
+    report = {}
+    max_n_steps = StarknetGeneralConfig().invoke_tx_max_n_steps
+    for name, snapshot_name, func in _scenarios:
+        if only and only not in name:
+            continue
+        pool = ProfiledPool(*await fork(snapshot_name))
+        pool.checkpoint()
+        begin = time.time()
+        res = await func(pool)
+        print(f'profile {name} time:', time.time() - begin)
+        report[name] = call_metrics(res, pool.storage_writes())
+        if report[name]['n_steps'] > max_n_steps:
+            print(f'profile {name} exceeds the step limit: {report[name]["n_steps"]} > {max_n_steps}')
+    return report
+
+
+def diff_reports(baseline, report, threshold=0):
+    """Returns [(scenario, metric, baseline value, value)] of the metrics that changed by more than `threshold` percent"""
+    changes = []
+    for name in sorted(set(baseline) | set(report)):
+        old, new = baseline.get(name, {}), report.get(name, {})
+        for metric in METRICS:
+            a, b = old.get(metric), new.get(metric)
+            if a == b:
+                continue
+            if a is not None and b is not None and a != 0 and abs(b - a) * 100 <= threshold * a:
+                continue
+            changes.append((name, metric, a, b))
+    return changes
+
+
+# snapshots
+
+def build_ticks_below(n_from, n_to):
+    """Positions [-k * tick_spacing, max_tick) for k in (n_from, n_to], swapping down from tick 0 crosses their lower ticks"""
+    async def build(starknet, info):
+        pool = ProfiledPool(starknet, info)
+        for k in range(n_from + 1, n_to + 1):
+            await pool.add_liquidity(-k * tick_spacing, max_tick, POSITION_LIQUIDITY)
+    return build
+
+
+for i in range(1, len(CROSSED_TICKS)):
+    parent = f'swap_pool.ticks_below_{CROSSED_TICKS[i - 1]}' if i > 1 else 'swap_pool.zero_tick'
+    snapshot(f'swap_pool.ticks_below_{CROSSED_TICKS[i]}', parent=parent)(build_ticks_below(CROSSED_TICKS[i - 1], CROSSED_TICKS[i]))
+
+
+@snapshot('swap_pool.positions', parent='swap_pool.zero_tick')
+async def build_positions(starknet, info):
+    pool = ProfiledPool(starknet, info)
+    await pool.add_liquidity(*IN_RANGE, POSITION_LIQUIDITY)
+    await pool.add_liquidity(*OUT_OF_RANGE, POSITION_LIQUIDITY)
+    await pool.swap(True, expand_to_18decimals(1) // 100, get_sqrt_ratio_at_tick(-tick_spacing))
+    await pool.swap(False, expand_to_18decimals(1) // 100, get_sqrt_ratio_at_tick(tick_spacing))
+
+
+# scenarios
+
+def ticks_below_snapshot(n):
+    return f'swap_pool.ticks_below_{n}' if n else 'swap_pool.zero_tick'
+
+
+def crossing_limit(n):
+    """The price limit half a tick spacing below the n-th initialized tick under tick 0"""
+    return get_sqrt_ratio_at_tick(-n * tick_spacing - tick_spacing // 2)
+
+
+def register_crossing_scenarios(n):
+    @scenario(f'swap_cross_{n}_ticks', ticks_below_snapshot(n))
+    async def swap_cross(pool):
+        return await pool.swap(True, expand_to_18decimals(1000), crossing_limit(n))
+
+    @scenario(f'get_swap_results_cross_{n}_ticks', ticks_below_snapshot(n))
+    async def get_swap_results_cross(pool):
+        return await pool.run(pool.swap_pool.get_swap_results(1, to_uint(expand_to_18decimals(1000)), to_uint(crossing_limit(n))))
+
+
+for n in CROSSED_TICKS:
+    register_crossing_scenarios(n)
+
+
+@scenario('initialize_price', 'swap_pool')
+async def initialize_price(pool):
+    return await pool.run(pool.swap_pool.initialize_price(encode_price_sqrt(1, 1)))
+
+
+@scenario('set_fee_protocol', 'swap_pool.zero_tick')
+async def set_fee_protocol(pool):
+    return await pool.run(pool.swap_pool.set_fee_protocol(2000, 1250), address)
+
+
+@scenario('add_liquidity_in_range', 'swap_pool.zero_tick')
+async def add_liquidity_in_range(pool):
+    return await pool.add_liquidity(*IN_RANGE, POSITION_LIQUIDITY)
+
+
+@scenario('add_liquidity_out_of_range', 'swap_pool.zero_tick')
+async def add_liquidity_out_of_range(pool):
+    return await pool.add_liquidity(*OUT_OF_RANGE, POSITION_LIQUIDITY)
+
+
+@scenario('add_liquidity_in_range_existing_position', 'swap_pool.positions')
+async def add_liquidity_in_range_existing_position(pool):
+    return await pool.add_liquidity(*IN_RANGE, POSITION_LIQUIDITY)
+
+
+@scenario('remove_liquidity_in_range', 'swap_pool.positions')
+async def remove_liquidity_in_range(pool):
+    tick_lower, tick_upper = IN_RANGE
+    return await pool.run(pool.swap_pool.remove_liquidity(int_to_felt(tick_lower), int_to_felt(tick_upper), POSITION_LIQUIDITY // 2), address)
+
+
+@scenario('remove_liquidity_out_of_range', 'swap_pool.positions')
+async def remove_liquidity_out_of_range(pool):
+    tick_lower, tick_upper = OUT_OF_RANGE
+    return await pool.run(pool.swap_pool.remove_liquidity(int_to_felt(tick_lower), int_to_felt(tick_upper), POSITION_LIQUIDITY // 2), address)
+
+
+@scenario('remove_liquidity_in_range_all', 'swap_pool.positions')
+async def remove_liquidity_in_range_all(pool):
+    tick_lower, tick_upper = IN_RANGE
+    return await pool.run(pool.swap_pool.remove_liquidity(int_to_felt(tick_lower), int_to_felt(tick_upper), POSITION_LIQUIDITY), address)
+
+
+@scenario('collect', 'swap_pool.positions')
+async def collect(pool):
+    tick_lower, tick_upper = IN_RANGE
+    await pool.swap_pool.remove_liquidity(int_to_felt(tick_lower), int_to_felt(tick_upper), POSITION_LIQUIDITY).execute(caller_address=address)
+    pool.checkpoint()
+    return await pool.run(pool.swap_pool.collect(address, int_to_felt(tick_lower), int_to_felt(tick_upper), MAX_UINT128, MAX_UINT128), address)
+
+
+@scenario('collect_protocol', 'swap_pool.zero_tick')
+async def collect_protocol(pool):
+    await pool.swap_pool.set_fee_protocol(2000, 2000).execute(caller_address=address)
+    await pool.swap(True, expand_to_18decimals(1) // 100, get_sqrt_ratio_at_tick(-tick_spacing))
+    pool.checkpoint()
+    return await pool.run(pool.swap_pool.collect_protocol(address, MAX_UINT128, MAX_UINT128), address)
+
+
+@scenario('sync', 'swap_pool.zero_tick')
+async def sync(pool):
+    return await pool.run(pool.swap_pool.sync(), address)
+
+
+@scenario('skim', 'swap_pool.zero_tick')
+async def skim(pool):
+    await pool.token0.transfer(pool.swap_pool.contract_address, to_uint(1000)).execute(caller_address=address)
+    pool.checkpoint()
+    return await pool.run(pool.swap_pool.skim(address), address)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Profiles the execution resources of the swap pool entry points")
+    parser.add_argument("--out", default=None, help="writes the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="diffs the report against this JSON report")
+    parser.add_argument("--threshold", type=float, default=0, help="ignores changes below this percentage")
+    parser.add_argument("--only", default=None, help="runs the scenarios whose name contains this")
+    args = parser.parse_args(argv[1:])
+
+    report = asyncio.run(profile(args.only))
+    for name, metrics in report.items():
+        print(f"{name}: " + " ".join(f"{metric}={metrics[metric]}" for metric in METRICS))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if args.only:
+            baseline = {name: metrics for name, metrics in baseline.items() if args.only in name}
+        changes = diff_reports(baseline, report, args.threshold)
+        for name, metric, old, new in changes:
+            print(f"changed {name} {metric}: {old} -> {new}")
+        regressions = [change for change in changes if change[2] is not None and change[3] is not None and change[3] > change[2]]
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
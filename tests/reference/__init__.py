@@ -0,0 +1 @@
+"""Pure python ports of the cairo libraries under contracts/, bit-exact with the contracts."""
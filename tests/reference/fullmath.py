@@ -0,0 +1,34 @@
+"""Bit-exact python port of contracts/fullmath.cairo."""
+
+MAX_UINT256 = 2 ** 256 - 1
+
+
+def mul_div(a, b, c):
+    """Returns (a * b // c, a * b % c) as FullMath.uint256_mul_div."""
+    if c == 0:
+        raise ValueError("denominator is zero")
+
+    res, rem = divmod(a * b, c)
+    if res > MAX_UINT256:
+        raise ValueError("overflows uint256")
+    return res, rem
+
+
+def mul_div_roundingup(a, b, c):
+    res, rem = mul_div(a, b, c)
+    if rem > 0:
+        if res >= MAX_UINT256:
+            raise ValueError("overflows uint256")
+        res += 1
+    return res
+
+
+def div_roundingup(a, b):
+    """Same as FullMath.uint256_div_roundingup, a zero divisor returns 0."""
+    if b == 0:
+        return 0
+
+    res, rem = divmod(a, b)
+    if rem > 0:
+        res += 1
+    return res
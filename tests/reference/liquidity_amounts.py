@@ -0,0 +1,74 @@
+"""Bit-exact python port of contracts/liquidity_amounts.cairo.
+
+Prices and amounts are plain ints in [0, 2 ** 256), liquidity is a uint128.
+Like the contract, `sqrt_ratio1 - sqrt_ratio0` wraps around when the ratios are
+not sorted, and a division by a zero ratio (uint256_unsigned_div_rem) returns 0.
+"""
+
+from reference.fullmath import MAX_UINT256, mul_div
+
+Q96 = 2 ** 96
+MAX_UINT128 = 2 ** 128 - 1
+
+
+def _sort(sqrt_ratio_a, sqrt_ratio_b):
+    if sqrt_ratio_b < sqrt_ratio_a:
+        return sqrt_ratio_b, sqrt_ratio_a
+    return sqrt_ratio_a, sqrt_ratio_b
+
+
+def get_amount0_for_liquidity(sqrt_ratio0, sqrt_ratio1, liquidity):
+    tmp, _ = mul_div((liquidity << 96) & MAX_UINT256, (sqrt_ratio1 - sqrt_ratio0) & MAX_UINT256, sqrt_ratio1)
+    if sqrt_ratio0 == 0:
+        return 0
+    return tmp // sqrt_ratio0
+
+
+def get_amount1_for_liquidity(sqrt_ratio0, sqrt_ratio1, liquidity):
+    amount1, _ = mul_div(liquidity, (sqrt_ratio1 - sqrt_ratio0) & MAX_UINT256, Q96)
+    return amount1
+
+
+def get_amounts_for_liquidity(sqrt_ratio, sqrt_ratio_a, sqrt_ratio_b, liquidity):
+    """Returns (amount0, amount1) as LiquidityAmounts.get_amounts_for_liquidity."""
+    sqrt_ratio0, sqrt_ratio1 = _sort(sqrt_ratio_a, sqrt_ratio_b)
+
+    if sqrt_ratio <= sqrt_ratio0:
+        return get_amount0_for_liquidity(sqrt_ratio0, sqrt_ratio1, liquidity), 0
+
+    if sqrt_ratio < sqrt_ratio1:
+        return get_amount0_for_liquidity(sqrt_ratio, sqrt_ratio1, liquidity), get_amount1_for_liquidity(sqrt_ratio0, sqrt_ratio, liquidity)
+
+    return 0, get_amount1_for_liquidity(sqrt_ratio0, sqrt_ratio1, liquidity)
+
+
+def _to_liquidity(value):
+    if value > MAX_UINT128:
+        raise ValueError("liquidity overflows uint128")
+    return value
+
+
+def get_liquidity_for_amount0(sqrt_ratio0, sqrt_ratio1, amount0):
+    tmp, _ = mul_div(sqrt_ratio0, sqrt_ratio1, Q96)
+    liquidity, _ = mul_div(amount0, tmp, (sqrt_ratio1 - sqrt_ratio0) & MAX_UINT256)
+    return _to_liquidity(liquidity)
+
+
+def get_liquidity_for_amount1(sqrt_ratio0, sqrt_ratio1, amount1):
+    liquidity, _ = mul_div(amount1, Q96, (sqrt_ratio1 - sqrt_ratio0) & MAX_UINT256)
+    return _to_liquidity(liquidity)
+
+
+def get_liquidity_for_amounts(sqrt_ratio, sqrt_ratio_a, sqrt_ratio_b, amount0, amount1):
+    """Returns the liquidity as LiquidityAmounts.get_liquidity_for_amounts."""
+    sqrt_ratio0, sqrt_ratio1 = _sort(sqrt_ratio_a, sqrt_ratio_b)
+
+    if sqrt_ratio <= sqrt_ratio0:
+        return get_liquidity_for_amount0(sqrt_ratio0, sqrt_ratio1, amount0)
+
+    if sqrt_ratio < sqrt_ratio1:
+        liquidity0 = get_liquidity_for_amount0(sqrt_ratio, sqrt_ratio1, amount0)
+        liquidity1 = get_liquidity_for_amount1(sqrt_ratio0, sqrt_ratio, amount1)
+        return min(liquidity0, liquidity1)
+
+    return get_liquidity_for_amount1(sqrt_ratio0, sqrt_ratio1, amount1)
@@ -0,0 +1,125 @@
+"""Bit-exact python port of contracts/sqrt_price_math.cairo.
+
+Prices and amounts are plain ints in [0, 2 ** 256), liquidity is the felt
+value as a signed int. The `*_delta2` variants return the signed amount, use
+`to_uint256` to get the two's complement value returned by the contract.
+"""
+
+from reference.fullmath import MAX_UINT256, mul_div, mul_div_roundingup, div_roundingup
+
+Q96 = 2 ** 96
+MAX_UINT160 = 2 ** 160 - 1
+
+
+def to_uint256(value):
+    """Two's complement encoding of a signed amount, as uint256_neg."""
+    return value & MAX_UINT256
+
+
+def _sort(sqrt_ratio0_x96, sqrt_ratio1_x96):
+    if sqrt_ratio1_x96 < sqrt_ratio0_x96:
+        return sqrt_ratio1_x96, sqrt_ratio0_x96
+    return sqrt_ratio0_x96, sqrt_ratio1_x96
+
+
+def get_amount0_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, roundup):
+    price_a, price_b = _sort(sqrt_ratio0_x96, sqrt_ratio1_x96)
+
+    numerator1 = (liquidity << 96) & MAX_UINT256
+    numerator2 = price_b - price_a
+
+    if price_a == 0:
+        raise ValueError("price_a must be greater than 0")
+
+    if roundup:
+        return div_roundingup(mul_div_roundingup(numerator1, numerator2, price_b), price_a)
+
+    tmp, _ = mul_div(numerator1, numerator2, price_b)
+    return tmp // price_a
+
+
+def get_amount0_delta2(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity):
+    if liquidity < 0:
+        return -get_amount0_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, -liquidity, False)
+    return get_amount0_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, True)
+
+
+def get_amount1_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, roundup):
+    price_a, price_b = _sort(sqrt_ratio0_x96, sqrt_ratio1_x96)
+
+    if roundup:
+        return mul_div_roundingup(liquidity, price_b - price_a, Q96)
+
+    delta, _ = mul_div(liquidity, price_b - price_a, Q96)
+    return delta
+
+
+def get_amount1_delta2(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity):
+    if liquidity < 0:
+        return -get_amount1_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, -liquidity, False)
+    return get_amount1_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, True)
+
+
+def get_next_sqrt_price_from_amount0_roundingup(sqrt_price_x96, liquidity, amount, add):
+    if amount == 0:
+        return sqrt_price_x96
+
+    numerator1 = (liquidity << 96) & MAX_UINT256
+
+    product = (amount * sqrt_price_x96) & MAX_UINT256
+    not_overflow = product // amount == sqrt_price_x96
+
+    if add:
+        if not_overflow:
+            denominator = (numerator1 + product) & MAX_UINT256
+            if numerator1 <= denominator:
+                return mul_div_roundingup(numerator1, sqrt_price_x96, denominator)
+
+        return div_roundingup(numerator1, (numerator1 // sqrt_price_x96 + amount) & MAX_UINT256)
+
+    if not not_overflow or product >= numerator1:
+        raise ValueError("price overflow")
+
+    return mul_div_roundingup(numerator1, sqrt_price_x96, numerator1 - product)
+
+
+def get_next_sqrt_price_from_amount1_roundingdown(sqrt_price_x96, liquidity, amount, add):
+    # in both cases, avoid a mulDiv for most inputs
+    if add:
+        if amount <= MAX_UINT160:
+            quotient = (amount << 96) // liquidity
+        else:
+            quotient, _ = mul_div(amount, Q96, liquidity)
+        return (sqrt_price_x96 + quotient) & MAX_UINT256
+
+    if amount <= MAX_UINT160:
+        quotient = div_roundingup(amount << 96, liquidity)
+    else:
+        quotient = mul_div_roundingup(amount, Q96, liquidity)
+
+    if quotient >= sqrt_price_x96:
+        raise ValueError("price underflow")
+    return sqrt_price_x96 - quotient
+
+
+def _check_inputs(sqrt_price_x96, liquidity):
+    if sqrt_price_x96 <= 0:
+        raise ValueError("sqrt_price_x96 must be greater than 0")
+    if liquidity <= 0:
+        raise ValueError("liquidity must be greater than 0")
+
+
+def get_next_sqrt_price_from_input(sqrt_price_x96, liquidity, amount_in, zero_for_one):
+    _check_inputs(sqrt_price_x96, liquidity)
+
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount0_roundingup(sqrt_price_x96, liquidity, amount_in, True)
+    return get_next_sqrt_price_from_amount1_roundingdown(sqrt_price_x96, liquidity, amount_in, True)
+
+
+def get_next_sqrt_price_from_output(sqrt_price_x96, liquidity, amount_out, zero_for_one):
+    _check_inputs(sqrt_price_x96, liquidity)
+
+    if zero_for_one:
+        return get_next_sqrt_price_from_amount1_roundingdown(sqrt_price_x96, liquidity, amount_out, False)
+    return get_next_sqrt_price_from_amount0_roundingup(sqrt_price_x96, liquidity, amount_out, False)
@@ -0,0 +1,132 @@
+"""Vectorized SqrtPriceMath amount deltas over arrays of positions.
+
+256-bit values are passed and returned as `(low, high)` pairs of limb arrays,
+the same split as `Uint256`. Limbs may be any integer array (or sequence);
+internally they are joined into object arrays of python ints so every
+operation is exact, and the rounding follows contracts/sqrt_price_math.cairo
+bit for bit, see reference/sqrt_price_math.py for the scalar version.
+
+`liquidity` is an array of felts as signed ints, `roundup` a bool or bool
+array broadcast against the prices. A row that would make the contract revert
+raises ValueError naming the first offending index.
+
+    amount0_low, amount0_high = get_amount0_delta(
+        (price_lower_low, price_lower_high), (price_upper_low, price_upper_high), liquidity, True
+    )
+"""
+
+import numpy as np
+
+from reference.fullmath import MAX_UINT256
+
+Q96 = 2 ** 96
+MAX_UINT128 = 2 ** 128 - 1
+
+
+def join(limbs):
+    """(low, high) limb arrays -> object array of python ints."""
+    low, high = limbs
+    low = np.asarray(low).astype(object)
+    high = np.asarray(high).astype(object)
+    return low + (high << 128)
+
+
+def split(values):
+    """Object array of python ints in [0, 2 ** 256) -> (low, high) limb arrays."""
+    values = np.asarray(values, dtype=object)
+    return values & MAX_UINT128, values >> 128
+
+
+def _as_int_array(values):
+    return np.asarray(values).astype(object)
+
+
+def _check(invalid, message):
+    invalid = np.asarray(invalid, dtype=bool)
+    if invalid.any():
+        index = np.flatnonzero(invalid)[0]
+        raise ValueError(f"{message} at index {index}")
+
+
+def _mul_div(a, b, c, roundup):
+    """FullMath.uint256_mul_div and uint256_mul_div_roundingup selected per row by `roundup`."""
+    _check(c == 0, "denominator is zero")
+
+    prod = a * b
+    res = prod // c
+    _check(res > MAX_UINT256, "overflows uint256")
+
+    rounded = roundup & np.asarray(prod - res * c > 0, dtype=bool)
+    _check(rounded & (res >= MAX_UINT256), "overflows uint256")
+    return np.where(rounded, res + 1, res)
+
+
+def _div_roundingup(a, b):
+    """FullMath.uint256_div_roundingup, zero divisors return 0."""
+    zero = b == 0
+    b = np.where(zero, 1, b)
+    res = a // b
+    res = np.where(np.asarray(a - res * b > 0, dtype=bool), res + 1, res)
+    return np.where(zero, 0, res)
+
+
+def _sort(sqrt_ratio0_x96, sqrt_ratio1_x96):
+    p0 = join(sqrt_ratio0_x96)
+    p1 = join(sqrt_ratio1_x96)
+    swap = np.asarray(p1 < p0, dtype=bool)
+    return np.where(swap, p1, p0), np.where(swap, p0, p1)
+
+
+def _amount0_delta(price_a, price_b, liquidity, roundup):
+    _check(price_a == 0, "price_a must be greater than 0")
+
+    numerator1 = (liquidity << 96) & MAX_UINT256
+    numerator2 = price_b - price_a
+
+    tmp = _mul_div(numerator1, numerator2, price_b, roundup)
+    return np.where(roundup, _div_roundingup(tmp, price_a), tmp // price_a)
+
+
+def _amount1_delta(price_a, price_b, liquidity, roundup):
+    return _mul_div(liquidity, price_b - price_a, np.full(price_a.shape, Q96, dtype=object), roundup)
+
+
+def _broadcast(price_a, price_b, liquidity, roundup):
+    liquidity = _as_int_array(liquidity)
+    roundup = np.asarray(roundup, dtype=bool)
+    price_a, price_b, liquidity, roundup = np.broadcast_arrays(price_a, price_b, liquidity, roundup)
+    return price_a, price_b, liquidity, roundup
+
+
+def get_amount0_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, roundup):
+    """Batch SqrtPriceMath.get_amount0_delta, returns (low, high) limb arrays."""
+    price_a, price_b = _sort(sqrt_ratio0_x96, sqrt_ratio1_x96)
+    price_a, price_b, liquidity, roundup = _broadcast(price_a, price_b, liquidity, roundup)
+    return split(_amount0_delta(price_a, price_b, liquidity, roundup))
+
+
+def get_amount1_delta(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity, roundup):
+    """Batch SqrtPriceMath.get_amount1_delta, returns (low, high) limb arrays."""
+    price_a, price_b = _sort(sqrt_ratio0_x96, sqrt_ratio1_x96)
+    price_a, price_b, liquidity, roundup = _broadcast(price_a, price_b, liquidity, roundup)
+    return split(_amount1_delta(price_a, price_b, liquidity, roundup))
+
+
+def _delta2(func, sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity):
+    price_a, price_b = _sort(sqrt_ratio0_x96, sqrt_ratio1_x96)
+    negative = np.asarray(_as_int_array(liquidity) < 0, dtype=bool)
+    price_a, price_b, liquidity, negative = _broadcast(price_a, price_b, liquidity, negative)
+
+    # negative liquidity rounds down and returns uint256_neg of the amount
+    amount = func(price_a, price_b, np.where(negative, -liquidity, liquidity), ~negative)
+    return split(np.where(negative, (-amount) & MAX_UINT256, amount))
+
+
+def get_amount0_delta2(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity):
+    """Batch SqrtPriceMath.get_amount0_delta2, negative amounts are two's complement limbs."""
+    return _delta2(_amount0_delta, sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity)
+
+
+def get_amount1_delta2(sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity):
+    """Batch SqrtPriceMath.get_amount1_delta2, negative amounts are two's complement limbs."""
+    return _delta2(_amount1_delta, sqrt_ratio0_x96, sqrt_ratio1_x96, liquidity)
@@ -0,0 +1,217 @@
+"""Python simulator of the swap loop of contracts/swap_pool.cairo.
+
+`SwapPoolSimulator` mirrors `get_swap_results` / `swap`: the `_compute_swap_step`
+recursion over `TickBitmap.next_valid_tick`,
+`SwapMath.compute_swap_step` and `TickMgr.cross`, with the same rounding,
+protocol fee and fee growth accounting, so quotes match the contract bit for
+bit without going through the Cairo VM.
+
+Amounts are int256 values as signed ints, e.g. `amount0 < 0` means token0
+leaves the pool; use `sqrt_price_math.to_uint256` to compare with the
+`Uint256` returned by the contract.
+"""
+
+from dataclasses import dataclass, field
+from typing import List
+
+from reference.fullmath import MAX_UINT256, mul_div
+from reference.swapmath import compute_swap_step
+from reference.tick_bitmap import TickBitmap
+from reference.tick_mgr import TickMgr, u128_safe_add
+from reference.tickmath import (
+    MIN_TICK, MAX_TICK, MIN_SQRT_RATIO, MAX_SQRT_RATIO,
+    get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio
+)
+
+# Config.SWAP_FEE_FACTOR
+SWAP_FEE_FACTOR = 10000
+
+MAX_UINT128 = 2 ** 128 - 1
+MAX_UINT160 = 2 ** 160 - 1
+
+
+@dataclass
+class SwapResult:
+    amount0: int
+    amount1: int
+    sqrt_price_x96: int
+    tick: int
+    liquidity: int
+    fee_growth_global_x128: int
+    protocol_fee: int
+    # initialized ticks crossed by the swap, in crossing order
+    crossed_ticks: List[int] = field(default_factory=list)
+    steps: int = 0
+
+
+class SwapPoolSimulator:
+
+    def __init__(
+        self,
+        sqrt_price_x96,
+        tick,
+        liquidity,
+        tick_spacing,
+        fee,
+        fee_protocol0=0,
+        fee_protocol1=0,
+        fee_growth_global0_x128=0,
+        fee_growth_global1_x128=0,
+        protocol_fee_token0=0,
+        protocol_fee_token1=0,
+        bitmap=None,
+        ticks=None,
+    ):
+        self.sqrt_price_x96 = sqrt_price_x96
+        self.tick = tick
+        self.liquidity = liquidity
+        self.tick_spacing = tick_spacing
+        self.fee = fee
+        self.fee_protocol0 = fee_protocol0
+        self.fee_protocol1 = fee_protocol1
+        self.fee_growth_global0_x128 = fee_growth_global0_x128
+        self.fee_growth_global1_x128 = fee_growth_global1_x128
+        self.protocol_fee_token0 = protocol_fee_token0
+        self.protocol_fee_token1 = protocol_fee_token1
+        self.bitmap = bitmap if bitmap is not None else TickBitmap()
+        self.tick_mgr = ticks if ticks is not None else TickMgr()
+
+    @classmethod
+    def from_ticks(cls, sqrt_price_x96, tick, liquidity, tick_spacing, fee, ticks, **kwargs):
+        """Builds the bitmap from `ticks` ({tick: TickInfo}), every tick with liquidity is flipped on."""
+        bitmap = TickBitmap()
+        for t, info in ticks.items():
+            if info.liquidity_gross > 0:
+                bitmap.flip_tick(t, tick_spacing)
+        return cls(
+            sqrt_price_x96, tick, liquidity, tick_spacing, fee,
+            bitmap=bitmap, ticks=TickMgr(ticks), **kwargs
+        )
+
+    def _get_swap_fee_rate(self, sqrt_price_limit_x96, zero_for_one):
+        if zero_for_one:
+            if not sqrt_price_limit_x96 < self.sqrt_price_x96:
+                raise ValueError("ZO: price limit too high")
+            if not MIN_SQRT_RATIO < sqrt_price_limit_x96:
+                raise ValueError("ZO: price limit too low")
+            return self.fee_protocol0
+
+        if not self.sqrt_price_x96 < sqrt_price_limit_x96:
+            raise ValueError("OZ: price limit too low")
+        if not sqrt_price_limit_x96 < MAX_SQRT_RATIO:
+            raise ValueError("OZ: price limit too high")
+        return self.fee_protocol1
+
+    def _run(self, zero_for_one, amount_specified, sqrt_price_limit_x96):
+        """The `_compute_swap_step` loop, returns the result and the crossed TickInfo writes."""
+        if sqrt_price_limit_x96 < 0 or sqrt_price_limit_x96 > MAX_UINT160:
+            raise ValueError("assert_uint160: overflow")
+        if amount_specified == 0:
+            raise ValueError("Amount specified is zero")
+
+        fee_protocol = self._get_swap_fee_rate(sqrt_price_limit_x96, zero_for_one)
+        exact_input = amount_specified > 0
+
+        amount_specified_remaining = amount_specified
+        amount_calculated = 0
+        sqrt_price_x96 = self.sqrt_price_x96
+        tick = self.tick
+        liquidity = self.liquidity
+        protocol_fee = 0
+        if zero_for_one:
+            fee_growth_global_x128 = self.fee_growth_global0_x128
+        else:
+            fee_growth_global_x128 = self.fee_growth_global1_x128
+
+        # crossing writes go to a scratch TickMgr so quoting never mutates the pool
+        crossed = TickMgr()
+        crossed_ticks = []
+        steps = 0
+
+        while amount_specified_remaining != 0 and sqrt_price_x96 != sqrt_price_limit_x96:
+            steps += 1
+            tick_next, initialized = self.bitmap.next_valid_tick(tick, self.tick_spacing, zero_for_one)
+
+            sqrt_price_start_x96 = sqrt_price_x96
+            tick_next = min(max(tick_next, MIN_TICK), MAX_TICK)
+
+            sqrt_price_next_x96 = get_sqrt_ratio_at_tick(tick_next)
+            if zero_for_one:
+                use_limit = sqrt_price_next_x96 < sqrt_price_limit_x96
+            else:
+                use_limit = sqrt_price_limit_x96 < sqrt_price_next_x96
+            sqrt_price_target_x96 = sqrt_price_limit_x96 if use_limit else sqrt_price_next_x96
+
+            sqrt_price_x96, amount_in, amount_out, fee_amount = compute_swap_step(
+                sqrt_price_x96, sqrt_price_target_x96, liquidity, amount_specified_remaining, self.fee
+            )
+
+            if exact_input:
+                amount_specified_remaining -= amount_in + fee_amount
+                amount_calculated -= amount_out
+            else:
+                amount_specified_remaining += amount_out
+                amount_calculated += amount_in + fee_amount
+
+            if fee_protocol > 0:
+                delta, _ = mul_div(fee_amount, fee_protocol, SWAP_FEE_FACTOR)
+                fee_amount -= delta
+                protocol_fee += delta & MAX_UINT128
+
+            if liquidity > 0:
+                tmp, _ = mul_div(fee_amount, 2 ** 128, liquidity)
+                fee_growth_global_x128 = (fee_growth_global_x128 + tmp) & MAX_UINT256
+
+            if sqrt_price_x96 == sqrt_price_next_x96:
+                if initialized:
+                    crossed.set_tick(tick_next, self.tick_mgr.get_tick(tick_next))
+                    if zero_for_one:
+                        liquidity_net = -crossed.cross(tick_next, fee_growth_global_x128, self.fee_growth_global1_x128)
+                    else:
+                        liquidity_net = crossed.cross(tick_next, self.fee_growth_global0_x128, fee_growth_global_x128)
+                    liquidity = u128_safe_add(liquidity, liquidity_net)
+                    crossed_ticks.append(tick_next)
+                tick = tick_next - 1 if zero_for_one else tick_next
+            elif sqrt_price_x96 != sqrt_price_start_x96:
+                tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+
+        if zero_for_one == exact_input:
+            amount0 = amount_specified - amount_specified_remaining
+            amount1 = amount_calculated
+        else:
+            amount0 = amount_calculated
+            amount1 = amount_specified - amount_specified_remaining
+
+        result = SwapResult(
+            amount0=amount0,
+            amount1=amount1,
+            sqrt_price_x96=sqrt_price_x96,
+            tick=tick,
+            liquidity=liquidity,
+            fee_growth_global_x128=fee_growth_global_x128,
+            protocol_fee=protocol_fee,
+            crossed_ticks=crossed_ticks,
+            steps=steps,
+        )
+        return result, crossed
+
+    def get_swap_results(self, zero_for_one, amount_specified, sqrt_price_limit_x96):
+        """Quotes a swap like SwapPool.get_swap_results, the pool state is left untouched."""
+        result, _ = self._run(zero_for_one, amount_specified, sqrt_price_limit_x96)
+        return result
+
+    def swap(self, zero_for_one, amount_specified, sqrt_price_limit_x96):
+        """Applies a swap to the simulated pool state like SwapPool.swap, without the token transfers."""
+        result, crossed = self._run(zero_for_one, amount_specified, sqrt_price_limit_x96)
+
+        self.sqrt_price_x96 = result.sqrt_price_x96
+        self.tick = result.tick
+        self.liquidity = result.liquidity
+        self.tick_mgr.ticks.update(crossed.ticks)
+        if zero_for_one:
+            self.fee_growth_global0_x128 = result.fee_growth_global_x128
+            self.protocol_fee_token0 += result.protocol_fee
+        else:
+            self.fee_growth_global1_x128 = result.fee_growth_global_x128
+            self.protocol_fee_token1 += result.protocol_fee
+        return result
@@ -0,0 +1,81 @@
+"""Bit-exact python port of contracts/swapmath.cairo.
+
+`amount_remaining` is the int256 amount as a signed int: positive for exact
+input, negative for exact output.
+"""
+
+from reference.fullmath import MAX_UINT256, mul_div, mul_div_roundingup
+from reference.sqrt_price_math import (
+    get_amount0_delta, get_amount1_delta,
+    get_next_sqrt_price_from_input, get_next_sqrt_price_from_output
+)
+
+NUM_1E6 = 1000000
+
+
+def _compute_swap_step_1(sqrt_ratio_current, sqrt_ratio_target, liquidity, amount_remaining, fee_pips, exact_in, zero_for_one):
+    if exact_in:
+        amount_remaining_less_fee, _ = mul_div(amount_remaining, NUM_1E6 - fee_pips, NUM_1E6)
+        if zero_for_one:
+            amount_in = get_amount0_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, True)
+        else:
+            amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, True)
+
+        if amount_in < amount_remaining_less_fee:
+            return sqrt_ratio_target, amount_in, 0
+
+        sqrt_ratio_next = get_next_sqrt_price_from_input(
+            sqrt_ratio_current, liquidity, amount_remaining_less_fee, zero_for_one
+        )
+        return sqrt_ratio_next, amount_in, 0
+
+    if zero_for_one:
+        amount_out = get_amount1_delta(sqrt_ratio_target, sqrt_ratio_current, liquidity, False)
+    else:
+        amount_out = get_amount0_delta(sqrt_ratio_current, sqrt_ratio_target, liquidity, False)
+
+    abs_amount_remaining = -amount_remaining
+    if amount_out < abs_amount_remaining:
+        return sqrt_ratio_target, 0, amount_out
+
+    sqrt_ratio_next = get_next_sqrt_price_from_output(
+        sqrt_ratio_current, liquidity, abs_amount_remaining, zero_for_one
+    )
+    return sqrt_ratio_next, 0, amount_out
+
+
+def _compute_swap_step_2(sqrt_ratio_current, sqrt_ratio_next, liquidity, amount_in, amount_out, exact_in, zero_for_one, max):
+    if zero_for_one:
+        if not (max and exact_in):
+            amount_in = get_amount0_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, True)
+        if max and not exact_in:
+            return amount_in, amount_out
+        return amount_in, get_amount1_delta(sqrt_ratio_next, sqrt_ratio_current, liquidity, False)
+
+    if not (max and exact_in):
+        amount_in = get_amount1_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, True)
+    if max and not exact_in:
+        return amount_in, amount_out
+    return amount_in, get_amount0_delta(sqrt_ratio_current, sqrt_ratio_next, liquidity, False)
+
+
+def compute_swap_step(sqrt_ratio_current, sqrt_ratio_target, liquidity, amount_remaining, fee_pips):
+    """Returns (sqrt_ratio_next, amount_in, amount_out, fee_amount) as SwapMath.compute_swap_step."""
+    zero_for_one = sqrt_ratio_target <= sqrt_ratio_current
+    exact_in = amount_remaining >= 0
+
+    sqrt_ratio_next, amount_in, amount_out = _compute_swap_step_1(
+        sqrt_ratio_current, sqrt_ratio_target, liquidity, amount_remaining, fee_pips, exact_in, zero_for_one
+    )
+
+    max = sqrt_ratio_target == sqrt_ratio_next
+
+    amount_in, amount_out = _compute_swap_step_2(
+        sqrt_ratio_current, sqrt_ratio_next, liquidity, amount_in, amount_out, exact_in, zero_for_one, max
+    )
+
+    if exact_in and sqrt_ratio_next != sqrt_ratio_target:
+        fee_amount = (amount_remaining - amount_in) & MAX_UINT256
+    else:
+        fee_amount = mul_div_roundingup(amount_in, fee_pips, NUM_1E6 - fee_pips)
+    return sqrt_ratio_next, amount_in, amount_out, fee_amount
@@ -0,0 +1,96 @@
+"""Bit-exact python port of contracts/tick_bitmap.cairo over an in-memory word map."""
+
+
+def position(tick):
+    """Returns (word_pos, bit_pos) of a compressed tick, bit_pos is always in [0, 256)."""
+    return divmod(tick, 256)
+
+
+def most_significant_bit(x):
+    return x.bit_length() - 1
+
+
+def least_significant_bit(x):
+    return (x & -x).bit_length() - 1
+
+
+class TickBitmap:
+    """`words` maps word_pos to the uint256 word, missing words are zero like unset storage.
+
+    `summary` is the second level bitmap: bit `word_pos % 256` of `summary[word_pos // 256]`
+    is set iff `words[word_pos]` is non-zero.
+    """
+
+    def __init__(self, words=None):
+        self.words = dict(words or {})
+        self.summary = {}
+        for word_pos in self.words:
+            self._flip_summary(word_pos)
+
+    def _flip_summary(self, word_pos):
+        summary_pos, bit_pos = position(word_pos)
+        summary = self.summary.get(summary_pos, 0) ^ (1 << bit_pos)
+        if summary:
+            self.summary[summary_pos] = summary
+        else:
+            self.summary.pop(summary_pos, None)
+
+    def flip_tick(self, tick, tick_spacing):
+        key, rem = divmod(tick, tick_spacing)
+        if rem != 0:
+            raise ValueError("tick must be multiples of tick_spacing")
+
+        word_pos, bit_pos = position(key)
+        cur_word = self.words.get(word_pos, 0)
+        word = cur_word ^ (1 << bit_pos)
+        if word:
+            self.words[word_pos] = word
+        else:
+            self.words.pop(word_pos, None)
+        if cur_word == 0 or word == 0:
+            self._flip_summary(word_pos)
+
+    def is_initialized(self, tick, tick_spacing):
+        word_pos, bit_pos = position(tick // tick_spacing)
+        return (self.words.get(word_pos, 0) >> bit_pos) & 1 == 1
+
+    def next_valid_tick_within_one_word(self, tick, tick_spacing, lte):
+        """Returns (tick_next, initialized) as TickBitmap.next_valid_tick_within_one_word."""
+        compressed = tick // tick_spacing
+
+        if lte:
+            word_pos, bit_pos = position(compressed)
+            mask = (1 << bit_pos) + (1 << bit_pos) - 1
+            state = self.words.get(word_pos, 0) & mask
+            if state != 0:
+                return (compressed - (bit_pos - most_significant_bit(state))) * tick_spacing, True
+            return (compressed - bit_pos) * tick_spacing, False
+
+        word_pos, bit_pos = position(compressed + 1)
+        mask = ~((1 << bit_pos) - 1) & (2 ** 256 - 1)
+        state = self.words.get(word_pos, 0) & mask
+        if state != 0:
+            return (compressed + 1 + (least_significant_bit(state) - bit_pos)) * tick_spacing, True
+        return (compressed + 1 + 255 - bit_pos) * tick_spacing, False
+
+    def next_valid_tick(self, tick, tick_spacing, lte):
+        """Returns (tick_next, initialized) as TickBitmap.next_valid_tick."""
+        tick_next, initialized = self.next_valid_tick_within_one_word(tick, tick_spacing, lte)
+        if initialized:
+            return tick_next, True
+
+        word_pos, _ = position(tick_next // tick_spacing)
+        summary_pos, bit_pos = position(word_pos)
+        summary = self.summary.get(summary_pos, 0)
+        if lte:
+            state = summary & ((1 << bit_pos) - 1)
+            if state == 0:
+                return summary_pos * 256 * 256 * tick_spacing, False
+            next_word_pos = summary_pos * 256 + most_significant_bit(state)
+            return (next_word_pos * 256 + most_significant_bit(self.words[next_word_pos])) * tick_spacing, True
+
+        state = summary & ~((1 << (bit_pos + 1)) - 1)
+        if state == 0:
+            return (summary_pos * 256 * 256 + 256 * 256 - 1) * tick_spacing, False
+        next_word_pos = summary_pos * 256 + least_significant_bit(state)
+        return (next_word_pos * 256 + least_significant_bit(self.words[next_word_pos])) * tick_spacing, True
@@ -0,0 +1,115 @@
+"""Bit-exact python port of contracts/tick_mgr.cairo over an in-memory tick map."""
+
+from dataclasses import dataclass
+
+from reference.fullmath import MAX_UINT256
+from reference.tickmath import MIN_TICK, MAX_TICK
+
+MAX_UINT128 = 2 ** 128 - 1
+
+
+def u128_safe_add(a, b):
+    """Utils.u128_safe_add, `b` may be negative."""
+    res = a + b
+    if res < 0:
+        raise ValueError("safe_add: minus result")
+    if res > MAX_UINT128:
+        raise ValueError("safe_add: overflow")
+    return res
+
+
+def get_max_liquidity_per_tick(tick_spacing):
+    min_tick = -(-MIN_TICK // tick_spacing) * tick_spacing
+    max_tick = MAX_TICK // tick_spacing * tick_spacing
+    n_ticks = (max_tick - min_tick) // tick_spacing + 1
+    return MAX_UINT128 // n_ticks
+
+
+@dataclass
+class TickInfo:
+    liquidity_gross: int = 0
+    liquidity_net: int = 0
+    fee_growth_outside0_x128: int = 0
+    fee_growth_outside1_x128: int = 0
+    initialized: bool = False
+
+
+class TickMgr:
+    """`ticks` maps tick to TickInfo, missing ticks read as an empty TickInfo like unset storage."""
+
+    def __init__(self, ticks=None):
+        self.ticks = dict(ticks or {})
+
+    def get_tick(self, tick):
+        return self.ticks.get(tick) or TickInfo()
+
+    def set_tick(self, tick, info):
+        self.ticks[tick] = info
+
+    def cross(self, tick, fee_growth_global0_x128, fee_growth_global1_x128):
+        """Flips the fee growth outside of `tick`, returns its liquidity_net."""
+        info = self.get_tick(tick)
+        self.ticks[tick] = TickInfo(
+            liquidity_gross=info.liquidity_gross,
+            liquidity_net=info.liquidity_net,
+            fee_growth_outside0_x128=(fee_growth_global0_x128 - info.fee_growth_outside0_x128) & MAX_UINT256,
+            fee_growth_outside1_x128=(fee_growth_global1_x128 - info.fee_growth_outside1_x128) & MAX_UINT256,
+            initialized=info.initialized,
+        )
+        return info.liquidity_net
+
+    def update(self, tick, tick_current, liquidity_delta, fee_growth_global0_x128, fee_growth_global1_x128, upper, max_liquidity):
+        """Returns True if the tick was flipped from initialized to uninitialized or vice versa."""
+        info = self.get_tick(tick)
+
+        liq_gross_before = info.liquidity_gross
+        liq_gross_after = u128_safe_add(liq_gross_before, liquidity_delta)
+        if liq_gross_after > max_liquidity:
+            raise ValueError("update: liq_gross_after > max_liquidity")
+
+        fee_growth_outside0_x128 = info.fee_growth_outside0_x128
+        fee_growth_outside1_x128 = info.fee_growth_outside1_x128
+        initialized = info.initialized
+        if liq_gross_before == 0:
+            # by convention, we assume that all growth before a tick was initialized happened _below_ the tick
+            if tick <= tick_current:
+                fee_growth_outside0_x128 = fee_growth_global0_x128
+                fee_growth_outside1_x128 = fee_growth_global1_x128
+            initialized = True
+
+        if upper:
+            liquidity_net = info.liquidity_net - liquidity_delta
+        else:
+            liquidity_net = info.liquidity_net + liquidity_delta
+
+        self.ticks[tick] = TickInfo(
+            liquidity_gross=liq_gross_after,
+            liquidity_net=liquidity_net,
+            fee_growth_outside0_x128=fee_growth_outside0_x128,
+            fee_growth_outside1_x128=fee_growth_outside1_x128,
+            initialized=initialized,
+        )
+        return (liq_gross_after == 0) != (liq_gross_before == 0)
+
+    def get_fee_growth_inside(self, tick_lower, tick_upper, tick_current, fee_growth_global0_x128, fee_growth_global1_x128):
+        lower = self.get_tick(tick_lower)
+        if tick_lower <= tick_current:
+            below0, below1 = lower.fee_growth_outside0_x128, lower.fee_growth_outside1_x128
+        else:
+            below0 = (fee_growth_global0_x128 - lower.fee_growth_outside0_x128) & MAX_UINT256
+            below1 = (fee_growth_global1_x128 - lower.fee_growth_outside1_x128) & MAX_UINT256
+
+        upper = self.get_tick(tick_upper)
+        if tick_current < tick_upper:
+            above0, above1 = upper.fee_growth_outside0_x128, upper.fee_growth_outside1_x128
+        else:
+            above0 = (fee_growth_global0_x128 - upper.fee_growth_outside0_x128) & MAX_UINT256
+            above1 = (fee_growth_global1_x128 - upper.fee_growth_outside1_x128) & MAX_UINT256
+
+        return (
+            (fee_growth_global0_x128 - below0 - above0) & MAX_UINT256,
+            (fee_growth_global1_x128 - below1 - above1) & MAX_UINT256,
+        )
+
+    def clear(self, tick):
+        self.ticks.pop(tick, None)
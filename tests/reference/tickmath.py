@@ -0,0 +1,213 @@
+"""Bit-exact python port of contracts/tickmath.cairo.
+
+`SqrtPriceTable` precomputes tick -> sqrt_price_x96 over a tick range into a
+flat file that is memory-mapped on open, so lookups never touch the big-int
+math and reverse lookups are a binary search over the table.
+
+Build the full [MIN_TICK, MAX_TICK] table with:
+
+    python tests/reference/tickmath.py build tickmath.bin
+"""
+
+import mmap
+import struct
+import sys
+
+MIN_TICK = -887272
+MAX_TICK = -MIN_TICK
+
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO_LOW = 0xefd1fc6a506488495d951d5263988d26
+MAX_SQRT_RATIO_HIGH = 0xfffd8963
+MAX_SQRT_RATIO = (MAX_SQRT_RATIO_HIGH << 128) | MAX_SQRT_RATIO_LOW
+
+MAX_UINT256 = 2 ** 256 - 1
+
+# same constants as the TickMath.get_sqrt_args table, indexed by bit position 1..19
+SQRT_ARGS = (
+    0xfff97272373d413259a46990580e213a,
+    0xfff2e50f5f656932ef12357cf3c7fdcc,
+    0xffe5caca7e10e4e61c3624eaa0941cd0,
+    0xffcb9843d60f6159c9db58835c926644,
+    0xff973b41fa98c081472e6896dfb254c0,
+    0xff2ea16466c96a3843ec78b326b52861,
+    0xfe5dee046a99a2a811c461f1969c3053,
+    0xfcbe86c7900a88aedcffc83b479aa3a4,
+    0xf987a7253ac413176f2b074cf7815e54,
+    0xf3392b0822b70005940c7a398e4b70f3,
+    0xe7159475a2c29b7443b29c7fa6e889d9,
+    0xd097f3bdfd2022b8845ad8f792aa5825,
+    0xa9f746462d870fdf8a65dc1f90e061e5,
+    0x70d869a156d2a1b890bb3df62baf32f7,
+    0x31be135f97d08fd981231505542fcfa6,
+    0x9aa508b5b7a84e1c677de54f3e99bc9,
+    0x5d6af8dedb81196699c329225ee604,
+    0x2216e584f5fa1ea926041bedfe98,
+    0x48a170391f7dc42444e8fa2,
+)
+
+LOG_SQRT10001 = 255738958999603826347141
+TICK_LOW_ERROR = 0x28f6481ab7f045a5af012a19d003aaa
+TICK_HIGH_ERROR = 0xdb2df09e81959a81455e260799a0632f
+
+
+def get_sqrt_ratio_at_tick(tick):
+    """Returns sqrt(1.0001 ** tick) * 2 ** 96 exactly as TickMath.get_sqrt_ratio_at_tick."""
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError("TickMath: abs_tick is too large")
+
+    if abs_tick & 0x1:
+        ratio = 0xfffcb933bd6fad37aa2d162d1a594001
+    else:
+        ratio = 1 << 128
+
+    for i, arg in enumerate(SQRT_ARGS):
+        if abs_tick & (0x2 << i):
+            ratio = (ratio * arg) >> 128
+
+    if tick >= 0:
+        ratio = MAX_UINT256 // ratio
+
+    # round up in the division so get_tick_at_sqrt_ratio of the output price is always consistent
+    return (ratio >> 32) + (1 if ratio & 0xffffffff else 0)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96):
+    """Returns the greatest tick whose sqrt ratio is <= sqrt_price_x96, as TickMath.get_tick_at_sqrt_ratio."""
+    if sqrt_price_x96 < MIN_SQRT_RATIO:
+        raise ValueError("tick is too low")
+    if sqrt_price_x96 >= MAX_SQRT_RATIO:
+        raise ValueError("tick is too high")
+
+    ratio = sqrt_price_x96 << 32
+    msb = ratio.bit_length() - 1
+
+    if msb >= 128:
+        r = ratio >> (msb - 127)
+    else:
+        r = ratio << (127 - msb)
+
+    log_2 = (msb - 128) << 64
+    for shf_bit in range(63, 49, -1):
+        r = (r * r) >> 127
+        f = r >> 128
+        log_2 |= f << shf_bit
+        r >>= f
+
+    log_sqrt10001 = log_2 * LOG_SQRT10001
+
+    tick_low = (log_sqrt10001 - TICK_LOW_ERROR) >> 128
+    tick_high = (log_sqrt10001 + TICK_HIGH_ERROR) >> 128
+
+    if tick_low == tick_high:
+        return tick_low
+    if get_sqrt_ratio_at_tick(tick_high) <= sqrt_price_x96:
+        return tick_high
+    return tick_low
+
+
+class SqrtPriceTable:
+    """Memory-mapped tick -> sqrt_price_x96 table.
+
+    The file is a small header followed by one big-endian uint160 record per
+    tick, so records compare bytewise in the same order as the prices.
+    """
+
+    MAGIC = b"DXTICK01"
+    HEADER = struct.Struct(">8sqq")
+    RECORD_SIZE = 20
+
+    def __init__(self, f, buf, min_tick, max_tick):
+        self._file = f
+        self._buf = buf
+        self.min_tick = min_tick
+        self.max_tick = max_tick
+
+    @classmethod
+    def build(cls, path, min_tick=MIN_TICK, max_tick=MAX_TICK):
+        """Writes the table for [min_tick, max_tick] to `path`."""
+        if min_tick < MIN_TICK or max_tick > MAX_TICK or min_tick > max_tick:
+            raise ValueError("invalid tick range")
+
+        with open(path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, min_tick, max_tick))
+            chunk = []
+            for tick in range(min_tick, max_tick + 1):
+                chunk.append(get_sqrt_ratio_at_tick(tick).to_bytes(cls.RECORD_SIZE, "big"))
+                if len(chunk) == 65536:
+                    f.write(b"".join(chunk))
+                    chunk = []
+            f.write(b"".join(chunk))
+
+    @classmethod
+    def open(cls, path):
+        f = open(path, "rb")
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+
+        magic, min_tick, max_tick = cls.HEADER.unpack_from(buf, 0)
+        expected = cls.HEADER.size + (max_tick - min_tick + 1) * cls.RECORD_SIZE
+        if magic != cls.MAGIC or len(buf) != expected:
+            buf.close()
+            f.close()
+            raise ValueError(f"{path} is not a sqrt price table")
+        return cls(f, buf, min_tick, max_tick)
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.max_tick - self.min_tick + 1
+
+    def _record(self, index):
+        offset = self.HEADER.size + index * self.RECORD_SIZE
+        return self._buf[offset: offset + self.RECORD_SIZE]
+
+    def get_sqrt_ratio_at_tick(self, tick):
+        if tick < self.min_tick or tick > self.max_tick:
+            raise ValueError("tick out of table range")
+        return int.from_bytes(self._record(tick - self.min_tick), "big")
+
+    def get_sqrt_ratios_at_ticks(self, ticks):
+        return [self.get_sqrt_ratio_at_tick(tick) for tick in ticks]
+
+    def get_tick_at_sqrt_ratio(self, sqrt_price_x96):
+        """Binary search for the greatest tick whose sqrt ratio is <= sqrt_price_x96."""
+        if sqrt_price_x96 < MIN_SQRT_RATIO:
+            raise ValueError("tick is too low")
+        if sqrt_price_x96 >= MAX_SQRT_RATIO:
+            raise ValueError("tick is too high")
+
+        key = sqrt_price_x96.to_bytes(self.RECORD_SIZE, "big")
+        if key < self._record(0):
+            raise ValueError("price out of table range")
+
+        lo, hi = 0, len(self)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._record(mid) <= key:
+                lo = mid
+            else:
+                hi = mid
+        if hi == len(self) and self.max_tick < MAX_TICK and \
+                get_sqrt_ratio_at_tick(self.max_tick + 1) <= sqrt_price_x96:
+            raise ValueError("price out of table range")
+        return self.min_tick + lo
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+    SqrtPriceTable.build(sys.argv[2])
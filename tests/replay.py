@@ -0,0 +1,388 @@
+"""Replay of recorded swap pool transaction traces, like tests/test_data/test1.json.
+
+A trace is a list of calls
+
+    {"contractAddress", "selector", "funcName", "args", "result", "txid"}
+
+starting with the `constructor` call of every pool. Traces are read as a stream
+(a JSON array or one call per line), split by `contractAddress` into one shard
+per pool, and the shards are replayed in worker processes, each pool on its own
+fork of the `swap_pool.base` snapshot. Every replayed call's result is checked
+against the recorded `result`, and the state of a shard is pickled every
+`checkpoint_every` calls so an interrupted replay resumes from its last checkpoint.
+
+Usage:
+
+    python tests/replay.py TRACE [--workers N] [--limit N]
+                                 [--checkpoint-dir DIR] [--checkpoint-every N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from starkware.starknet.testing.contract import StarknetContract
+from starkware.starknet.testing.starknet import Starknet
+from starkware.starkware_utils.error_handling import StarkException
+from snapshots import fork, SELECTOR, address
+from utils import cached_contract
+
+_handlers = {}
+
+CHUNK_SIZE = 1 << 16
+
+# StarknetContracts of the `swap_pool.base` snapshot info, stored with their `<key>_def` definition
+CONTRACT_KEYS = ['token0', 'token1', 'swap_target']
+
+
+class ReplayError(Exception):
+    pass
+
+
+@dataclass
+class Call:
+    index: int
+    contract_address: int
+    func_name: str
+    args: List[int]
+    result: List[int]
+    txid: str
+
+    @classmethod
+    def from_json(cls, index, data):
+        return cls(
+            # shard files keep the index of the call in the original trace
+            index=data.get('index', index),
+            contract_address=int(data['contractAddress'], 0),
+            func_name=data['funcName'],
+            args=[int(arg, 0) for arg in data['args']],
+            result=[int(res, 0) for res in data['result']],
+            txid=data['txid'],
+        )
+
+
+@dataclass
+class Mismatch:
+    index: int
+    txid: str
+    func_name: str
+    expected: List[int]
+    actual: Optional[List[int]]
+    # the revert message if the replayed call failed
+    error: Optional[str] = None
+
+
+@dataclass
+class ShardReport:
+    contract_address: int
+    calls: int = 0
+    # index of the first replayed call, > 0 when resumed from a checkpoint
+    resumed_from: int = 0
+    mismatches: List[Mismatch] = field(default_factory=list)
+    elapsed: float = 0
+
+
+def handler(func_name):
+    """Registers `async def handler(replay, call) -> result felts` for the calls named `func_name`"""
+    def register(func):
+        _handlers[func_name] = func
+        return func
+    return register
+
+
+def iter_trace(path):
+    """Yields the calls of a trace one by one, without loading the whole file"""
+    index = 0
+    with open(path) as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield Call.from_json(index, json.loads(line))
+                    index += 1
+            return
+
+        decoder = json.JSONDecoder()
+        buf = ''
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # skip whitespace, the array brackets and separators
+            while pos < len(buf) and buf[pos] in ' \t\r\n,[':
+                if buf[pos] == '[':
+                    started = True
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            if pos < len(buf) and started:
+                try:
+                    data, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield Call.from_json(index, data)
+                    index += 1
+                    pos = end
+                    continue
+            if eof:
+                return
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+class PoolReplay:
+    """Replays the calls of one pool, the recorded owners and token addresses are mapped to local ones"""
+
+    def __init__(self, starknet, info, contract, token_map):
+        self.starknet = starknet
+        self.info = info
+        self.contract_deployed = contract
+        self.token_map = token_map
+        self.bind()
+
+    def bind(self):
+        state = self.starknet.state
+        self.contract = cached_contract(state, self.info['contract_def'], self.contract_deployed)
+        self.swap_target = cached_contract(state, self.info['swap_target_def'], self.info['swap_target'])
+        self.token0 = cached_contract(state, self.info['token0_def'], self.info['token0'])
+        self.token1 = cached_contract(state, self.info['token1_def'], self.info['token1'])
+
+    @classmethod
+    async def deploy(cls, call, base_snapshot='swap_pool.base'):
+        """Deploys the pool of a recorded `constructor` call on a fork of `base_snapshot`"""
+        if call.func_name != 'constructor':
+            raise ReplayError(f"call {call.index}: a pool trace must start with its constructor, got {call.func_name}")
+
+        starknet, info = await fork(base_snapshot)
+        _, tick_spacing, fee, token0, token1 = call.args[:5]
+        # keep the recorded order of the tokens, the swap callbacks compare token addresses
+        if token0 < token1:
+            token_map = {token0: info['token0'], token1: info['token1']}
+        else:
+            token_map = {token0: info['token1'], token1: info['token0']}
+
+        kwargs = {
+            "contract_class": info['proxy_def'],
+            "constructor_calldata": [info['declare_class'].class_hash, SELECTOR, 5, tick_spacing, fee, token_map[token0].contract_address, token_map[token1].contract_address, address],
+        }
+        contract = await starknet.deploy(**kwargs)
+        # replace api
+        contract = contract.replace_abi(info['contract_def'].abi)
+        return cls(starknet, info, contract, token_map)
+
+    async def apply(self, call):
+        """Replays `call`, returns a Mismatch if its result differs from the recorded one"""
+        func = _handlers.get(call.func_name)
+        if func is None:
+            raise ReplayError(f"call {call.index}: no replay handler for {call.func_name}")
+        try:
+            res = await func(self, call)
+        except StarkException as err:
+            _, error = err.args
+            return Mismatch(call.index, call.txid, call.func_name, call.result, None, error['message'])
+        actual = list(res.call_info.result)
+        if actual != call.result:
+            return Mismatch(call.index, call.txid, call.func_name, call.result, actual)
+        return None
+
+    def save(self, path, index):
+        """Pickles the pool state after the call `index`
+
+        StarknetContracts hold classes generated from their ABI and can't be pickled,
+        only their addresses are saved and the contracts are rebuilt by `load`.
+        """
+        info = {
+            key: value.contract_address if isinstance(value, StarknetContract) else value
+            for key, value in self.info.items()
+        }
+        token_map = {token: contract.contract_address for token, contract in self.token_map.items()}
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((index, self.starknet.state, info, self.contract_deployed.contract_address, token_map), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (index of the last replayed call, PoolReplay) from a checkpoint"""
+        with open(path, 'rb') as f:
+            index, state, info, contract_address, token_map = pickle.load(f)
+
+        def contract(definition, contract_address):
+            return StarknetContract(state=state, abi=definition.abi, contract_address=contract_address, deploy_call_info=None)
+
+        for key in CONTRACT_KEYS:
+            info[key] = contract(info[f'{key}_def'], info[key])
+        by_address = {info[key].contract_address: info[key] for key in ('token0', 'token1')}
+        token_map = {token: by_address[local] for token, local in token_map.items()}
+        return index, cls(Starknet(state), info, contract(info['contract_def'], contract_address), token_map)
+
+
+@handler('initialize_price')
+async def replay_initialize_price(replay, call):
+    return await replay.contract.initialize_price((call.args[0], call.args[1])).execute()
+
+
+@handler('set_fee_protocol')
+async def replay_set_fee_protocol(replay, call):
+    return await replay.contract.set_fee_protocol(call.args[0], call.args[1]).execute(caller_address=address)
+
+
+@handler('add_liquidity')
+async def replay_add_liquidity(replay, call):
+    _, tick_lower, tick_upper, liquidity, _ = call.args
+    return await replay.swap_target.add_liquidity(address, tick_lower, tick_upper, liquidity, replay.contract.contract_address).execute(caller_address=address)
+
+
+@handler('remove_liquidity')
+async def replay_remove_liquidity(replay, call):
+    return await replay.contract.remove_liquidity(call.args[0], call.args[1], call.args[2]).execute(caller_address=address)
+
+
+@handler('swap')
+async def replay_swap(replay, call):
+    args = call.args
+    data_len = args[7]
+    data = args[8:8 + data_len]
+    data[0] = replay.token_map[data[0]].contract_address
+    data[2] = replay.token_map[data[2]].contract_address
+    return await replay.swap_target.swap(address, args[1], (args[2], args[3]), (args[4], args[5]), replay.contract.contract_address, data).execute(caller_address=address)
+
+
+@handler('collect')
+async def replay_collect(replay, call):
+    return await replay.contract.collect(address, call.args[1], call.args[2], call.args[3], call.args[4]).execute(caller_address=address)
+
+
+@handler('collect_protocol')
+async def replay_collect_protocol(replay, call):
+    return await replay.contract.collect_protocol(address, call.args[1], call.args[2]).execute(caller_address=address)
+
+
+async def replay_calls(calls, checkpoint=None, checkpoint_every=0, limit=None, strict=False):
+    """Replays the calls of one pool, returns (ShardReport, PoolReplay)
+
+    With `checkpoint` (a file path) the replay resumes from the checkpoint if it
+    exists, and saves one every `checkpoint_every` calls and at the end.
+    `limit` stops after the call of that index, `strict` raises on the first mismatch.
+    """
+    calls = iter(calls)
+    begin = time.time()
+    constructor = next(calls)
+    if checkpoint and os.path.exists(checkpoint):
+        last_index, replay = PoolReplay.load(checkpoint)
+    else:
+        replay = await PoolReplay.deploy(constructor)
+        last_index = constructor.index
+
+    report = ShardReport(constructor.contract_address, resumed_from=last_index + 1)
+    replayed = 0
+    for call in calls:
+        if limit is not None and call.index > limit:
+            break
+        if call.index <= last_index:
+            continue
+        mismatch = await replay.apply(call)
+        if mismatch is not None:
+            if strict:
+                raise ReplayError(f"call {call.index} {call.func_name} (tx {call.txid}): expected {mismatch.expected}, got {mismatch.actual or mismatch.error}")
+            report.mismatches.append(mismatch)
+        last_index = call.index
+        report.calls += 1
+        replayed += 1
+        if checkpoint and checkpoint_every and replayed % checkpoint_every == 0:
+            replay.save(checkpoint, last_index)
+
+    if checkpoint:
+        replay.save(checkpoint, last_index)
+    report.elapsed = time.time() - begin
+    return report, replay
+
+
+def _replay_shard(path, checkpoint, checkpoint_every, limit, strict):
+    """Worker entry point, replays a shard file written by `shard_trace`"""
+    report, _ = asyncio.run(replay_calls(iter_trace(path), checkpoint, checkpoint_every, limit, strict))
+    return report
+
+
+def shard_trace(path, shard_dir):
+    """Splits a trace into one JSON lines file per `contractAddress`, returns {contract_address: shard path}"""
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = {}
+    files = {}
+    try:
+        for call in iter_trace(path):
+            shard = files.get(call.contract_address)
+            if shard is None:
+                shards[call.contract_address] = os.path.join(shard_dir, f'{call.contract_address:#x}.jsonl')
+                shard = files[call.contract_address] = open(shards[call.contract_address], 'w')
+            shard.write(json.dumps({
+                'index': call.index,
+                'contractAddress': hex(call.contract_address),
+                'funcName': call.func_name,
+                'args': [hex(arg) for arg in call.args],
+                'result': [hex(res) for res in call.result],
+                'txid': call.txid,
+            }) + '\n')
+    finally:
+        for f in files.values():
+            f.close()
+    return shards
+
+
+def replay_trace(path, workers=None, checkpoint_dir=None, checkpoint_every=1000, limit=None, strict=False):
+    """Replays every pool of a trace, one process per pool up to `workers`, returns the ShardReports
+
+    Call indices in reports and `limit` are indices in the trace.
+    """
+    if checkpoint_dir is None:
+        with tempfile.TemporaryDirectory() as shard_dir:
+            return _replay_shards(shard_trace(path, shard_dir), workers, False, checkpoint_every, limit, strict)
+    return _replay_shards(shard_trace(path, checkpoint_dir), workers, True, checkpoint_every, limit, strict)
+
+
+def _replay_shards(shards, workers, checkpoint, checkpoint_every, limit, strict):
+    jobs = [
+        (shard, f'{shard}.ckpt' if checkpoint else None, checkpoint_every, limit, strict)
+        for shard in shards.values()
+    ]
+    if len(jobs) <= 1 or workers == 1:
+        return [_replay_shard(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_replay_shard, *zip(*jobs)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Replays a recorded swap pool trace")
+    parser.add_argument("trace")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args(argv[1:])
+
+    reports = replay_trace(args.trace, args.workers, args.checkpoint_dir, args.checkpoint_every, args.limit, args.strict)
+    failed = 0
+    for report in reports:
+        print(f"pool {report.contract_address:#x}: {report.calls} calls from {report.resumed_from} "
+              f"in {report.elapsed:.1f}s, {len(report.mismatches)} mismatches")
+        for mismatch in report.mismatches:
+            print(f"  call {mismatch.index} {mismatch.func_name} (tx {mismatch.txid}): "
+                  f"expected {mismatch.expected}, got {mismatch.actual if mismatch.error is None else mismatch.error}")
+        failed += len(report.mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,4 +1,7 @@
-from starkware.starknet.core.os.transaction_hash.transaction_hash import TransactionHashPrefix
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from starkware.crypto.signature.signature import sign
+from starkware.starknet.core.os.transaction_hash.transaction_hash import TransactionHashPrefix, calculate_transaction_hash_common
 from starkware.starknet.services.api.gateway.transaction import InvokeFunction
 from starkware.starknet.business_logic.transaction.objects import InternalTransaction, TransactionExecutionInfo
 from nile.signer import Signer, from_call_to_call_array, get_transaction_hash, TRANSACTION_VERSION
@@ -85,6 +88,129 @@ class MockSigner():
         return execution_info
 
 
+class PipelinedSigner(MockSigner):
+    """
+    MockSigner for load tests, keeping signing and nonce reads off the execution path.
+
+    The nonces of the accounts are tracked locally, the state is only read on the first
+    transaction of an account. The `__execute__` call array of a call shape (targets,
+    selectors and calldata lengths) is built once. `sign_transactions` signs a queue of
+    transactions with consecutive nonces ahead of time, optionally in worker processes,
+    and `execute_transactions` runs them back to back.
+
+    The local nonces assume every transaction of an account goes through the signer,
+    a failed transaction resets the nonce of its account.
+
+    Examples
+    ---------
+    >>> signer = PipelinedSigner(1234)
+    >>> txs = await signer.sign_transactions(
+            account, [[(contract_address, 'contract_method', [arg_1])] for arg_1 in args], workers=4
+        )
+    >>> execution_infos = await signer.execute_transactions(account, txs)
+
+    """
+
+    def __init__(self, private_key):
+        super().__init__(private_key)
+        self.nonces = {}
+        self.call_arrays = {}
+
+    async def next_nonce(self, account):
+        """Returns the nonce of the next transaction of `account` and increments it"""
+        address = account.contract_address
+        if address not in self.nonces:
+            self.nonces[address] = await account.state.state.get_nonce_at(address)
+        nonce = self.nonces[address]
+        self.nonces[address] += 1
+        return nonce
+
+    def reset_nonce(self, account):
+        """Reads the nonce of `account` from the state again on its next transaction"""
+        self.nonces.pop(account.contract_address, None)
+
+    def get_execute_calldata(self, calls):
+        """Returns the `__execute__` calldata of `calls`, like `from_call_to_call_array`"""
+        shape = tuple((to, selector_name, len(calldata)) for to, selector_name, calldata in calls)
+        call_array = self.call_arrays.get(shape)
+        if call_array is None:
+            entries, _ = from_call_to_call_array([(to, selector_name, [0] * size) for to, selector_name, size in shape])
+            call_array = [len(entries), *[x for entry in entries for x in entry]]
+            self.call_arrays[shape] = call_array
+
+        calldata = [x for _, _, data in calls for x in data]
+        return [*call_array, len(calldata), *calldata]
+
+    async def sign_transactions(self, account, calls_list, max_fee=0, workers=1, nonce=None):
+        """Signs a transaction for each list of calls of `calls_list`, with consecutive nonces
+
+        The nonces start at `nonce`, at the local nonce of the account if None.
+        Returns the signed InternalTransactions, to be executed in order by `execute_transactions`.
+        """
+        general_config = account.state.general_config
+        unsigned = []
+        for i, calls in enumerate(calls_list):
+            tx_nonce = await self.next_nonce(account) if nonce is None else nonce + i
+            calldata = self.get_execute_calldata(calls)
+            transaction_hash = calculate_transaction_hash_common(
+                tx_hash_prefix=TransactionHashPrefix.INVOKE,
+                version=TRANSACTION_VERSION,
+                contract_address=account.contract_address,
+                entry_point_selector=0,
+                calldata=calldata,
+                max_fee=max_fee,
+                chain_id=general_config.chain_id.value,
+                additional_data=[tx_nonce],
+            )
+            unsigned.append((tx_nonce, calldata, transaction_hash))
+
+        hashes = [transaction_hash for _, _, transaction_hash in unsigned]
+        if workers > 1 and len(hashes) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                signatures = list(executor.map(
+                    sign, hashes, repeat(self.signer.private_key), chunksize=max(1, len(hashes) // (4 * workers))
+                ))
+        else:
+            signatures = [sign(transaction_hash, self.signer.private_key) for transaction_hash in hashes]
+
+        txs = []
+        for (tx_nonce, calldata, _), (sig_r, sig_s) in zip(unsigned, signatures):
+            external_tx = InvokeFunction(
+                contract_address=account.contract_address,
+                calldata=calldata,
+                entry_point_selector=None,
+                signature=[sig_r, sig_s],
+                max_fee=max_fee,
+                version=TRANSACTION_VERSION,
+                nonce=tx_nonce,
+            )
+            txs.append(InternalTransaction.from_external(external_tx=external_tx, general_config=general_config))
+        return txs
+
+    async def execute_transactions(self, account, txs):
+        """Executes transactions signed by `sign_transactions`, returns their TransactionExecutionInfos"""
+        execution_infos = []
+        for tx in txs:
+            try:
+                execution_infos.append(await account.state.execute_tx(tx=tx))
+            except Exception:
+                # the following transactions were signed with nonces that are now out of order
+                self.reset_nonce(account)
+                raise
+        return execution_infos
+
+    async def send_transactions(
+        self,
+        account,
+        calls,
+        nonce=None,
+        max_fee=0
+    ) -> TransactionExecutionInfo:
+        tx, = await self.sign_transactions(account, [calls], max_fee, nonce=nonce)
+        execution_info, = await self.execute_transactions(account, [tx])
+        return execution_info
+
+
 class MockEthSigner():
     """
     Utility for sending signed transactions to an Account on Starknet, like MockSigner, but using a secp256k1 signature.
@@ -0,0 +1,324 @@
+"""Named starknet state snapshots shared by all the tests of a session.
+
+A snapshot is built once per process by its registered builder and then frozen:
+tests never run transactions against it, they `fork` it. A fork is a child
+CachedState reading through the snapshot, so creating one is O(1) and a test
+only pays for the storage keys it touches, instead of deep copying the whole
+state (`StarknetState.copy`) for every test.
+
+Built snapshots are also saved as state images under `.snapshots/`, tagged with
+a hash of the contract sources and of the builders, so the next test processes
+load them instead of running the builders again. A changed source or builder
+changes the tag and the image is rebuilt on first use.
+
+Usage:
+
+    python tests/snapshots.py build [NAME ...]   # build the images of every registered snapshot
+    python tests/snapshots.py list
+    python tests/snapshots.py clear
+"""
+import fcntl
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from starkware.starknet.public.abi import get_selector_from_name
+from starkware.starknet.testing.starknet import Starknet, StarknetContract
+from starkware.starknet.testing.state import StarknetState
+from compile_cache import compile_cached, _package_version
+from utils import (
+    MAX_UINT128, to_uint, cached_contract, encode_price_sqrt, get_max_tick, get_min_tick,
+    TICK_SPACINGS, FeeAmount, init_contract, expand_to_18decimals
+)
+
+_root = Path(__file__).parent.parent
+
+IMAGE_DIR = Path(os.environ.get("DONEX_SNAPSHOT_DIR", str(_root / ".snapshots")))
+IMAGES_DISABLED = os.environ.get("DONEX_SNAPSHOT_IMAGES", "1") == "0"
+IMAGE_VERSION = 1
+
+# every contract a builder can deploy or declare
+IMAGE_SOURCES = ["contracts", "tests/mocks"]
+
+_builders = {}
+_snapshots = {}
+
+
+def fork_state(state):
+    """Returns a copy-on-write StarknetState over `state`.
+
+    Writes of the fork never reach `state`, but reads of keys the fork did not
+    write go through to `state`, so `state` must not change while the fork is in use.
+    """
+    return StarknetState(state=state.state._copy(), general_config=state.general_config)
+
+
+def snapshot(name, parent=None):
+    """Registers the decorated `async def builder(starknet, info)` as the builder of snapshot `name`.
+
+    The builder runs on a fork of snapshot `parent` (of an empty state if None) and
+    stores in `info` (a copy of the parent's) what tests need to rebind the contracts
+    it deployed, e.g. definitions and `StarknetContract`s for `cached_contract`.
+    """
+    def register(builder):
+        if name in _builders:
+            raise ValueError(f"snapshot {name} is already registered")
+        _builders[name] = (builder, parent)
+        return builder
+    return register
+
+
+async def get_snapshot(name):
+    """Returns the frozen (state, info) of snapshot `name`, loading its image or building it and its parents on first use"""
+    if name not in _snapshots:
+        if IMAGES_DISABLED:
+            _snapshots[name] = await _build(name)
+        else:
+            path = image_path(name)
+            # a single process builds a missing image, the other ones (e.g. xdist workers) wait and load it
+            with _ImageLock(path):
+                if not path.exists():
+                    save_image(path, *await _build(name))
+                begin = time.time()
+                _snapshots[name] = load_image(path)
+                print(f'load snapshot {name} time:', time.time() - begin)
+    return _snapshots[name]
+
+
+async def _build(name):
+    builder, parent = _builders[name]
+    if parent is None:
+        starknet, info = await Starknet.empty(), {}
+    else:
+        starknet, info = await fork(parent)
+
+    begin = time.time()
+    await builder(starknet, info)
+    print(f'build snapshot {name} time:', time.time() - begin)
+    return starknet.state, info
+
+
+async def fork(name):
+    """Returns a new Starknet forked from snapshot `name` and a copy of the snapshot info.
+
+    Contracts in info are bound to the frozen snapshot, rebind them to the fork
+    with `cached_contract(starknet.state, definition, contract)` before using them.
+    """
+    state, info = await get_snapshot(name)
+    return Starknet(fork_state(state)), dict(info)
+
+
+# state images
+
+def image_tag(name):
+    """Returns the hash of everything snapshot `name` is built from: the cairo sources, the builders and cairo-lang"""
+    h = hashlib.sha256()
+    h.update(f"{IMAGE_VERSION} {_package_version('cairo-lang')} {_package_version('openzeppelin-cairo-contracts')}".encode())
+    for directory in IMAGE_SOURCES:
+        for path in sorted((_root / directory).rglob("*.cairo")):
+            h.update(str(path.relative_to(_root)).encode())
+            h.update(hashlib.sha256(path.read_bytes()).digest())
+    # the modules of the builders, with the helpers they call
+    while name is not None:
+        builder, parent = _builders[name]
+        h.update(name.encode())
+        h.update(Path(inspect.getsourcefile(builder)).read_bytes())
+        name = parent
+    return h.hexdigest()[:16]
+
+
+def image_path(name):
+    return IMAGE_DIR / f"{name}-{image_tag(name)}.image"
+
+
+class _ImageLock:
+    """Exclusive lock of the image at `path` across processes"""
+
+    def __init__(self, path):
+        self.path = path.with_name(f"{path.name}.lock")
+
+    def __enter__(self):
+        IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "w")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def save_image(path, state, info):
+    """Writes a compressed pickle of a snapshot to `path`
+
+    StarknetContracts hold classes generated from their ABI and can't be pickled,
+    only their address and ABI are saved and the contracts are rebuilt by `load_image`.
+    """
+    info = {
+        key: ("contract", value.contract_address, value.abi) if isinstance(value, StarknetContract) else value
+        for key, value in info.items()
+    }
+    data = zlib.compress(pickle.dumps((state.state, state.general_config, info), protocol=pickle.HIGHEST_PROTOCOL), 1)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    print(f'save snapshot image {path.name}: {len(data)} bytes')
+
+
+def load_image(path):
+    """Returns the (state, info) of a snapshot saved by `save_image`"""
+    cached_state, general_config, info = pickle.loads(zlib.decompress(path.read_bytes()))
+    state = StarknetState(state=cached_state, general_config=general_config)
+    for key, value in info.items():
+        if isinstance(value, tuple) and len(value) == 3 and value[0] == "contract":
+            _, contract_address, abi = value
+            info[key] = StarknetContract(state=state, abi=abi, contract_address=contract_address, deploy_call_info=None)
+    return state, info
+
+
+def clear_images():
+    """Removes every state image, returns the number of images removed"""
+    if not IMAGE_DIR.exists():
+        return 0
+    count = 0
+    for path in IMAGE_DIR.iterdir():
+        if path.suffix == ".image":
+            count += 1
+        path.unlink()
+    return count
+
+
+def register_all():
+    """Imports every test module, so the snapshots they register are known"""
+    for path in sorted(Path(__file__).parent.glob("test_*.py")):
+        importlib.import_module(path.stem)
+
+
+# swap pool snapshots
+
+SELECTOR = get_selector_from_name('initializer')
+
+address = 11111111111111
+other_address = 222222222222222
+
+ZERO_TICK_LIQUIDITY = expand_to_18decimals(2)
+
+
+@snapshot('swap_pool.base')
+async def build_base(starknet, info):
+    """tokens (token0 < token1) funding address and other_address, the declared pool class and swap_target"""
+    token0_def, token0 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=starknet)
+    await token0.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+    token1_def, token1 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [2, 2, 18, MAX_UINT128, MAX_UINT128, address], starknet=starknet)
+    await token1.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+    if token0.contract_address > token1.contract_address:
+        token0, token1 = token1, token0
+        token0_def, token1_def = token1_def, token0_def
+
+    begin = time.time()
+    contract_def = compile_cached(
+        ['contracts/swap_pool.cairo'], debug_info=True, disable_hint_validation=True
+    )
+    print('compile swap_pool time:', time.time() - begin)
+
+    begin = time.time()
+    declare_class = await starknet.declare(
+        contract_class=contract_def,
+    )
+    print('declare swap_pool time:', time.time() - begin)
+
+    begin = time.time()
+    proxy_def = compile_cached(
+        ['contracts/common_proxy.cairo'], debug_info=True, disable_hint_validation=True
+    )
+    print('compile swap_pool time:', time.time() - begin)
+
+    swap_target_def, swap_target = await init_contract("tests/mocks/swap_target.cairo", [token0.contract_address, token1.contract_address], starknet=starknet)
+
+    await token0.approve(swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
+    await token1.approve(swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
+
+    await token0.approve(swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
+    await token1.approve(swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
+
+    info.update(
+        token0_def=token0_def, token0=token0, token1_def=token1_def, token1=token1,
+        contract_def=contract_def, declare_class=declare_class, proxy_def=proxy_def,
+        swap_target_def=swap_target_def, swap_target=swap_target,
+    )
+
+
+async def deploy_swap_pool(starknet, info, fee):
+    kwargs = {
+        "contract_class": info['proxy_def'],
+        "constructor_calldata": [info['declare_class'].class_hash, SELECTOR, 5, TICK_SPACINGS[fee], fee, info['token0'].contract_address, info['token1'].contract_address, address],
+    }
+    begin = time.time()
+    contract = await starknet.deploy(**kwargs)
+    print('deploy swap_pool time:', time.time() - begin)
+    # replace api
+    info['contract'] = contract.replace_abi(info['contract_def'].abi)
+
+
+async def initialize_at_zero_tick(swap_pool, swap_target):
+    """initializes the pool at price 1:1 and adds ZERO_TICK_LIQUIDITY over the full range"""
+    res = await swap_pool.get_tick_spacing().call()
+    tick_spacing = res.call_info.result[0]
+    min_tick, max_tick = get_min_tick(tick_spacing), get_max_tick(tick_spacing)
+    await swap_pool.initialize_price(encode_price_sqrt(1, 1)).execute()
+    await swap_target.add_liquidity(address, min_tick, max_tick, ZERO_TICK_LIQUIDITY, swap_pool.contract_address).execute(caller_address=address)
+    return swap_pool
+
+
+@snapshot('swap_pool', parent='swap_pool.base')
+async def build_swap_pool(starknet, info):
+    await deploy_swap_pool(starknet, info, FeeAmount.MEDIUM)
+
+
+@snapshot('swap_pool_low', parent='swap_pool.base')
+async def build_swap_pool_low(starknet, info):
+    await deploy_swap_pool(starknet, info, FeeAmount.LOW)
+
+
+async def build_zero_tick(starknet, info):
+    swap_pool = cached_contract(starknet.state, info['contract_def'], info['contract'])
+    swap_target = cached_contract(starknet.state, info['swap_target_def'], info['swap_target'])
+    await initialize_at_zero_tick(swap_pool, swap_target)
+
+
+snapshot('swap_pool.zero_tick', parent='swap_pool')(build_zero_tick)
+snapshot('swap_pool_low.zero_tick', parent='swap_pool_low')(build_zero_tick)
+
+
+def main(argv):
+    import asyncio
+    command = argv[1] if len(argv) > 1 else "list"
+    if command == "clear":
+        print(f"removed {clear_images()} snapshot images from {IMAGE_DIR}")
+        return 0
+
+    register_all()
+    names = argv[2:] or sorted(_builders)
+    if command == "build":
+        for name in names:
+            asyncio.run(get_snapshot(name))
+        return 0
+    if command == "list":
+        for name in names:
+            path = image_path(name)
+            print(f"{name:32} {'built' if path.exists() else 'missing':8} {path.name}")
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    # the test modules register their snapshots in the `snapshots` module, not in `__main__`
+    import snapshots
+    sys.exit(snapshots.main(sys.argv))
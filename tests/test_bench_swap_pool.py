@@ -0,0 +1,36 @@
+"""bench_swap_pool.py test file."""
+import pytest
+from asynctest import TestCase
+
+from bench_swap_pool import bench, random_swaps, ticks_crossed, INITIALIZED_TICKS, tick_spacing
+
+
+class BenchSwapPoolTest(TestCase):
+
+    def test_random_swaps(self):
+        swaps = random_swaps(100, 4, seed=1)
+        self.assertEqual(swaps, random_swaps(100, 4, seed=1))
+        self.assertEqual({trader for trader, _, _ in swaps}, {0, 1, 2, 3})
+        self.assertTrue(any(amount < 0 for _, _, amount in swaps))
+        self.assertTrue(any(amount > 0 for _, _, amount in swaps))
+
+    def test_ticks_crossed(self):
+        self.assertIn(600, INITIALIZED_TICKS)
+        self.assertEqual(ticks_crossed(0, 599), 0)
+        self.assertEqual(ticks_crossed(0, 600), 1)
+        self.assertEqual(ticks_crossed(600, 599), 1)
+        self.assertEqual(ticks_crossed(599, 0), 0)
+        self.assertEqual(ticks_crossed(1300, -1300), 4)
+        self.assertEqual(ticks_crossed(-1300, 1300), 4)
+
+    @pytest.mark.asyncio
+    async def test_bench(self):
+        report = await bench(6, 3, seed=2)
+        self.assertEqual((report['swaps'], report['traders']), (6, 3))
+        self.assertGreater(report['swaps_per_sec'], 0)
+        self.assertGreater(report['steps_per_swap'], 0)
+        self.assertGreaterEqual(report['latency_p99_ms'], report['latency_p50_ms'])
+
+        report = await bench(2, 2, seed=2, signed=True, workers=2)
+        self.assertEqual((report['swaps'], report['signed']), (2, True))
+        self.assertGreater(report['steps_per_swap'], 0)
@@ -4,7 +4,7 @@ import pytest
 import math
 from functools import reduce
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
 from starkware.starknet.testing.starknet import Starknet
 from utils import (
@@ -23,7 +23,7 @@ class BitmathTest(TestCase):
     @classmethod
     async def setUp(cls):
         cls.starknet = await Starknet.empty()
-        compiled_contract = compile_starknet_files(
+        compiled_contract = compile_cached(
             [CONTRACT_FILE], debug_info=True, disable_hint_validation=True
         )
         kwargs = (
@@ -0,0 +1,136 @@
+"""event_store.py test file."""
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from asynctest import TestCase
+
+from event_store import EventStore, EventDecoder, SCHEMAS, COLUMN_TYPES, META_FILE, main
+from profile_swap_pool import ProfiledPool
+from snapshots import fork, get_snapshot, address
+from starkware.starknet.public.abi import get_selector_from_name
+from test_tickmath import MIN_SQRT_RATIO, MAX_SQRT_RATIO
+from utils import to_uint, int_to_felt, felt_to_int, from_uint, expand_to_18decimals
+
+POOL = 0x1234
+OTHER_POOL = 0x5678
+
+
+def swap_event(recipient, amount0, amount1, tick):
+    """Raw data of a Swap event"""
+    return [
+        recipient, 1, *to_uint(10 ** 18), *to_uint(MIN_SQRT_RATIO + 1), address,
+        *to_uint(amount0 % 2 ** 256), *to_uint(amount1 % 2 ** 256), *to_uint(2 ** 96), 10 ** 18, int_to_felt(tick)
+    ]
+
+
+SWAP_KEYS = [get_selector_from_name('Swap')]
+
+
+class EventStoreTest(TestCase):
+
+    @pytest.mark.asyncio
+    async def test_schemas_match_abi(self):
+        _, info = await get_snapshot('swap_pool')
+        events = {item['name']: item for item in info['contract_def'].abi if item['type'] == 'event'}
+        # besides OwnershipTransferred of the Ownable library
+        self.assertEqual(sorted(events), sorted(list(SCHEMAS) + ['OwnershipTransferred']))
+        for name, schema in SCHEMAS.items():
+            self.assertEqual([member['name'] for member in events[name]['data']], [column for column, _ in schema])
+            self.assertEqual(
+                [member['type'] for member in events[name]['data']],
+                ['Uint256' if COLUMN_TYPES[kind][1] == 2 else 'felt' for _, kind in schema]
+            )
+
+    def test_decode(self):
+        decoder = EventDecoder()
+        name, pool, row = decoder.decode(POOL, SWAP_KEYS, swap_event(7, 10 ** 18, -5 * 10 ** 17, -887))
+        self.assertEqual((name, pool), ('Swap', POOL))
+        self.assertEqual(row['recipient'], 7)
+        self.assertEqual(row['amount0'], 10 ** 18)
+        self.assertEqual(row['amount1'], -5 * 10 ** 17)
+        self.assertEqual(row['tick'], -887)
+        self.assertEqual(row['sqrt_price_limit_x96'], MIN_SQRT_RATIO + 1)
+
+        self.assertIsNone(decoder.decode(POOL, [get_selector_from_name('Transfer')], [1, 2, 3, 4]))
+
+    def test_append_and_find(self):
+        with tempfile.TemporaryDirectory() as root:
+            with EventStore(root, blocks_per_partition=10, flush_rows=7) as store:
+                for block in range(30):
+                    for pool in [POOL, OTHER_POOL]:
+                        store.append_raw(block, pool, SWAP_KEYS, swap_event(block % 3, block, -block, block * 10 - 150))
+
+            store = EventStore(root, blocks_per_partition=10)
+            self.assertEqual(store.stats(), {'Swap': {'partitions': 6, 'rows': 60}})
+
+            # every block is in the partition of its block range
+            for values, partition in store.scan('Swap', ['block_number', 'tick', 'amount1'], pool=POOL):
+                start = int(partition.path.name)
+                self.assertTrue(all(start <= block < start + 10 for block in values['block_number']))
+                self.assertEqual(list(values['amount1']), [-block for block in values['block_number']])
+
+            self.assertEqual(len(store.partitions('Swap', POOL, blocks=(12, 25))), 2)
+
+            rows = store.find('Swap', 'tick', -10, 10, pool=POOL)
+            self.assertEqual([row['block_number'] for row in rows], [14, 15, 16])
+
+            rows = store.find('Swap', 'recipient', 2, blocks=(0, 9))
+            self.assertEqual(sorted((row['block_number'], row['event_index']) for row in rows), [(2, 0), (2, 1), (5, 0), (5, 1), (8, 0), (8, 1)])
+
+    def test_interrupted_append(self):
+        with tempfile.TemporaryDirectory() as root:
+            with EventStore(root) as store:
+                store.append_raw(1, POOL, SWAP_KEYS, swap_event(1, 1, -1, 10))
+
+            partition, = EventStore(root).partitions('Swap')
+            # bytes of an append interrupted before its meta was written
+            with open(partition.column_path('tick'), 'ab') as f:
+                f.write(b'\xff' * 8)
+            self.assertEqual(list(partition.read('tick')), [10])
+
+            with EventStore(root) as store:
+                store.append_raw(2, POOL, SWAP_KEYS, swap_event(1, 2, -2, 20))
+            partition, = EventStore(root).partitions('Swap')
+            self.assertEqual(list(partition.read('tick')), [10, 20])
+            self.assertEqual(json.loads((partition.path / META_FILE).read_text())['rows'], 2)
+            self.assertEqual(partition.lookup('tick', 20), [1])
+
+    def test_ingest_stream(self):
+        with tempfile.TemporaryDirectory() as root:
+            events = Path(root) / 'events.jsonl'
+            with open(events, 'w') as f:
+                for block in range(5):
+                    f.write(json.dumps({
+                        'block_number': block, 'from_address': hex(POOL),
+                        'keys': [hex(key) for key in SWAP_KEYS], 'data': [hex(value) for value in swap_event(1, block, -block, block)]
+                    }) + '\n')
+                f.write(json.dumps({'block_number': 5, 'from_address': hex(POOL), 'keys': ['0x1'], 'data': []}) + '\n')
+
+            self.assertEqual(main(['event_store.py', 'ingest', str(events), str(Path(root) / 'store')]), 0)
+            self.assertEqual(EventStore(Path(root) / 'store').stats(), {'Swap': {'partitions': 1, 'rows': 5}})
+
+    @pytest.mark.asyncio
+    async def test_execution_info_events(self):
+        pool = ProfiledPool(*await fork('swap_pool.zero_tick'))
+        pool_address = pool.swap_pool.contract_address
+        with tempfile.TemporaryDirectory() as root:
+            with EventStore(root) as store:
+                store.append(1, await pool.add_liquidity(-600, 600, expand_to_18decimals(1)))
+                store.append(2, await pool.swap(True, 10 ** 17, MIN_SQRT_RATIO + 1))
+                store.append(2, await pool.swap(False, 10 ** 17, MAX_SQRT_RATIO - 1))
+
+            res = await pool.swap_pool.get_cur_state().call()
+            tick = felt_to_int(res.call_info.result[2])
+
+            swaps = store.find('Swap', 'recipient', address, pool=pool_address)
+            # every swap emits a TransferToken event before its Swap event
+            self.assertEqual([(row['block_number'], row['event_index']) for row in swaps], [(2, 1), (2, 3)])
+            self.assertEqual(swaps[0]['amount0'], 10 ** 17)
+            self.assertLess(swaps[0]['amount1'], 0)
+            self.assertEqual(swaps[1]['tick'], tick)
+            self.assertEqual(swaps[1]['sqrt_price_x96'], from_uint(res.call_info.result[0:2]))
+
+            adds = store.find('AddLiquidity', 'tick_lower', -600, pool=pool_address)
+            self.assertEqual(len(adds), 1)
+            self.assertEqual((adds[0]['tick_upper'], adds[0]['amount']), (600, expand_to_18decimals(1)))
@@ -0,0 +1,96 @@
+"""fuzz_math.py and reference/liquidity_amounts.py test file."""
+import random
+import tempfile
+import pytest
+from pathlib import Path
+from asynctest import TestCase
+
+from fuzz_math import (
+    Target, UINT256, TARGETS_BY_NAME, fuzz, reference_search, shrink, cairo_evaluate,
+    load_regressions, save_regression, random_bits
+)
+from reference import liquidity_amounts as la
+from utils import encode_price_sqrt, from_uint
+
+
+def price(reserve1, reserve0):
+    return from_uint(encode_price_sqrt(reserve1, reserve0))
+
+
+class FuzzMathTest(TestCase):
+
+    def test_reference_liquidity_amounts(self):
+        price_a, price_b = price(100, 110), price(110, 100)
+
+        self.assertEqual(la.get_liquidity_for_amounts(price(1, 1), price_a, price_b, 100, 200), 2148)
+        self.assertEqual(la.get_liquidity_for_amounts(price(99, 110), price_a, price_b, 100, 200), 1048)
+        self.assertEqual(la.get_liquidity_for_amounts(price(111, 100), price_a, price_b, 100, 200), 2097)
+        self.assertEqual(la.get_liquidity_for_amounts(price_a, price_a, price_b, 100, 200), 1048)
+        self.assertEqual(la.get_liquidity_for_amounts(price_b, price_a, price_b, 100, 200), 2097)
+
+        self.assertEqual(la.get_amounts_for_liquidity(price(1, 1), price_a, price_b, 2148), (99, 99))
+        self.assertEqual(la.get_amounts_for_liquidity(price(99, 110), price_a, price_b, 1048), (99, 0))
+        self.assertEqual(la.get_amounts_for_liquidity(price(111, 100), price_a, price_b, 2097), (0, 199))
+        # the order of the range prices does not matter
+        self.assertEqual(la.get_amounts_for_liquidity(price(1, 1), price_b, price_a, 2148), (99, 99))
+
+        with self.assertRaisesRegex(ValueError, "liquidity overflows uint128"):
+            la.get_liquidity_for_amount1(price_a, price_b, 2 ** 200)
+        # uint256_unsigned_div_rem returns 0 for a zero divisor
+        self.assertEqual(la.get_amount0_for_liquidity(0, price_b, 1), 0)
+
+    def test_random_bits(self):
+        rng = random.Random(0)
+        values = [random_bits(rng, 128) for _ in range(10000)]
+        self.assertTrue(all(0 <= value < 2 ** 128 for value in values))
+        self.assertIn(0, values)
+        self.assertIn(2 ** 128 - 1, values)
+        # the bit lengths are roughly uniform
+        self.assertGreater(len([value for value in values if value.bit_length() <= 64]), 3000)
+
+    def test_reference_search(self):
+        target = TARGETS_BY_NAME['fullmath.uint256_mul_div']
+        interesting = reference_search(target.name, 5000, 'seed')
+        self.assertEqual(interesting, reference_search(target.name, 5000, 'seed'))
+        # reverts (zero denominator, overflow) and results are both found
+        self.assertTrue(any(key[1] is None for key in interesting))
+        self.assertTrue(any(key[1] is not None for key in interesting))
+
+    @pytest.mark.asyncio
+    async def test_shrink(self):
+        # a reference missing the rounding up of uint256_div_roundingup
+        target = Target(
+            'broken.div_roundingup', TARGETS_BY_NAME['fullmath.uint256_div_roundingup'].mock,
+            'uint256_div_roundingup', [UINT256, UINT256], lambda a, b: a // b if b else 0
+        )
+        args = [123456789123456789, 1000003]
+        self.assertNotEqual(await cairo_evaluate(target, args), target.evaluate(args))
+
+        args = await shrink(target, args)
+        self.assertEqual(args[0], 1)
+        self.assertLess(args[1], 1000003)
+        self.assertNotEqual(await cairo_evaluate(target, args), target.evaluate(args))
+
+    def test_save_regression(self):
+        target = TARGETS_BY_NAME['fullmath.uint256_div_roundingup']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'regressions.json'
+            self.assertEqual(load_regressions(path), [])
+            save_regression(target, [1, 2], [0, 0], [1, 0], path)
+            save_regression(target, [1, 2], [0, 0], [1, 0], path)
+            self.assertEqual(load_regressions(path), [
+                {'target': target.name, 'args': ['1', '2'], 'reference': [0, 0], 'cairo': [1, 0]}
+            ])
+
+    def test_fuzz(self):
+        report = fuzz(2000, sample=2, max_cases=8, only='fullmath.uint256_div_roundingup', save=False, log=lambda *args: None)
+        item = report['fullmath.uint256_div_roundingup']
+        self.assertEqual(item['cairo_cases'], 10)
+        self.assertEqual(item['divergences'], [])
+
+    @pytest.mark.asyncio
+    async def test_regressions(self):
+        for item in load_regressions():
+            target = TARGETS_BY_NAME[item['target']]
+            args = [int(arg) for arg in item['args']]
+            self.assertEqual(await cairo_evaluate(target, args), target.evaluate(args), item)
@@ -4,7 +4,7 @@ import math
 from functools import reduce
 from starkware.starknet.testing.starknet import Starknet
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
 from utils import (
     MAX_UINT256, assert_revert, add_uint, sub_uint,
@@ -16,7 +16,7 @@ CONTRACT_FILE = os.path.join("tests", "mocks/liquidity_amounts_mock.cairo")
 
 async def init_contract():
     starknet = await Starknet.empty()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         [CONTRACT_FILE], debug_info=True, disable_hint_validation=True
     )
     kwargs = (
@@ -0,0 +1,103 @@
+"""pool_mirror.py test file."""
+import copy
+import tempfile
+import pytest
+from pathlib import Path
+from asynctest import TestCase
+
+from event_store import EventStore, iter_events
+from pool_mirror import PoolStateMirror, MirrorError
+from profile_swap_pool import ProfiledPool
+from snapshots import fork, address
+from test_event_store import SWAP_KEYS
+from test_tickmath import MIN_SQRT_RATIO, MAX_SQRT_RATIO
+from utils import (
+    FeeAmount, TICK_SPACINGS, MAX_UINT128, encode_price_sqrt, expand_to_18decimals, get_min_tick, get_max_tick,
+    int_to_felt, load_swap_pool_simulator
+)
+
+tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+
+
+async def run_pool_history(pool):
+    """Runs initialize, liquidity changes and tick crossing swaps, returns the CallInfo of every step"""
+    swap_pool = pool.swap_pool
+    infos = [
+        await pool.run(swap_pool.initialize_price(encode_price_sqrt(1, 1))),
+        await pool.run(swap_pool.set_fee_protocol(2000, 1250), address),
+        await pool.add_liquidity(get_min_tick(tick_spacing), get_max_tick(tick_spacing), expand_to_18decimals(1)),
+        await pool.add_liquidity(-tick_spacing * 2, tick_spacing * 2, expand_to_18decimals(3)),
+        await pool.add_liquidity(tick_spacing, tick_spacing * 4, expand_to_18decimals(2)),
+        # crosses -2 * tick_spacing
+        await pool.swap(True, expand_to_18decimals(1) // 10, MIN_SQRT_RATIO + 1),
+        # crosses back and then tick_spacing, 2 * tick_spacing and 4 * tick_spacing
+        await pool.swap(False, expand_to_18decimals(1), MAX_SQRT_RATIO - 1),
+        await pool.run(swap_pool.remove_liquidity(int_to_felt(-tick_spacing * 2), int_to_felt(tick_spacing * 2), expand_to_18decimals(3)), address),
+        await pool.swap(True, expand_to_18decimals(1) // 2, MIN_SQRT_RATIO + 1),
+        await pool.run(swap_pool.collect_protocol(address, MAX_UINT128, MAX_UINT128), address),
+    ]
+    return infos
+
+
+class PoolMirrorTest(TestCase):
+
+    def assert_mirrors(self, mirror, pool_sim):
+        sim = mirror.simulator
+        self.assertEqual(
+            (sim.sqrt_price_x96, sim.tick, sim.liquidity, sim.fee_protocol0, sim.fee_protocol1),
+            (pool_sim.sqrt_price_x96, pool_sim.tick, pool_sim.liquidity, pool_sim.fee_protocol0, pool_sim.fee_protocol1)
+        )
+        self.assertEqual(
+            (sim.fee_growth_global0_x128, sim.fee_growth_global1_x128, sim.protocol_fee_token0, sim.protocol_fee_token1),
+            (pool_sim.fee_growth_global0_x128, pool_sim.fee_growth_global1_x128, pool_sim.protocol_fee_token0, pool_sim.protocol_fee_token1)
+        )
+        self.assertEqual(sim.bitmap.words, pool_sim.bitmap.words)
+        self.assertEqual(mirror.initialized_ticks(), {tick: pool_sim.tick_mgr.ticks[tick] for tick in sorted(pool_sim.tick_mgr.ticks)})
+
+    @pytest.mark.asyncio
+    async def test_mirror_and_checkpoint(self):
+        pool = ProfiledPool(*await fork('swap_pool'))
+        pool_address = pool.swap_pool.contract_address
+        infos = await run_pool_history(pool)
+        pool_sim = await load_swap_pool_simulator(pool.swap_pool)
+        self.assertEqual(pool_sim.tick_mgr.ticks.keys(), {get_min_tick(tick_spacing), get_max_tick(tick_spacing), tick_spacing, tick_spacing * 4})
+
+        mirror = PoolStateMirror(pool_address, tick_spacing, FeeAmount.MEDIUM)
+        for info in infos:
+            mirror.apply_execution_info(info)
+        self.assert_mirrors(mirror, pool_sim)
+
+        with tempfile.TemporaryDirectory() as root:
+            with EventStore(Path(root) / 'store') as store:
+                for block, info in enumerate(infos[:6]):
+                    store.append(block, info)
+            mirror = PoolStateMirror(pool_address, tick_spacing, FeeAmount.MEDIUM)
+            self.assertGreater(mirror.apply_store(store), 0)
+            mirror.checkpoint(Path(root) / 'mirror.pickle')
+
+            with EventStore(Path(root) / 'store') as store:
+                for block, info in enumerate(infos[6:], 6):
+                    store.append(block, info)
+            restored = PoolStateMirror.restore(Path(root) / 'mirror.pickle')
+            # only the events after the checkpoint are applied
+            self.assertEqual(restored.apply_store(store), 4)
+            self.assert_mirrors(restored, pool_sim)
+            self.assertEqual(restored.apply_store(store), 0)
+
+    @pytest.mark.asyncio
+    async def test_divergent_swap(self):
+        pool = ProfiledPool(*await fork('swap_pool.zero_tick'))
+        pool_address = pool.swap_pool.contract_address
+        mirror = PoolStateMirror(pool_address, tick_spacing, FeeAmount.MEDIUM, await load_swap_pool_simulator(pool.swap_pool))
+        info = await pool.swap(True, expand_to_18decimals(1) // 10, MIN_SQRT_RATIO + 1)
+
+        swap, = [event for event in iter_events(info) if event.keys == SWAP_KEYS]
+        data = list(swap.data)
+        # the resulting tick is the last member of the Swap event
+        data[-1] = int_to_felt(-1)
+        with self.assertRaises(MirrorError):
+            copy.deepcopy(mirror).apply_raw(swap.from_address, swap.keys, data)
+
+        self.assertTrue(mirror.apply_raw(swap.from_address, swap.keys, swap.data))
+        self.assertEqual(mirror.simulator.tick, (await load_swap_pool_simulator(pool.swap_pool)).tick)
+        self.assertFalse(mirror.apply_raw(pool.token0.contract_address, swap.keys, swap.data))
@@ -0,0 +1,37 @@
+"""profile_swap_pool.py test file."""
+import pytest
+from asynctest import TestCase
+
+from profile_swap_pool import diff_reports, profile
+
+
+class ProfileSwapPoolTest(TestCase):
+
+    def test_diff_reports(self):
+        baseline = {
+            'swap': {'n_steps': 1000, 'storage_reads': 10},
+            'collect': {'n_steps': 500, 'storage_reads': 4},
+        }
+        report = {
+            'swap': {'n_steps': 1005, 'storage_reads': 12},
+            'add_liquidity': {'n_steps': 800, 'storage_reads': 7},
+        }
+        self.assertEqual(diff_reports(baseline, report, threshold=1), [
+            ('add_liquidity', 'n_steps', None, 800),
+            ('add_liquidity', 'storage_reads', None, 7),
+            ('collect', 'n_steps', 500, None),
+            ('collect', 'storage_reads', 4, None),
+            ('swap', 'storage_reads', 10, 12),
+        ])
+        self.assertEqual(diff_reports(report, report), [])
+
+    @pytest.mark.asyncio
+    async def test_profile_swap_cross(self):
+        report = await profile('swap_cross_1_ticks')
+        self.assertEqual(list(report), ['swap_cross_1_ticks'])
+        metrics = report['swap_cross_1_ticks']
+        self.assertGreater(metrics['n_steps'], 0)
+        self.assertGreater(metrics['range_check'], 0)
+        self.assertGreater(metrics['storage_reads'], 0)
+        # slot0, liquidity, fee growth, the crossed tick and the token balances
+        self.assertGreater(metrics['storage_writes'], 4)
@@ -0,0 +1,153 @@
+"""reference/sqrt_price_math.py and reference/sqrt_price_math_batch.py test file."""
+import math
+import random
+import unittest
+from unittest import TestCase
+
+from reference import sqrt_price_math as spm
+from reference.fullmath import MAX_UINT256
+
+try:
+    import numpy as np
+    from reference import sqrt_price_math_batch as batch
+except ImportError:
+    np = None
+
+
+def encode_price_sqrt(reserve1, reserve0):
+    return math.isqrt((reserve1 << 192) // reserve0)
+
+
+def expand_to_18decimals(n):
+    return n * (10 ** 18)
+
+
+class ReferenceSqrtPriceMathTest(TestCase):
+
+    def test_get_amount0_delta(self):
+        self.assertEqual(spm.get_amount0_delta(encode_price_sqrt(1, 1), encode_price_sqrt(2, 1), 0, True), 0)
+        self.assertEqual(spm.get_amount0_delta(encode_price_sqrt(1, 1), encode_price_sqrt(1, 1), 0, True), 0)
+
+        amount0 = spm.get_amount0_delta(encode_price_sqrt(1, 1), encode_price_sqrt(121, 100), expand_to_18decimals(1), True)
+        self.assertEqual(amount0, 90909090909090910)
+        amount0_down = spm.get_amount0_delta(encode_price_sqrt(1, 1), encode_price_sqrt(121, 100), expand_to_18decimals(1), False)
+        self.assertEqual(amount0, amount0_down + 1)
+
+        up = spm.get_amount0_delta(encode_price_sqrt(2 ** 90, 1), encode_price_sqrt(2 ** 96, 1), expand_to_18decimals(1), True)
+        down = spm.get_amount0_delta(encode_price_sqrt(2 ** 90, 1), encode_price_sqrt(2 ** 96, 1), expand_to_18decimals(1), False)
+        self.assertEqual(up, down + 1)
+
+    def test_get_amount1_delta(self):
+        self.assertEqual(spm.get_amount1_delta(encode_price_sqrt(1, 1), encode_price_sqrt(2, 1), 0, True), 0)
+        self.assertEqual(spm.get_amount1_delta(encode_price_sqrt(1, 1), encode_price_sqrt(121, 100), expand_to_18decimals(1), True), 100000000000000000)
+        self.assertEqual(spm.get_amount1_delta(encode_price_sqrt(1, 1), encode_price_sqrt(121, 100), expand_to_18decimals(1), False), 100000000000000000 - 1)
+
+    def test_delta2(self):
+        price0, price1 = encode_price_sqrt(1, 1), encode_price_sqrt(121, 100)
+        liquidity = expand_to_18decimals(1)
+        self.assertEqual(spm.get_amount0_delta2(price0, price1, liquidity), 90909090909090910)
+        self.assertEqual(spm.get_amount0_delta2(price0, price1, -liquidity), -(90909090909090910 - 1))
+        self.assertEqual(spm.get_amount1_delta2(price0, price1, -liquidity), -(100000000000000000 - 1))
+        self.assertEqual(spm.to_uint256(-1), MAX_UINT256)
+
+    def test_get_next_sqrt_price_from_input(self):
+        with self.assertRaisesRegex(ValueError, "sqrt_price_x96 must be greater than 0"):
+            spm.get_next_sqrt_price_from_input(0, 1, expand_to_18decimals(1) // 10, False)
+        with self.assertRaisesRegex(ValueError, "liquidity must be greater than 0"):
+            spm.get_next_sqrt_price_from_input(1, 0, expand_to_18decimals(1) // 10, False)
+
+        self.assertEqual(spm.get_next_sqrt_price_from_input(1, 1, 2 ** 255, True), 1)
+
+        price = encode_price_sqrt(1, 1)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, expand_to_18decimals(1) // 10, 0, True), price)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, expand_to_18decimals(1) // 10, 0, False), price)
+
+        price = 2 ** 160 - 1
+        liquidity = 2 ** 128 - 1
+        amount = 2 ** 256 - 1 - (liquidity * 2 ** 96 // price)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, liquidity, amount, True), 1)
+
+        price = encode_price_sqrt(1, 1)
+        liquidity = expand_to_18decimals(1)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, liquidity, liquidity // 10, False), 87150978765690771352898345369)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, liquidity, liquidity // 10, True), 72025602285694852357767227579)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, expand_to_18decimals(10), 2 ** 100, True), 624999999995069620)
+        self.assertEqual(spm.get_next_sqrt_price_from_input(price, 1, (2 ** 256 - 1) // 2, True), 1)
+
+    def test_get_next_sqrt_price_from_output(self):
+        with self.assertRaisesRegex(ValueError, "sqrt_price_x96 must be greater than 0"):
+            spm.get_next_sqrt_price_from_output(0, 0, expand_to_18decimals(1) // 10, False)
+        with self.assertRaisesRegex(ValueError, "liquidity must be greater than 0"):
+            spm.get_next_sqrt_price_from_output(1, 0, expand_to_18decimals(1) // 10, False)
+
+        price = 20282409603651670423947251286016
+        for amount_out, zero_for_one in [(4, False), (5, False), (262145, True), (262144, True)]:
+            with self.assertRaises(ValueError):
+                spm.get_next_sqrt_price_from_output(price, 1024, amount_out, zero_for_one)
+        self.assertEqual(spm.get_next_sqrt_price_from_output(price, 1024, 262143, True), 77371252455336267181195264)
+
+        price = encode_price_sqrt(1, 1)
+        liquidity = expand_to_18decimals(1)
+        self.assertEqual(spm.get_next_sqrt_price_from_output(price, liquidity // 10, 0, True), price)
+        self.assertEqual(spm.get_next_sqrt_price_from_output(price, liquidity, liquidity // 10, False), 88031291682515930659493278152)
+        self.assertEqual(spm.get_next_sqrt_price_from_output(price, liquidity, liquidity // 10, True), 71305346262837903834189555302)
+
+        for zero_for_one in [True, False]:
+            with self.assertRaises(ValueError):
+                spm.get_next_sqrt_price_from_output(price, 1, MAX_UINT256, zero_for_one)
+
+    def test_swap_computation(self):
+        price = 1025574284609383690408304870162715216695788925244
+        liquidity = 50015962439936049619261659728067971248
+        sqrt_q = spm.get_next_sqrt_price_from_input(price, liquidity, 406, True)
+        self.assertEqual(sqrt_q, 1025574284609383582644711336373707553698163132913)
+        self.assertEqual(spm.get_amount0_delta(sqrt_q, price, liquidity, True), 406)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ReferenceSqrtPriceMathBatchTest(TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.prices0 = [rng.randrange(1, 2 ** 160) for _ in range(200)] + [encode_price_sqrt(1, 1), 2 ** 200 + 3]
+        self.prices1 = [rng.randrange(1, 2 ** 160) for _ in range(200)] + [encode_price_sqrt(121, 100), 2 ** 199]
+        self.liquidity = [rng.randrange(0, 2 ** 128) for _ in range(200)] + [expand_to_18decimals(1), 0]
+
+    def limbs(self, values):
+        return [v & (2 ** 128 - 1) for v in values], [v >> 128 for v in values]
+
+    def test_split_join(self):
+        values = np.array(self.prices0, dtype=object)
+        self.assertEqual(list(batch.join(batch.split(values))), self.prices0)
+
+        low, high = self.limbs(self.prices1)
+        self.assertEqual(list(batch.join((np.array(low, dtype=object), np.array(high, dtype=object)))), self.prices1)
+
+    def test_amount_deltas(self):
+        p0, p1 = self.limbs(self.prices0), self.limbs(self.prices1)
+        for roundup in [True, False]:
+            res0 = batch.join(batch.get_amount0_delta(p0, p1, self.liquidity, roundup))
+            res1 = batch.join(batch.get_amount1_delta(p0, p1, self.liquidity, roundup))
+            for i, (a, b, liquidity) in enumerate(zip(self.prices0, self.prices1, self.liquidity)):
+                self.assertEqual(res0[i], spm.get_amount0_delta(a, b, liquidity, roundup))
+                self.assertEqual(res1[i], spm.get_amount1_delta(a, b, liquidity, roundup))
+
+        roundup = [i % 2 == 0 for i in range(len(self.liquidity))]
+        res0 = batch.join(batch.get_amount0_delta(p0, p1, self.liquidity, roundup))
+        for i, (a, b, liquidity) in enumerate(zip(self.prices0, self.prices1, self.liquidity)):
+            self.assertEqual(res0[i], spm.get_amount0_delta(a, b, liquidity, roundup[i]))
+
+    def test_amount_deltas2(self):
+        p0, p1 = self.limbs(self.prices0), self.limbs(self.prices1)
+        liquidity = [l if i % 3 else -l for i, l in enumerate(self.liquidity)]
+        res0 = batch.join(batch.get_amount0_delta2(p0, p1, liquidity))
+        res1 = batch.join(batch.get_amount1_delta2(p0, p1, liquidity))
+        for i, (a, b, l) in enumerate(zip(self.prices0, self.prices1, liquidity)):
+            self.assertEqual(res0[i], spm.to_uint256(spm.get_amount0_delta2(a, b, l)))
+            self.assertEqual(res1[i], spm.to_uint256(spm.get_amount1_delta2(a, b, l)))
+
+    def test_revert(self):
+        with self.assertRaisesRegex(ValueError, "price_a must be greater than 0 at index 1"):
+            batch.get_amount0_delta(([1, 0], [0, 0]), ([2, 2], [0, 0]), [1, 1], True)
+        with self.assertRaisesRegex(ValueError, "overflows uint256 at index 0"):
+            batch.get_amount1_delta(([0], [2 ** 128 - 1]), ([1], [0]), [2 ** 128 - 1], True)
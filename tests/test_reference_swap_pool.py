@@ -0,0 +1,156 @@
+"""reference/swap_pool.py, reference/tick_bitmap.py and reference/tick_mgr.py test file."""
+import math
+from unittest import TestCase
+
+from reference.swap_pool import SwapPoolSimulator
+from reference.tick_bitmap import TickBitmap
+from reference.tick_mgr import TickMgr, get_max_liquidity_per_tick
+from reference.tickmath import MIN_SQRT_RATIO, MAX_SQRT_RATIO, get_tick_at_sqrt_ratio
+
+
+def encode_price_sqrt(reserve1, reserve0):
+    return math.isqrt((reserve1 << 192) // reserve0)
+
+
+def expand_to_18decimals(n):
+    return n * (10 ** 18)
+
+
+def make_pool(tick_spacing, fee, positions, sqrt_price_x96=None):
+    """Pool at `sqrt_price_x96` (1:1 by default) holding `positions` [(tick_lower, tick_upper, liquidity)]."""
+    if sqrt_price_x96 is None:
+        sqrt_price_x96 = encode_price_sqrt(1, 1)
+    tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+    max_liquidity = get_max_liquidity_per_tick(tick_spacing)
+
+    ticks = TickMgr()
+    liquidity = 0
+    for tick_lower, tick_upper, amount in positions:
+        ticks.update(tick_lower, tick, amount, 0, 0, False, max_liquidity)
+        ticks.update(tick_upper, tick, amount, 0, 0, True, max_liquidity)
+        if tick_lower <= tick < tick_upper:
+            liquidity += amount
+    return SwapPoolSimulator.from_ticks(sqrt_price_x96, tick, liquidity, tick_spacing, fee, ticks.ticks)
+
+
+class ReferenceTickBitmapTest(TestCase):
+
+    def test_flip_tick(self):
+        bitmap = TickBitmap()
+        bitmap.flip_tick(-230, 1)
+        self.assertTrue(bitmap.is_initialized(-230, 1))
+        for tick in [-231, -229, -230 + 256, -230 - 256]:
+            self.assertFalse(bitmap.is_initialized(tick, 1))
+        self.assertEqual(bitmap.summary, {-1: 1 << 255})
+        bitmap.flip_tick(-230, 1)
+        self.assertFalse(bitmap.is_initialized(-230, 1))
+        self.assertEqual(bitmap.words, {})
+        self.assertEqual(bitmap.summary, {})
+
+        with self.assertRaisesRegex(ValueError, "tick must be multiples of tick_spacing"):
+            bitmap.flip_tick(6, 12)
+
+    def test_next_valid_tick_within_one_word(self):
+        bitmap = TickBitmap()
+        for tick in [-200, -55, -4, 70, 78, 84, 139, 240, 535]:
+            bitmap.flip_tick(tick, 1)
+
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(78, 1, False), (84, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(-55, 1, False), (-4, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(77, 1, False), (78, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(-56, 1, False), (-55, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(255, 1, False), (511, False))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(-257, 1, False), (-200, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(508, 1, False), (511, False))
+
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(78, 1, True), (78, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(79, 1, True), (78, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(258, 1, True), (256, False))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(72, 1, True), (70, True))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(-257, 1, True), (-512, False))
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(1023, 1, True), (768, False))
+
+        bitmap.flip_tick(329, 1)
+        self.assertEqual(bitmap.next_valid_tick_within_one_word(456, 1, True), (329, True))
+
+    def test_next_valid_tick(self):
+        bitmap = TickBitmap()
+        for tick in [-70000, -3000, 78, 84, 5000, 66000]:
+            bitmap.flip_tick(tick, 1)
+
+        # within the word of the tick
+        self.assertEqual(bitmap.next_valid_tick(78, 1, False), (84, True))
+        self.assertEqual(bitmap.next_valid_tick(80, 1, True), (78, True))
+        # skips the empty words
+        self.assertEqual(bitmap.next_valid_tick(84, 1, False), (5000, True))
+        self.assertEqual(bitmap.next_valid_tick(-1, 1, True), (-3000, True))
+        # or stops at the edge of the summary word
+        self.assertEqual(bitmap.next_valid_tick(77, 1, True), (0, False))
+        self.assertEqual(bitmap.next_valid_tick(-3001, 1, True), (-65536, False))
+        self.assertEqual(bitmap.next_valid_tick(-65537, 1, True), (-70000, True))
+        self.assertEqual(bitmap.next_valid_tick(5000, 1, False), (65535, False))
+        self.assertEqual(bitmap.next_valid_tick(65535, 1, False), (66000, True))
+
+        bitmap = TickBitmap()
+        bitmap.flip_tick(-600, 200)
+        bitmap.flip_tick(887200, 200)
+        self.assertEqual(bitmap.next_valid_tick(0, 200, False), (887200, True))
+        self.assertEqual(bitmap.next_valid_tick(887000, 200, True), (0, False))
+        self.assertEqual(bitmap.next_valid_tick(-1, 200, True), (-600, True))
+        self.assertEqual(bitmap.next_valid_tick(-800, 200, True), (-65536 * 200, False))
+
+
+class ReferenceSwapPoolTest(TestCase):
+
+    def test_swapping_across_gaps(self):
+        liquidity = expand_to_18decimals(1) // 4
+
+        pool = make_pool(12, 3000, [(120000, 121200, liquidity)])
+        result = pool.swap(False, expand_to_18decimals(1), MAX_SQRT_RATIO - 1)
+        self.assertEqual(result.tick, 120196)
+        self.assertEqual(result.amount1, expand_to_18decimals(1))
+        self.assertEqual(result.crossed_ticks, [120000])
+        self.assertEqual(pool.tick, 120196)
+        self.assertEqual(pool.liquidity, liquidity)
+
+        pool = make_pool(12, 3000, [(-121200, -120000, liquidity)])
+        result = pool.swap(True, expand_to_18decimals(1), MIN_SQRT_RATIO + 1)
+        self.assertEqual(result.tick, -120197)
+        self.assertEqual(result.amount0, expand_to_18decimals(1))
+        self.assertEqual(result.crossed_ticks, [-120000])
+
+    def test_quote_does_not_mutate(self):
+        pool = make_pool(60, 3000, [(-887220, 887220, expand_to_18decimals(2)), (-600, 600, expand_to_18decimals(3))])
+        before = (pool.sqrt_price_x96, pool.tick, pool.liquidity, dict(pool.tick_mgr.ticks))
+
+        quote = pool.get_swap_results(True, expand_to_18decimals(10), MIN_SQRT_RATIO + 1)
+        self.assertEqual(quote.crossed_ticks, [-600])
+        self.assertEqual(before, (pool.sqrt_price_x96, pool.tick, pool.liquidity, dict(pool.tick_mgr.ticks)))
+
+        result = pool.swap(True, expand_to_18decimals(10), MIN_SQRT_RATIO + 1)
+        self.assertEqual(result, quote)
+        self.assertEqual(pool.liquidity, expand_to_18decimals(2))
+        # crossed with the fee growth accrued up to the crossing
+        fee_growth_outside0 = pool.tick_mgr.get_tick(-600).fee_growth_outside0_x128
+        self.assertGreater(fee_growth_outside0, 0)
+        self.assertLess(fee_growth_outside0, quote.fee_growth_global_x128)
+        self.assertEqual(pool.fee_growth_global0_x128, quote.fee_growth_global_x128)
+
+    def test_exact_output_and_round_trip(self):
+        pool = make_pool(60, 3000, [(-887220, 887220, expand_to_18decimals(2))])
+
+        exact_in = pool.get_swap_results(True, expand_to_18decimals(1) // 10, MIN_SQRT_RATIO + 1)
+        exact_out = pool.get_swap_results(True, exact_in.amount1, MIN_SQRT_RATIO + 1)
+        self.assertGreater(exact_in.amount0, 0)
+        self.assertLess(exact_in.amount1, 0)
+        self.assertEqual(exact_out.amount1, exact_in.amount1)
+        self.assertLessEqual(exact_out.amount0, exact_in.amount0)
+
+    def test_invalid_price_limit(self):
+        pool = make_pool(60, 3000, [(-887220, 887220, expand_to_18decimals(2))])
+        with self.assertRaisesRegex(ValueError, "ZO: price limit too high"):
+            pool.get_swap_results(True, 1, pool.sqrt_price_x96)
+        with self.assertRaisesRegex(ValueError, "OZ: price limit too high"):
+            pool.get_swap_results(False, 1, MAX_SQRT_RATIO)
+        with self.assertRaisesRegex(ValueError, "Amount specified is zero"):
+            pool.get_swap_results(False, 0, MAX_SQRT_RATIO - 1)
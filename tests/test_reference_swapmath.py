@@ -0,0 +1,92 @@
+"""reference/swapmath.py test file."""
+import math
+from unittest import TestCase
+
+from reference.swapmath import compute_swap_step
+from reference.sqrt_price_math import get_next_sqrt_price_from_input, get_next_sqrt_price_from_output
+
+
+def encode_price_sqrt(reserve1, reserve0):
+    return math.isqrt((reserve1 << 192) // reserve0)
+
+
+def expand_to_18decimals(n):
+    return n * (10 ** 18)
+
+
+class ReferenceSwapMathTest(TestCase):
+
+    def test_exact_amount_in_capped_at_price_target(self):
+        price = encode_price_sqrt(1, 1)
+        price_target = encode_price_sqrt(101, 100)
+        liquidity = expand_to_18decimals(2)
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(
+            price, price_target, liquidity, expand_to_18decimals(1), 600
+        )
+        self.assertEqual(amount_in, 9975124224178055)
+        self.assertEqual(fee_amount, 5988667735148)
+        self.assertEqual(amount_out, 9925619580021728)
+        self.assertEqual(sqrt_price, price_target)
+
+        price_after = get_next_sqrt_price_from_input(price, liquidity, expand_to_18decimals(1), False)
+        self.assertLess(sqrt_price, price_after)
+
+    def test_exact_amount_out_capped_at_price_target(self):
+        price = encode_price_sqrt(1, 1)
+        price_target = encode_price_sqrt(101, 100)
+        liquidity = expand_to_18decimals(2)
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(
+            price, price_target, liquidity, -expand_to_18decimals(1), 600
+        )
+        self.assertEqual(amount_in, 9975124224178055)
+        self.assertEqual(fee_amount, 5988667735148)
+        self.assertEqual(amount_out, 9925619580021728)
+        self.assertEqual(sqrt_price, price_target)
+
+    def test_exact_amount_in_fully_spent(self):
+        price = encode_price_sqrt(1, 1)
+        price_target = encode_price_sqrt(1000, 100)
+        liquidity = expand_to_18decimals(2)
+        amount = expand_to_18decimals(1)
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(price, price_target, liquidity, amount, 600)
+        self.assertEqual(amount_in, 999400000000000000)
+        self.assertEqual(fee_amount, 600000000000000)
+        self.assertEqual(amount_out, 666399946655997866)
+        self.assertLess(sqrt_price, price_target)
+        self.assertEqual(sqrt_price, get_next_sqrt_price_from_input(price, liquidity, amount - fee_amount, False))
+
+    def test_exact_amount_out_fully_received(self):
+        price = encode_price_sqrt(1, 1)
+        price_target = encode_price_sqrt(1000, 100)
+        liquidity = expand_to_18decimals(2)
+        amount = -expand_to_18decimals(1)
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(price, price_target, liquidity, amount, 600)
+        self.assertEqual(amount_in, 2000000000000000000)
+        self.assertEqual(fee_amount, 1200720432259356)
+        self.assertEqual(amount_out, -amount)
+        self.assertEqual(sqrt_price, get_next_sqrt_price_from_output(price, liquidity, -amount, False))
+
+    def test_edge_cases(self):
+        # amount out is capped at the desired amount out
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(
+            417332158212080721273783715441582, 1452870262520218020823638996, 159344665391607089467575320103, -1, 1
+        )
+        self.assertEqual((amount_in, fee_amount, amount_out), (1, 1, 2))
+        self.assertEqual(sqrt_price, 417332158212080721273783715441581)
+
+        # target price of 1 uses partial input amount
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(2, 1, 1, 3915081100057732413702495386755767, 1)
+        self.assertEqual((amount_in, fee_amount, amount_out, sqrt_price), (39614081257132168796771975168, 39614120871253040049813, 0, 1))
+
+        # entire input amount taken as fee
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(2413, 79887613182836312, 1985041575832132834610021537970, 10, 1872)
+        self.assertEqual((amount_in, fee_amount, amount_out, sqrt_price), (0, 10, 0, 2413))
+
+        # handles intermediate insufficient liquidity in zero for one exact output case
+        price = 20282409603651670423947251286016
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(price, price * 11 // 10, 1024, -4, 3000)
+        self.assertEqual((amount_in, fee_amount, amount_out, sqrt_price), (26215, 79, 0, price * 11 // 10))
+
+        # handles intermediate insufficient liquidity in one for zero exact output case
+        sqrt_price, amount_in, amount_out, fee_amount = compute_swap_step(price, price * 9 // 10, 1024, -263000, 3000)
+        self.assertEqual((amount_in, fee_amount, amount_out, sqrt_price), (1, 1, 26214, price * 9 // 10))
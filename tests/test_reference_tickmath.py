@@ -0,0 +1,75 @@
+"""reference/tickmath.py test file."""
+import os
+import tempfile
+from unittest import TestCase
+from decimal import Context, Decimal
+
+from reference.tickmath import (
+    MIN_TICK, MAX_TICK, MIN_SQRT_RATIO, MAX_SQRT_RATIO,
+    get_sqrt_ratio_at_tick, get_tick_at_sqrt_ratio, SqrtPriceTable
+)
+
+
+class ReferenceTickMathTest(TestCase):
+
+    def test_get_sqrt_ratio_at_tick(self):
+        with self.assertRaisesRegex(ValueError, "TickMath: abs_tick is too large"):
+            get_sqrt_ratio_at_tick(MIN_TICK - 1)
+        with self.assertRaisesRegex(ValueError, "TickMath: abs_tick is too large"):
+            get_sqrt_ratio_at_tick(MAX_TICK + 1)
+
+        self.assertEqual(get_sqrt_ratio_at_tick(MIN_TICK), MIN_SQRT_RATIO)
+        self.assertEqual(get_sqrt_ratio_at_tick(MIN_TICK + 1), 4295343490)
+        self.assertEqual(get_sqrt_ratio_at_tick(MAX_TICK - 1), 1461373636630004318706518188784493106690254656249)
+        self.assertEqual(get_sqrt_ratio_at_tick(MAX_TICK), MAX_SQRT_RATIO)
+        self.assertEqual(get_sqrt_ratio_at_tick(0), 2 ** 96)
+
+        for tick in [50, 100, 250, 500, 1_000, 2_500, 3_000, 4_000, 5_000, 50_000, 150_000, 250_000, 500_000, 738_203]:
+            for t in [-tick, tick]:
+                d = Context(prec=100).create_decimal(1.0001)
+                pyres = (d ** t).sqrt() * (2 ** 96)
+                diff = Context(prec=100).create_decimal(get_sqrt_ratio_at_tick(t)) - pyres
+                self.assertLess(abs(diff / pyres), Decimal(0.00001))
+
+    def test_get_tick_at_sqrt_ratio(self):
+        with self.assertRaisesRegex(ValueError, "tick is too low"):
+            get_tick_at_sqrt_ratio(MIN_SQRT_RATIO - 1)
+        with self.assertRaisesRegex(ValueError, "tick is too high"):
+            get_tick_at_sqrt_ratio(MAX_SQRT_RATIO)
+
+        self.assertEqual(get_tick_at_sqrt_ratio(MIN_SQRT_RATIO), MIN_TICK)
+        self.assertEqual(get_tick_at_sqrt_ratio(4295343490), MIN_TICK + 1)
+        self.assertEqual(get_tick_at_sqrt_ratio(1461373636630004318706518188784493106690254656249), MAX_TICK - 1)
+        self.assertEqual(get_tick_at_sqrt_ratio(MAX_SQRT_RATIO - 1), MAX_TICK - 1)
+
+    def test_both(self):
+        for tick in [-(2 ** i) for i in range(1, 20)] + [2 ** i for i in range(1, 20)]:
+            price = get_sqrt_ratio_at_tick(tick)
+            self.assertEqual(get_tick_at_sqrt_ratio(price), tick)
+            self.assertEqual(get_tick_at_sqrt_ratio(price - 1), tick - 1)
+            self.assertEqual(get_tick_at_sqrt_ratio(price + 1), tick)
+
+    def test_table(self):
+        min_tick, max_tick = -3000, 3000
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            SqrtPriceTable.build(path, min_tick, max_tick)
+            with SqrtPriceTable.open(path) as table:
+                self.assertEqual(len(table), max_tick - min_tick + 1)
+                for tick in range(min_tick, max_tick + 1, 7):
+                    price = get_sqrt_ratio_at_tick(tick)
+                    self.assertEqual(table.get_sqrt_ratio_at_tick(tick), price)
+                    self.assertEqual(table.get_tick_at_sqrt_ratio(price), tick)
+                    self.assertEqual(table.get_tick_at_sqrt_ratio(price + 1), get_tick_at_sqrt_ratio(price + 1))
+                    if tick > min_tick:
+                        self.assertEqual(table.get_tick_at_sqrt_ratio(price - 1), tick - 1)
+
+                with self.assertRaises(ValueError):
+                    table.get_sqrt_ratio_at_tick(max_tick + 1)
+                with self.assertRaises(ValueError):
+                    table.get_tick_at_sqrt_ratio(get_sqrt_ratio_at_tick(min_tick) - 1)
+                with self.assertRaises(ValueError):
+                    table.get_tick_at_sqrt_ratio(get_sqrt_ratio_at_tick(max_tick + 1))
+        finally:
+            os.remove(path)
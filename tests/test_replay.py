@@ -0,0 +1,59 @@
+"""replay.py test file."""
+import json
+import os
+import tempfile
+import pytest
+from asynctest import TestCase
+
+import replay
+from replay import iter_trace, shard_trace, replay_calls
+
+TRACE = './tests/test_data/test1.json'
+
+
+class ReplayTest(TestCase):
+
+    def test_iter_trace(self):
+        with open(TRACE) as f:
+            expected = json.load(f)
+
+        old_chunk_size = replay.CHUNK_SIZE
+        replay.CHUNK_SIZE = 97
+        try:
+            calls = list(iter_trace(TRACE))
+        finally:
+            replay.CHUNK_SIZE = old_chunk_size
+
+        self.assertEqual(len(calls), len(expected))
+        for i, (call, data) in enumerate(zip(calls, expected)):
+            self.assertEqual(call.index, i)
+            self.assertEqual(call.func_name, data['funcName'])
+            self.assertEqual(call.args, [int(arg, 0) for arg in data['args']])
+            self.assertEqual(call.result, [int(res, 0) for res in data['result']])
+
+    def test_shard_trace(self):
+        with tempfile.TemporaryDirectory() as shard_dir:
+            shards = shard_trace(TRACE, shard_dir)
+            self.assertEqual(len(shards), 1)
+            (contract_address, path), = shards.items()
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(list(iter_trace(path)), list(iter_trace(TRACE)))
+            self.assertTrue(all(call.contract_address == contract_address for call in iter_trace(path)))
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_resume(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            checkpoint = os.path.join(checkpoint_dir, 'pool.ckpt')
+
+            report, _ = await replay_calls(iter_trace(TRACE), checkpoint, checkpoint_every=2, limit=4, strict=True)
+            self.assertEqual((report.resumed_from, report.calls), (1, 4))
+
+            report, resumed = await replay_calls(iter_trace(TRACE), checkpoint, checkpoint_every=2, limit=8, strict=True)
+            self.assertEqual((report.resumed_from, report.calls), (5, 4))
+
+            report, full = await replay_calls(iter_trace(TRACE), limit=8, strict=True)
+            self.assertEqual((report.resumed_from, report.calls), (1, 8))
+
+            res = await resumed.contract.get_cur_state().call()
+            expected = await full.contract.get_cur_state().call()
+            self.assertEqual(res.call_info.result, expected.call_info.result)
@@ -0,0 +1,42 @@
+"""signers.py test file."""
+import os
+import pytest
+from asynctest import TestCase
+from starkware.starknet.testing.starknet import Starknet
+
+from signers import PipelinedSigner
+from utils import MAX_UINT128, Account, init_contract, from_uint, assert_revert
+
+signer = PipelinedSigner(123456789987654321)
+
+recipient = 222222222222222
+
+
+class PipelinedSignerTest(TestCase):
+
+    @pytest.mark.asyncio
+    async def test_pipelined_transactions(self):
+        starknet = await Starknet.empty()
+        account = await starknet.deploy(contract_class=Account.get_class, constructor_calldata=[signer.public_key])
+        _, token = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, account.contract_address], starknet=starknet)
+
+        await signer.send_transactions(account, [(token.contract_address, 'transfer', [recipient, 1, 0])])
+
+        txs = await signer.sign_transactions(
+            account, [[(token.contract_address, 'transfer', [recipient, i, 0])] for i in range(2, 6)], workers=2
+        )
+        self.assertEqual([tx.nonce for tx in txs], [1, 2, 3, 4])
+        await signer.execute_transactions(account, txs)
+
+        res = await token.balanceOf(recipient).call()
+        self.assertEqual(from_uint(res.call_info.result), 15)
+        self.assertEqual(await starknet.state.state.get_nonce_at(account.contract_address), 5)
+        # one call shape
+        self.assertEqual(len(signer.call_arrays), 1)
+
+        # a transaction signed with a stale nonce fails and resets the local nonce
+        await assert_revert(signer.send_transactions(account, [(token.contract_address, 'transfer', [recipient, 1, 0])], nonce=4))
+        self.assertNotIn(account.contract_address, signer.nonces)
+        await signer.send_transactions(account, [(token.contract_address, 'transfer', [recipient, 1, 0])])
+        res = await token.balanceOf(recipient).call()
+        self.assertEqual(from_uint(res.call_info.result), 16)
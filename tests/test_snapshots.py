@@ -0,0 +1,49 @@
+"""snapshots.py test file."""
+import tempfile
+import pytest
+from pathlib import Path
+from asynctest import TestCase
+
+import snapshots
+from snapshots import get_snapshot, save_image, load_image, image_tag, fork_state, address, other_address
+from utils import cached_contract, from_uint
+
+
+class SnapshotsTest(TestCase):
+
+    def test_image_tag(self):
+        self.assertEqual(image_tag('swap_pool'), image_tag('swap_pool'))
+        self.assertNotEqual(image_tag('swap_pool'), image_tag('swap_pool_low'))
+        self.assertNotEqual(image_tag('swap_pool'), image_tag('swap_pool.zero_tick'))
+
+        tag = image_tag('swap_pool')
+        old_version = snapshots.IMAGE_VERSION
+        snapshots.IMAGE_VERSION += 1
+        try:
+            self.assertNotEqual(image_tag('swap_pool'), tag)
+        finally:
+            snapshots.IMAGE_VERSION = old_version
+
+    @pytest.mark.asyncio
+    async def test_save_load_image(self):
+        state, info = await get_snapshot('swap_pool.zero_tick')
+
+        with tempfile.TemporaryDirectory() as image_dir:
+            path = Path(image_dir) / 'swap_pool.zero_tick.image'
+            save_image(path, state, info)
+            loaded_state, loaded_info = load_image(path)
+
+        self.assertEqual(sorted(loaded_info), sorted(info))
+        for key in ['token0', 'token1', 'swap_target', 'contract']:
+            self.assertEqual(loaded_info[key].contract_address, info[key].contract_address)
+            self.assertIs(loaded_info[key].state, loaded_state)
+
+        state, loaded_state = fork_state(state), fork_state(loaded_state)
+        for owner in [address, other_address]:
+            res = await cached_contract(state, info['token0_def'], info['token0']).balanceOf(owner).call()
+            loaded_res = await cached_contract(loaded_state, info['token0_def'], loaded_info['token0']).balanceOf(owner).call()
+            self.assertEqual(from_uint(loaded_res.call_info.result), from_uint(res.call_info.result))
+
+        res = await cached_contract(state, info['contract_def'], info['contract']).get_cur_state().call()
+        loaded_res = await cached_contract(loaded_state, info['contract_def'], loaded_info['contract']).get_cur_state().call()
+        self.assertEqual(loaded_res.call_info.result, res.call_info.result)
@@ -5,7 +5,7 @@ import math
 from functools import reduce
 from starkware.starknet.testing.starknet import Starknet
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
 from utils import (
     MAX_UINT256, assert_revert, add_uint, sub_uint,
@@ -13,6 +13,7 @@ from utils import (
     felt_to_int, from_uint, encode_price_sqrt, expand_to_18decimals
 )
 from decimal import *
+from reference import sqrt_price_math as ref_spm
 
 Q128 = to_uint(2 ** 128)
 MaxUint256 = to_uint(2 ** 256 - 1)
@@ -25,7 +26,7 @@ class SqrtPriceMathTest(TestCase):
     @classmethod
     async def setUp(cls):
         cls.starknet = await Starknet.empty()
-        compiled_contract = compile_starknet_files(
+        compiled_contract = compile_cached(
             [CONTRACT_FILE], debug_info=True, disable_hint_validation=True
         )
         kwargs = (
@@ -294,4 +295,28 @@ class SqrtPriceMathTest(TestCase):
         self.assertEqual(
             tuple(res.call_info.result),
             to_uint(406)
-        )
\ No newline at end of file
+        )
+
+    @pytest.mark.asyncio
+    async def test_reference_bit_exact(self):
+        prices = [encode_price_sqrt(1, 1), encode_price_sqrt(121, 100), encode_price_sqrt(2 ** 90, 1), to_uint(2 ** 160 - 1)]
+        for liquidity in [1, 1024, expand_to_18decimals(1), 2 ** 128 - 1]:
+            for price0 in prices:
+                for price1 in prices:
+                    for roundup in [0, 1]:
+                        res = await self.contract.get_amount0_delta(price0, price1, liquidity, roundup).call()
+                        self.assertEqual(
+                            from_uint(res.call_info.result),
+                            ref_spm.get_amount0_delta(from_uint(price0), from_uint(price1), liquidity, roundup)
+                        )
+                        res = await self.contract.get_amount1_delta(price0, price1, liquidity, roundup).call()
+                        self.assertEqual(
+                            from_uint(res.call_info.result),
+                            ref_spm.get_amount1_delta(from_uint(price0), from_uint(price1), liquidity, roundup)
+                        )
+
+                    res = await self.contract.get_amount0_delta2(price0, price1, -liquidity).call()
+                    self.assertEqual(
+                        from_uint(res.call_info.result),
+                        ref_spm.to_uint256(ref_spm.get_amount0_delta2(from_uint(price0), from_uint(price1), -liquidity))
+                    )
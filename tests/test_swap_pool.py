@@ -5,20 +5,22 @@ import pytest
 import json
 from functools import reduce
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
-from starkware.starknet.testing.starknet import Starknet
 from utils import (
     MAX_UINT256, MAX_UINT128, assert_revert, add_uint, sub_uint,
     mul_uint, div_rem_uint, to_uint, contract_path,
     felt_to_int, int_to_felt, from_uint, cached_contract, encode_price_sqrt,
     get_max_tick, get_min_tick, TICK_SPACINGS, FeeAmount, init_contract,
-    expand_to_18decimals, assert_event_emitted
+    expand_to_18decimals, assert_event_emitted, load_swap_pool_simulator
 )
 from starkware.starknet.public.abi import get_selector_from_name
 
 from test_tickmath import (MIN_SQRT_RATIO, MAX_SQRT_RATIO)
+from reference.sqrt_price_math import to_uint256
 from signers import MockSigner
+from snapshots import fork, get_snapshot, initialize_at_zero_tick, address, other_address
+from replay import iter_trace, replay_calls
 
 signer = MockSigner(123456789987654321)
 other_signer = MockSigner(2343424234234)
@@ -36,8 +38,6 @@ tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
 min_tick = get_min_tick(tick_spacing)
 max_tick = get_max_tick(tick_spacing)
 
-address = 11111111111111
-other_address = 222222222222222
 
 class SwapPoolTest(TestCase):
 
@@ -53,93 +53,48 @@ class SwapPoolTest(TestCase):
         #    other_address = cls.other_account.contract_address
         #    print('setUp:', signer.public_key, address, other_signer.public_key, other_address)
 
+    def bind_snapshot(self, starknet, info):
+        """binds the test to a fork of a swap_pool snapshot"""
+        self.starknet = starknet
+        state = starknet.state
+        self.token0_def, self.token1_def = info['token0_def'], info['token1_def']
+        self.token0 = cached_contract(state, self.token0_def, info['token0'])
+        self.token1 = cached_contract(state, self.token1_def, info['token1'])
+        self.contract_def = info['contract_def']
+        self.declare_class = info['declare_class']
+        self.proxy_def = info['proxy_def']
+        self.swap_target_def = info['swap_target_def']
+        self.swap_target = cached_contract(state, self.swap_target_def, info['swap_target'])
+
     async def check_starknet(self):
         if not hasattr(self, 'starknet'):
-            self.starknet = await Starknet.empty()
-            self.token0_def, self.token0 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=self.starknet)
-            await self.token0.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
-            self.token1_def, self.token1 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [2, 2, 18, MAX_UINT128, MAX_UINT128, address], starknet=self.starknet)
-            await self.token1.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
-            if self.token0.contract_address > self.token1.contract_address:
-                self.token0, self.token1 = self.token1, self.token0
-                self.token0_def, self.token1_def = self.token1_def, self.token0_def
-
-            begin = time.time()
-            self.contract_def = compile_starknet_files(
-                ['contracts/swap_pool.cairo'], debug_info=True, disable_hint_validation=True
-            )
-            print('compile swap_pool time:', time.time() - begin)
-
-            begin = time.time()
-            self.declare_class = await self.starknet.declare(
-                contract_class=self.contract_def,
-            )
-            print('declare swap_pool time:', time.time() - begin)
-
-            begin = time.time()
-            self.proxy_def = compile_starknet_files(
-                ['contracts/common_proxy.cairo'], debug_info=True, disable_hint_validation=True
-            )
-            print('compile swap_pool time:', time.time() - begin)
+            self.bind_snapshot(*await fork('swap_pool.base'))
 
-            self.swap_target_def, self.swap_target = await init_contract("tests/mocks/swap_target.cairo", [self.token0.contract_address, self.token1.contract_address], starknet=self.starknet)
-
-            await self.token0.approve(self.swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-            await self.token1.approve(self.swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-
-            await self.token0.approve(self.swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-            await self.token1.approve(self.swap_target.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-
-    async def get_state_contract(self, state=None):
+    async def fork_swap_pool(self, snapshot, state=None):
+        """returns the pool of `snapshot` and swap_target on `state`, or on a new fork of the snapshot"""
         await self.check_starknet()
 
-        if not hasattr(self, 'contract'):
-            FEE = FeeAmount.MEDIUM
-            tick_spacing = TICK_SPACINGS[FEE]
-            kwargs = {
-                "contract_class": self.proxy_def,
-                "constructor_calldata": [self.declare_class.class_hash, SELECTOR, 5, tick_spacing, FEE, self.token0.contract_address, self.token1.contract_address, address],
-            }
-            begin = time.time()
-            self.contract = await self.starknet.deploy(**kwargs)
-            print('deploy swap_pool time:', time.time() - begin)
-            # replace api
-            self.contract = self.contract.replace_abi(self.contract_def.abi)
-
-        if not state:
-            state = self.contract.state.copy()
-        swap_pool = cached_contract(state, self.contract_def, self.contract)
+        if state:
+            _, info = await get_snapshot(snapshot)
+        else:
+            starknet, info = await fork(snapshot)
+            state = starknet.state
+        swap_pool = cached_contract(state, self.contract_def, info['contract'])
         swap_target = cached_contract(state, self.swap_target_def, self.swap_target)
         return swap_pool, swap_target
 
-    async def get_state_contract_low(self, state=None):
-        await self.check_starknet()
+    async def get_state_contract(self, state=None, snapshot='swap_pool'):
+        swap_pool, swap_target = await self.fork_swap_pool(snapshot, state)
+        self.contract = swap_pool
+        return swap_pool, swap_target
 
-        if not hasattr(self, 'contract_low'):
-            kwargs = {
-                "contract_class": self.proxy_def,
-                "constructor_calldata": [self.declare_class.class_hash, SELECTOR, 5, TICK_SPACINGS[FeeAmount.LOW], FeeAmount.LOW, self.token0.contract_address, self.token1.contract_address, address],
-            }
-            begin = time.time()
-            self.contract_low = await self.starknet.deploy(**kwargs)
-            print('deploy swap_pool time:', time.time() - begin)
-
-            # replace api
-            self.contract_low = self.contract_low.replace_abi(self.contract_def.abi)
-
-        if not state:
-            state = self.contract_low.state.copy()
-        swap_pool = cached_contract(state, self.contract_def, self.contract_low)
-        swap_target = cached_contract(state, self.swap_target_def, self.swap_target)
+    async def get_state_contract_low(self, state=None, snapshot='swap_pool_low'):
+        swap_pool, swap_target = await self.fork_swap_pool(snapshot, state)
+        self.contract_low = swap_pool
         return swap_pool, swap_target
 
     async def initialize_at_zero_tick(self, contract, swap_target):
-        res = await contract.get_tick_spacing().call()
-        tick_spacing = res.call_info.result[0]
-        min_tick, max_tick = get_min_tick(tick_spacing), get_max_tick(tick_spacing)
-        await contract.initialize_price(encode_price_sqrt(1, 1)).execute()
-        await self.add_liquidity(swap_target, contract, address, min_tick, max_tick, expand_to_18decimals(2))
-        return contract
+        return await initialize_at_zero_tick(contract, swap_target)
 
     async def swap_exact0_for1(self, swap_pool, amount, address, fee=FeeAmount.MEDIUM):
         swap_target = cached_contract(swap_pool.state, self.swap_target_def, self.swap_target)
@@ -625,10 +580,7 @@ class SwapPoolTest(TestCase):
     @pytest.mark.asyncio
     async def test_remove_liquidity(self):
 
-        contract, swap_target = await self.get_state_contract()
-        price = encode_price_sqrt(1, 1)
-        await contract.initialize_price(price).execute()
-        res = await self.add_liquidity(swap_target, contract, address, int_to_felt(min_tick), max_tick, expand_to_18decimals(2))
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
 
         # remove more liquidity more than have
         new_contract = cached_contract(contract.state.copy(), self.contract_def, self.contract)
@@ -691,8 +643,7 @@ class SwapPoolTest(TestCase):
     async def test_add_liquidity2(self):
         tick_spacing = TICK_SPACINGS[FeeAmount.LOW]
         min_tick, max_tick = get_min_tick(tick_spacing), get_max_tick(tick_spacing)
-        contract, swap_target = await self.get_state_contract_low()
-        contract = await self.initialize_at_zero_tick(contract, swap_target)
+        contract, swap_target = await self.get_state_contract_low(snapshot='swap_pool_low.zero_tick')
 
         liquidity_delta = 1000
         tick_lower = tick_spacing
@@ -788,10 +739,7 @@ class SwapPoolTest(TestCase):
     # post-initialize at medium fee
     @pytest.mark.asyncio
     async def test_add_liquidity3(self):
-        contract, swap_target = await self.get_state_contract()
-        price = encode_price_sqrt(1, 1)
-        await contract.initialize_price(price).execute()
-        res = await self.add_liquidity(swap_target, contract, address, int_to_felt(min_tick), max_tick, expand_to_18decimals(2))
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
 
         res = await contract.get_liquidity().call()
         liquidity = res.call_info.result[0]
@@ -867,10 +815,7 @@ class SwapPoolTest(TestCase):
 
     @pytest.mark.asyncio
     async def test_limit_orders(self):
-        contract, swap_target = await self.get_state_contract()
-        price = encode_price_sqrt(1, 1)
-        await contract.initialize_price(price).execute()
-        res = await self.add_liquidity(swap_target, contract, address, int_to_felt(min_tick), max_tick, expand_to_18decimals(2))
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
 
         # limit selling 0 for 1 at tick 0 thru 1
         new_contract, new_swap_target = await self.get_state_contract(contract.state.copy())
@@ -1069,7 +1014,7 @@ class SwapPoolTest(TestCase):
         tick_spacing = TICK_SPACINGS[FeeAmount.LOW]
         min_tick, max_tick = get_min_tick(tick_spacing), get_max_tick(tick_spacing)
 
-        proxy_def = compile_starknet_files(
+        proxy_def = compile_cached(
             ['tests/mocks/swap_pool_mock.cairo'], debug_info=True, disable_hint_validation=True
         )
         kwargs = {
@@ -1099,12 +1044,12 @@ class SwapPoolTest(TestCase):
         res = await new_contract.get_position(address, int_to_felt(min_tick), max_tick).call()
         print(res.call_info.result, tick_spacing, min_tick, max_tick)
         tokens_owed0 = res.call_info.result[5]
-        self.assertEqual(tokens_owed0, 166666666666667)
+        self.assertEqual(tokens_owed0, 166666666666666)
 
         res = await new_contract.get_position(address, int_to_felt(min_tick + tick_spacing), max_tick - tick_spacing).call()
         print(res.call_info.result, tick_spacing, min_tick, max_tick)
         tokens_owed0 = res.call_info.result[5]
-        self.assertEqual(tokens_owed0, 333333333333334)
+        self.assertEqual(tokens_owed0, 333333333333333)
 
         # works across large increases
         res = await self.add_liquidity(swap_target, contract, address, min_tick, max_tick, expand_to_18decimals(1))
@@ -1484,8 +1429,7 @@ class SwapPoolTest(TestCase):
 
     @pytest.mark.asyncio
     async def test_set_fee_protocol(self):
-        contract, swap_target = await self.get_state_contract()
-        await self.initialize_at_zero_tick(contract, swap_target)
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
 
         # fails if fee is lt 4 or gt 10
         await assert_revert(
@@ -1548,73 +1492,67 @@ class SwapPoolTest(TestCase):
         )
 
     @pytest.mark.asyncio
-    async def test_json_data(self):
-        calls = []
-        with open('./tests/test_data/test1.json') as f:
-            calls = json.load(f)
+    async def test_swap_simulator(self):
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
+        await self.add_liquidity(swap_target, contract, address, -600, 600, expand_to_18decimals(3))
+        await self.add_liquidity(swap_target, contract, address, 1200, 2400, expand_to_18decimals(1))
+        await self.add_liquidity(swap_target, contract, address, -3000, -1200, expand_to_18decimals(5))
+        await contract.set_fee_protocol(2000, 1250).execute(caller_address=address)
 
-        await self.check_starknet()
+        cases = [
+            (1, expand_to_18decimals(1) // 100, MIN_SQRT_RATIO + 1),
+            (1, expand_to_18decimals(2), MIN_SQRT_RATIO + 1),
+            (1, expand_to_18decimals(1000), MIN_SQRT_RATIO + 1),
+            (0, expand_to_18decimals(3), MAX_SQRT_RATIO - 1),
+            (0, expand_to_18decimals(1000), MAX_SQRT_RATIO - 1),
+            (1, -expand_to_18decimals(1), MIN_SQRT_RATIO + 1),
+            (0, -expand_to_18decimals(2), MAX_SQRT_RATIO - 1),
+            (1, expand_to_18decimals(5), from_uint(encode_price_sqrt(90, 100))),
+            (0, -expand_to_18decimals(5), from_uint(encode_price_sqrt(120, 100))),
+        ]
+
+        simulator = await load_swap_pool_simulator(contract)
+        for zero_for_one, amount, limit in cases:
+            res = await contract.get_swap_results(zero_for_one, to_uint(to_uint256(amount)), to_uint(limit)).call()
+            quote = simulator.get_swap_results(zero_for_one, amount, limit)
+            self.assertEqual(from_uint(res.call_info.result[0:2]), to_uint256(quote.amount0))
+            self.assertEqual(from_uint(res.call_info.result[2:4]), to_uint256(quote.amount1))
+
+        # the simulated swap leaves the pool in the same state as the contract
+        for zero_for_one, amount, limit in cases[:5]:
+            if zero_for_one:
+                await self.swap_exact0_for1(contract, amount, address)
+                result = simulator.swap(1, amount, MIN_SQRT_RATIO + 1)
+            else:
+                await self.swap_exact1_for0(contract, amount, address)
+                result = simulator.swap(0, amount, MAX_SQRT_RATIO - 1)
+
+            loaded = await load_swap_pool_simulator(contract)
+            self.assertEqual(
+                (loaded.sqrt_price_x96, loaded.tick, loaded.liquidity),
+                (result.sqrt_price_x96, result.tick, result.liquidity)
+            )
+            self.assertEqual(loaded.fee_growth_global0_x128, simulator.fee_growth_global0_x128)
+            self.assertEqual(loaded.fee_growth_global1_x128, simulator.fee_growth_global1_x128)
+            self.assertEqual(loaded.protocol_fee_token0, simulator.protocol_fee_token0)
+            self.assertEqual(loaded.protocol_fee_token1, simulator.protocol_fee_token1)
+            for tick in result.crossed_ticks:
+                self.assertEqual(loaded.tick_mgr.get_tick(tick), simulator.tick_mgr.get_tick(tick))
 
-        self.assertEqual(calls[0]['funcName'], 'constructor')
+    @pytest.mark.asyncio
+    async def test_json_data(self):
+        path = './tests/test_data/test1.json'
+        constructor = next(iter_trace(path))
+        self.assertEqual(constructor.func_name, 'constructor')
+        fee = constructor.args[2]
 
-        args = list(map(lambda arg: int(arg, 0), calls[0]['args']))
+        report, replay = await replay_calls(iter_trace(path), limit=22, strict=True)
+        self.assertEqual(report.calls, 22)
+        self.assertEqual(report.mismatches, [])
 
-        token_map = {}
-        if args[0] < args[1]:
-            token_map[args[3]] = self.token0
-            token_map[args[4]] = self.token1
-        else:
-            token_map[args[3]] = self.token1 
-            token_map[args[4]] = self.token0
+        contract, swap_target = replay.contract, replay.swap_target
 
-        fee = args[2]
-        kwargs = {
-            "contract_class": self.proxy_def,
-            "constructor_calldata": [self.declare_class.class_hash, SELECTOR, 5, args[1], fee, token_map[args[3]].contract_address, token_map[args[4]].contract_address, address],
-        }
-        print('deploying contract:', kwargs)
-        contract = await self.starknet.deploy(**kwargs)
-        # replace api
-        contract = contract.replace_abi(self.contract_def.abi)
-        swap_target = self.swap_target
-
-        for i in range(1, len(calls)):
-            call = calls[i]
-            args = list(map(lambda arg: int(arg, 0), call['args']))
-            print('call:', i, call['funcName'])
-            if call['funcName'] == 'initialize_price':
-                await contract.initialize_price((args[0], args[1])).execute()
-            elif call['funcName'] == 'set_fee_protocol':
-                await contract.set_fee_protocol(args[0], args[1]).execute(caller_address=address)
-            elif call['funcName'] == 'add_liquidity':
-                await swap_target.add_liquidity(address, args[1], args[2], args[3], contract.contract_address).execute(caller_address=address)
-            elif call['funcName'] == 'remove_liquidity':
-                await contract.remove_liquidity(args[0], args[1], args[2]).execute(caller_address=address)
-            elif call['funcName'] == 'swap':
-                data_len = args[7]
-                data = args[8:8+data_len]
-                data[0] = token_map[data[0]].contract_address
-                data[2] = token_map[data[2]].contract_address
-                await swap_target.swap(address, args[1], (args[2], args[3]), (args[4], args[5]), contract.contract_address, data).execute(caller_address=address)
-            elif call['funcName'] == 'collect':
-                await contract.collect(address, args[1], args[2], args[3], args[4]).execute(caller_address=address)
-            elif call['funcName'] == 'collect_protocol':
-                await contract.collect_protocol(address, args[1], args[2]).execute(caller_address=address)
-
-            if i == 22:
-                break
-
-            res = await contract.get_cur_state().call()
-            sqrt_price = from_uint((res.call_info.result[0], res.call_info.result[1]))
-            tick = felt_to_int(res.call_info.result[2])
-            liquidity = res.call_info.result[3]
-            res = await self.token0.balanceOf(contract.contract_address).call()
-            balance0 = from_uint((res.call_info.result[0], res.call_info.result[1]))
-            res = await self.token1.balanceOf(contract.contract_address).call()
-            balance1 = from_uint((res.call_info.result[0], res.call_info.result[1]))
-            print('contract state :', sqrt_price, tick, liquidity, balance0, balance1)
-
-        res = await swap_target.swap(address, 0, to_uint(100000000000000000), to_uint(MAX_SQRT_RATIO - 1), contract.contract_address, [self.token1.contract_address, fee, self.token0.contract_address]).execute(caller_address=address)
+        res = await swap_target.swap(address, 0, to_uint(100000000000000000), to_uint(MAX_SQRT_RATIO - 1), contract.contract_address, [replay.token1.contract_address, fee, replay.token0.contract_address]).execute(caller_address=address)
         amount0 = from_uint((res.call_info.result[0], res.call_info.result[1]))
         if amount0 >= 2 ** 255:
             amount0 = amount0 - 2 ** 256
@@ -1622,6 +1560,52 @@ class SwapPoolTest(TestCase):
         if amount1 >= 2 ** 255:
             amount1 = amount1 - 2 ** 256
         print(amount0, amount1)
-        self.assertEqual(amount0, -292678894059646219)
+        self.assertEqual(amount0, -292678894059646240)
         self.assertEqual(amount1, 100000000000000000)
-        
\ No newline at end of file
+        
+    async def get_reserves_and_balances(self, contract):
+        res = await contract.get_reserves().call()
+        reserves = tuple(res.call_info.result)
+        balance0 = from_uint((await self.token0.balanceOf(contract.contract_address).call()).call_info.result[0:2])
+        balance1 = from_uint((await self.token1.balanceOf(contract.contract_address).call()).call_info.result[0:2])
+        return reserves, (balance0, balance1)
+
+    @pytest.mark.asyncio
+    async def test_reserves(self):
+        contract, swap_target = await self.get_state_contract(snapshot='swap_pool.zero_tick')
+        await contract.set_fee_protocol(2000, 2000).execute(caller_address=address)
+
+        # the reserves follow every transfer in and out of the pool
+        reserves, balances = await self.get_reserves_and_balances(contract)
+        self.assertGreater(reserves[0], 0)
+        self.assertEqual(reserves, balances)
+
+        await self.add_liquidity(swap_target, contract, address, -600, 600, expand_to_18decimals(3))
+        await self.swap_exact0_for1(contract, expand_to_18decimals(1) // 10, address)
+        await self.swap_exact1_for0(contract, expand_to_18decimals(1), address)
+        await contract.remove_liquidity(int_to_felt(-600), 600, expand_to_18decimals(3)).execute(caller_address=address)
+        await contract.collect(address, int_to_felt(-600), 600, MAX_UINT128, MAX_UINT128).execute(caller_address=address)
+        await contract.collect_protocol(address, MAX_UINT128, MAX_UINT128).execute(caller_address=address)
+        reserves, balances = await self.get_reserves_and_balances(contract)
+        self.assertEqual(reserves, balances)
+
+        # a donation is above the reserves until it is skimmed or synced
+        await self.token0.transfer(contract.contract_address, to_uint(1000)).execute(caller_address=address)
+        await self.token1.transfer(contract.contract_address, to_uint(2000)).execute(caller_address=address)
+        await assert_revert(contract.skim(other_address).execute(caller_address=other_address))
+        res = await contract.skim(other_address).execute(caller_address=address)
+        self.assertEqual(res.call_info.result, [1000, 0, 2000, 0])
+        self.assertEqual(await self.get_reserves_and_balances(contract), (reserves, balances))
+
+        await self.token0.transfer(contract.contract_address, to_uint(1000)).execute(caller_address=address)
+        res = await contract.sync().execute(caller_address=other_address)
+        assert_event_emitted(
+            res,
+            from_address=contract.contract_address,
+            name='Sync',
+            data=[balances[0] + 1000, balances[1]]
+        )
+        reserves, balances = await self.get_reserves_and_balances(contract)
+        self.assertEqual(reserves, balances)
+        res = await contract.skim(other_address).execute(caller_address=address)
+        self.assertEqual(res.call_info.result, [0, 0, 0, 0])
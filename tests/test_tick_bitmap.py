@@ -5,7 +5,7 @@ import math
 from functools import reduce
 from starkware.starknet.testing.starknet import Starknet
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
 from utils import (
     MAX_UINT256, assert_revert, add_uint, sub_uint,
@@ -13,6 +13,8 @@ from utils import (
     felt_to_int, from_uint, int_to_felt, cached_contract
 )
 from decimal import *
+from starkware.starknet.public.abi import get_storage_var_address
+from reference.tick_bitmap import TickBitmap
 
 # The path to the contract source code.
 CONTRACT_FILE = os.path.join("tests", "mocks/tick_bitmap_mock.cairo")
@@ -21,7 +23,7 @@ class CairoContractTest(TestCase):
     @classmethod
     async def setUp(cls):
         cls.starknet = await Starknet.empty()
-        compiled_contract = compile_starknet_files(
+        compiled_contract = compile_cached(
             [CONTRACT_FILE], debug_info=True, disable_hint_validation=True
         )
         kwargs = (
@@ -174,4 +176,60 @@ class CairoContractTest(TestCase):
         await contract.flip_tick(329).execute()
         res = await contract.next_valid_tick_within_one_word(int_to_felt(456), 1, 1).call()
         self.assertEqual(felt_to_int(res.call_info.result[0]), 329)
-        self.assertEqual(res.call_info.result[1], 1)
\ No newline at end of file
+        self.assertEqual(res.call_info.result[1], 1)
+    @pytest.mark.asyncio
+    async def test_next_valid_tick(self):
+        contract = self.get_state_contract()
+
+        inits = [-70000, -3000, 78, 84, 5000, 66000]
+        for t in inits:
+            await contract.flip_tick(int_to_felt(t)).execute()
+
+        bitmap = TickBitmap()
+        for t in inits:
+            bitmap.flip_tick(t, 1)
+
+        cases = [
+            # within the word of the tick
+            (78, 0, 84, 1),
+            (80, 1, 78, 1),
+            # skips the empty words
+            (84, 0, 5000, 1),
+            (-1, 1, -3000, 1),
+            # or stops at the edge of the summary word
+            (77, 1, 0, 0),
+            (-3001, 1, -65536, 0),
+            (-65537, 1, -70000, 1),
+            (5000, 0, 65535, 0),
+            (65535, 0, 66000, 1),
+        ]
+        for tick, lte, tick_next, initialized in cases:
+            res = await contract.next_valid_tick(int_to_felt(tick), 1, lte).call()
+            self.assertEqual((felt_to_int(res.call_info.result[0]), res.call_info.result[1]), (tick_next, initialized))
+            self.assertEqual(bitmap.next_valid_tick(tick, 1, lte == 1), (tick_next, initialized == 1))
+
+        # the summary bit is cleared with the last tick of the word
+        await contract.flip_tick(int_to_felt(-3000)).execute()
+        res = await contract.next_valid_tick(int_to_felt(-1), 1, 1).call()
+        self.assertEqual((felt_to_int(res.call_info.result[0]), res.call_info.result[1]), (-65536, 0))
+
+    @pytest.mark.asyncio
+    async def test_sync_summary(self):
+        contract = self.get_state_contract()
+
+        # a word written without its summary bit, like in a pool deployed before the summary
+        word_pos = 19
+        storage_address = get_storage_var_address('TickBitmap_data', word_pos)
+        await contract.state.state.set_storage_at(contract.contract_address, storage_address, 1 << 8)
+
+        res = await contract.next_valid_tick(0, 1, 0).call()
+        self.assertEqual(res.call_info.result[1], 0)
+
+        await contract.sync_summary(word_pos).execute()
+        res = await contract.next_valid_tick(0, 1, 0).call()
+        self.assertEqual((res.call_info.result[0], res.call_info.result[1]), (word_pos * 256 + 8, 1))
+
+        # no-op on synced words
+        await contract.sync_summary(word_pos).execute()
+        res = await contract.next_valid_tick(0, 1, 0).call()
+        self.assertEqual((res.call_info.result[0], res.call_info.result[1]), (word_pos * 256 + 8, 1))
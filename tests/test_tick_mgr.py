@@ -5,7 +5,7 @@ import math
 from functools import reduce
 from starkware.starknet.testing.starknet import Starknet
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
 from utils import (
     MAX_UINT128, assert_revert, add_uint, sub_uint,
@@ -22,7 +22,7 @@ class TickMgrTest(TestCase):
     @classmethod
     async def setUp(cls):
         cls.starknet = await Starknet.empty()
-        compiled_contract = compile_starknet_files(
+        compiled_contract = compile_cached(
             [CONTRACT_FILE], debug_info=True, disable_hint_validation=True
         )
         kwargs = (
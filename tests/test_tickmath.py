@@ -13,6 +13,8 @@ from utils import (
     felt_to_int, from_uint, init_contract
 )
 from decimal import *
+from reference import tickmath as ref_tickmath
+from bench_tickmath import bench_ticks
 
 # The path to the contract source code.
 CONTRACT_FILE = os.path.join("tests", "mocks/tickmath_mock.cairo")
@@ -232,4 +234,24 @@ class CairoContractTest(TestCase):
             self.assertEqual(
                 tick,
                 felt_to_int(res2.call_info.result[0])
-            )
\ No newline at end of file
+            )
+
+    @pytest.mark.asyncio
+    async def test_reference_bit_exact(self):
+        for tick in [MIN_TICK, MIN_TICK + 1, -738_203, -50_001, -3, -1, 0, 1, 2, 4_001, 250_000, MAX_TICK - 1, MAX_TICK]:
+            res = await self.contract.get_sqrt_ratio_at_tick(tick).call()
+            price = from_uint(res.call_info.result)
+            self.assertEqual(price, ref_tickmath.get_sqrt_ratio_at_tick(tick))
+
+            if tick == MAX_TICK:
+                continue
+            for p in [price, price + 1]:
+                res = await self.contract.get_tick_at_sqrt_ratio(to_uint(p)).call()
+                self.assertEqual(felt_to_int(res.call_info.result[0]), ref_tickmath.get_tick_at_sqrt_ratio(p))
+
+    @pytest.mark.asyncio
+    async def test_reference_bit_exact_every_bit(self):
+        # 2 ** k and 2 ** (k + 1) - 1 select every multiplier of the TickMath.get_sqrt_args table
+        for tick in bench_ticks(n_random=0):
+            res = await self.contract.get_sqrt_ratio_at_tick(tick).call()
+            self.assertEqual(from_uint(res.call_info.result), ref_tickmath.get_sqrt_ratio_at_tick(tick))
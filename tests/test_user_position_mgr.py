@@ -6,14 +6,15 @@ import math
 import json
 from functools import reduce
 from asynctest import TestCase
-from starkware.starknet.compiler.compile import compile_starknet_files
+from compile_cache import compile_cached
 from inspect import signature
-from starkware.starknet.testing.starknet import Starknet
+from starkware.starknet.testing.starknet import Starknet, StarknetContract
+from snapshots import snapshot, fork
 from utils import (
     MAX_UINT128, assert_revert, to_uint,
     felt_to_int, from_uint, cached_contract, encode_price_sqrt,
     get_max_tick, get_min_tick, TICK_SPACINGS, FeeAmount, init_contract,
-    assert_event_emitted, Account, compute_contract_address
+    assert_event_emitted, Account, compute_contract_address, read_storage_var, compute_pool_address
 )
 from starkware.starknet.public.abi import get_selector_from_name
 
@@ -46,7 +47,7 @@ print('selector:', SELECTOR)
 #TODO: check two diferent address with same position tick, burn and collect
 async def init_user_position_contract(starknet, swap_pool_hash, swap_pool_proxy_hash):
     begin = time.time()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         ['contracts/user_position_mgr.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile user_position time:', time.time() - begin)
@@ -58,7 +59,7 @@ async def init_user_position_contract(starknet, swap_pool_hash, swap_pool_proxy_
     print('declare user_position_mgr time:', time.time() - begin)
 
     begin = time.time()
-    compiled_proxy = compile_starknet_files(
+    compiled_proxy = compile_cached(
         ['contracts/common_proxy.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile user_position time:', time.time() - begin)
@@ -79,7 +80,7 @@ async def init_user_position_contract(starknet, swap_pool_hash, swap_pool_proxy_
 
 async def init_swap_router(starknet, user_position_address):
     begin = time.time()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         ['contracts/swap_router.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile swap_router time:', time.time() - begin)
@@ -91,7 +92,7 @@ async def init_swap_router(starknet, user_position_address):
     print('declare swap_router time:', time.time() - begin)
 
     begin = time.time()
-    compiled_proxy = compile_starknet_files(
+    compiled_proxy = compile_cached(
         ['contracts/common_proxy.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile user_position time:', time.time() - begin)
@@ -111,7 +112,7 @@ async def init_swap_router(starknet, user_position_address):
 
 async def init_swap_quoter(starknet, user_position_address):
     begin = time.time()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         ['contracts/swap_quoter.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile swap_quoter time:', time.time() - begin)
@@ -130,7 +131,7 @@ async def init_swap_quoter(starknet, user_position_address):
 async def init_swap_pool_class(starknet):
 
     begin = time.time()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         ['contracts/swap_pool.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile swap_pool time:', time.time() - begin)
@@ -142,7 +143,7 @@ async def init_swap_pool_class(starknet):
     print('declare swap_pool time:', time.time() - begin)
 
     begin = time.time()
-    compiled_proxy = compile_starknet_files(
+    compiled_proxy = compile_cached(
         ['contracts/common_proxy.cairo'], debug_info=True, disable_hint_validation=True
     )
     print('compile swap_pool_proxy time:', time.time() - begin)
@@ -154,64 +155,74 @@ async def init_swap_pool_class(starknet):
     print('declare swap_pool time:', time.time() - begin)
     return declared_contract, declared_proxy
 
+@snapshot('user_position_mgr')
+async def build_user_position_mgr(starknet, info):
+    """tokens 0-2 funding address and other_address, the user position manager with the token0/token1 and
+    token1/token2 MEDIUM pools initialized at 1:1, the swap router and quoter, all approved by both addresses"""
+    # token0
+    token0_def, token0 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=starknet)
+    await token0.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+    # token1
+    token1_def, token1 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [2, 2, 18, MAX_UINT128, MAX_UINT128, address], starknet=starknet)
+    await token1.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+    # token2
+    token2_def, token2 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=starknet)
+    await token2.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+
+    print('token0:', token0.contract_address, 'token1:', token1.contract_address, 'token2:', token2.contract_address)
+
+    # swap pool
+    swap_pool_class, swap_pool_proxy_class = await init_swap_pool_class(starknet)
+
+    user_position_def, user_position_class, proxy_def, user_position = await init_user_position_contract(starknet, swap_pool_class.class_hash, swap_pool_proxy_class.class_hash)
+    swap_router_def, swap_router = await init_swap_router(starknet, user_position.contract_address)
+    swap_quoter_def, swap_quoter = await init_swap_quoter(starknet, user_position.contract_address)
+
+    res = await user_position.create_and_initialize_pool(token0.contract_address, token1.contract_address, FeeAmount.MEDIUM, encode_price_sqrt(1, 1)).execute()
+    swap_pool_address = res.call_info.result[0]
+
+    res = await user_position.create_and_initialize_pool(token1.contract_address, token2.contract_address, FeeAmount.MEDIUM, encode_price_sqrt(1, 1)).execute()
+    swap_pool_address2 = res.call_info.result[0]
+
+    for token in [token0, token1, token2]:
+        for spender in [user_position, swap_router]:
+            for owner in [address, other_address]:
+                await token.approve(spender.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=owner)
+
+    info.update(
+        token0_def=token0_def, token0=token0, token1_def=token1_def, token1=token1, token2_def=token2_def, token2=token2,
+        swap_pool_class=swap_pool_class, swap_pool_proxy_class=swap_pool_proxy_class,
+        user_position_def=user_position_def, user_position_class=user_position_class, proxy_def=proxy_def, user_position=user_position,
+        swap_router_def=swap_router_def, swap_router=swap_router, swap_quoter_def=swap_quoter_def, swap_quoter=swap_quoter,
+        swap_pool_address=swap_pool_address, swap_pool_address2=swap_pool_address2,
+    )
+
+
 class UserPositionMgrTest(TestCase):
 
     @classmethod
     async def setUp(cls):
         pass
 
-    async def check_starknet(self):
-        if not hasattr(self, 'starknet'):
-            self.starknet = await Starknet.empty()
-            # token0
-            self.token0_def, self.token0 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=self.starknet)
-            await self.token0.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
-            # token1
-            self.token1_def, self.token1 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [2, 2, 18, MAX_UINT128, MAX_UINT128, address], starknet=self.starknet)
-            await self.token1.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
-            # token2
-            self.token2_def, self.token2 = await init_contract(os.path.join("tests", "mocks/ERC20_mock.cairo"), [1, 1, 18, MAX_UINT128, MAX_UINT128, address], starknet=self.starknet)
-            await self.token2.transfer(other_address, (MAX_UINT128, 2 ** 127)).execute(caller_address=address)
+    def bind_snapshot(self, starknet, info):
+        """binds the test to a fork of the user_position_mgr snapshot"""
+        self.starknet = starknet
+        state = starknet.state
+        for key, value in info.items():
+            if isinstance(value, StarknetContract):
+                # the contracts keep their abi, e.g. swap_router has the proxy one
+                value = cached_contract(state, value, value)
+            setattr(self, key, value)
 
-            print('token0:', self.token0.contract_address, 'token1:', self.token1.contract_address, 'token2:', self.token2.contract_address)
-
-            self.mint_token0, self.mint_token1 =  [self.token0, self.token1] if self.token0.contract_address < self.token1.contract_address else [self.token1, self.token0]
+        self.mint_token0, self.mint_token1 =  [self.token0, self.token1] if self.token0.contract_address < self.token1.contract_address else [self.token1, self.token0]
 
+    async def check_starknet(self):
+        if not hasattr(self, 'starknet'):
+            self.bind_snapshot(*await fork('user_position_mgr'))
 
     async def get_user_position_contract(self):
         await self.check_starknet()
 
-        if not hasattr(self, 'user_position'):
-            # swap pool
-            self.swap_pool_class, self.swap_pool_proxy_class = await init_swap_pool_class(self.starknet)
-
-            self.user_position_def, self.user_position_class, self.proxy_def, self.user_position = await init_user_position_contract(self.starknet, self.swap_pool_class.class_hash, self.swap_pool_proxy_class.class_hash)
-            self.swap_router_def, self.swap_router = await init_swap_router(self.starknet, self.user_position.contract_address)
-            self.swap_quoter_def, self.swap_quoter = await init_swap_quoter(self.starknet, self.user_position.contract_address)
-
-            res = await self.user_position.create_and_initialize_pool(self.token0.contract_address, self.token1.contract_address, FeeAmount.MEDIUM, encode_price_sqrt(1, 1)).execute()
-            self.swap_pool_address = res.call_info.result[0]
-
-            res = await self.user_position.create_and_initialize_pool(self.token1.contract_address, self.token2.contract_address, FeeAmount.MEDIUM, encode_price_sqrt(1, 1)).execute()
-
-            self.swap_pool_address2 = res.call_info.result[0]
-
-            await self.token0.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-            await self.token1.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-            await self.token2.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-
-            await self.token0.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-            await self.token1.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-            await self.token2.approve(self.user_position.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-
-            await self.token0.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-            await self.token1.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-            await self.token2.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=address)
-
-            await self.token0.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-            await self.token1.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-            await self.token2.approve(self.swap_router.contract_address, to_uint(2 ** 256 - 1)).execute(caller_address=other_address)
-
         state = self.user_position.state.copy()
         user_position = cached_contract(state, self.user_position_def, self.user_position)
 
@@ -738,6 +749,106 @@ class UserPositionMgrTest(TestCase):
         self.assertEqual(trader_after[1], trader_before[1] - 5)
         self.assertEqual(trader_after[0], trader_before[0] + 1)
 
+    @pytest.mark.asyncio
+    async def test_quote_batch(self):
+        user_position = await self.get_user_position_contract()
+
+        fee = FeeAmount.MEDIUM
+
+        res = await self.mint(user_position, other_address, self.token0.contract_address, self.token1.contract_address, fee, min_tick, max_tick, to_uint(1000000), to_uint(1000000), to_uint(0), to_uint(0))
+        res = await self.mint(user_position, other_address, self.token1.contract_address, self.token2.contract_address, fee, min_tick, max_tick, to_uint(1000000), to_uint(1000000), to_uint(0), to_uint(0))
+
+        swap_quoter = cached_contract(user_position.state, self.swap_quoter_def, self.swap_quoter)
+
+        paths = [
+            [self.token0.contract_address, fee, self.token1.contract_address],
+            [self.token0.contract_address, fee, self.token1.contract_address, fee, self.token2.contract_address],
+            [self.token2.contract_address, fee, self.token1.contract_address],
+        ]
+        amounts = [[3, 100, 10000], [5, 1000], [7]]
+
+        path_lens = [len(path) for path in paths]
+        flat_paths = [x for path in paths for x in path]
+        amount_counts = [len(path_amounts) for path_amounts in amounts]
+        flat_amounts = [to_uint(amount) for path_amounts in amounts for amount in path_amounts]
+
+        # exact input
+        expected = []
+        for path, path_amounts in zip(paths, amounts):
+            for amount in path_amounts:
+                res = await swap_quoter.get_exact_input_router(path, to_uint(amount)).call()
+                expected.append(from_uint(res.call_info.result[0: 2]))
+
+        res = await swap_quoter.get_exact_input_batch(path_lens, flat_paths, amount_counts, flat_amounts).call()
+        self.assertEqual([from_uint(amount) for amount in res.result.amounts_out], expected)
+
+        # exact output, paths start with the token out
+        expected = []
+        for path, path_amounts in zip(paths, amounts):
+            for amount in path_amounts:
+                res = await swap_quoter.get_exact_output_router(path, to_uint(amount)).call()
+                expected.append(from_uint(res.call_info.result[0: 2]))
+
+        res = await swap_quoter.get_exact_output_batch(path_lens, flat_paths, amount_counts, flat_amounts).call()
+        self.assertEqual([from_uint(amount) for amount in res.result.amounts_in], expected)
+
+        await assert_revert(
+            swap_quoter.get_exact_input_batch(path_lens, flat_paths, amount_counts[:2], flat_amounts).call(),
+            'batch lengths mismatch'
+        )
+        await assert_revert(
+            swap_quoter.get_exact_input_batch(path_lens, flat_paths, amount_counts, flat_amounts[:-1]).call(),
+            'batch lengths mismatch'
+        )
+        await assert_revert(
+            swap_quoter.get_exact_input_batch([2], flat_paths[:2], [1], flat_amounts[:1]).call(),
+            'path_len illeagl'
+        )
+
+    @pytest.mark.asyncio
+    async def test_pool_address_cache(self):
+        user_position = await self.get_user_position_contract()
+
+        fee = FeeAmount.MEDIUM
+
+        res = await self.mint(user_position, other_address, self.token0.contract_address, self.token1.contract_address, fee, min_tick, max_tick, to_uint(1000000), to_uint(1000000), to_uint(0), to_uint(0))
+
+        state = user_position.state
+        swap_router = cached_contract(state, self.swap_router_def, self.swap_router)
+        swap_quoter = cached_contract(state, self.swap_quoter_def, self.swap_quoter)
+
+        async def cached_pool_address(contract):
+            token_a, token_b = sorted([self.token0.contract_address, self.token1.contract_address])
+            (pool_address,) = await read_storage_var(contract, 'PoolAddressCache_data', token_a, token_b, fee)
+            return pool_address
+
+        def calls_user_position(call_info):
+            return any(
+                call.contract_address == user_position.contract_address or calls_user_position(call)
+                for call in call_info.internal_calls
+            )
+
+        # resolved through user_position_mgr and cached on the first swap
+        self.assertEqual(await cached_pool_address(swap_router), 0)
+        path = [self.token0.contract_address, fee, self.token1.contract_address]
+        res = await self.exact_input_router(swap_router, path)
+        self.assertTrue(calls_user_position(res.call_info))
+        self.assertEqual(await cached_pool_address(swap_router), self.swap_pool_address)
+
+        res = await self.exact_input_router(swap_router, path[::-1])
+        self.assertFalse(calls_user_position(res.call_info))
+
+        # views don't populate the cache
+        res = await swap_quoter.get_exact_input_router(path, to_uint(3)).execute(caller_address=address)
+        self.assertEqual(await cached_pool_address(swap_quoter), 0)
+
+        res = await swap_quoter.update_pool_address(self.token1.contract_address, self.token0.contract_address, fee).execute()
+        self.assertEqual(res.result.pool_address, self.swap_pool_address)
+        self.assertEqual(await cached_pool_address(swap_quoter), self.swap_pool_address)
+
+        res = await swap_quoter.update_pool_address(self.token0.contract_address, self.token2.contract_address, fee).execute()
+        self.assertEqual(res.result.pool_address, 0)
+
     @pytest.mark.asyncio
     async def test_exact_output(self):
         user_position = await self.get_user_position_contract()
@@ -976,6 +1087,32 @@ class UserPositionMgrTest(TestCase):
         )
         await user_position.update_swap_pool(self.swap_pool_class.class_hash, self.swap_pool_proxy_class.class_hash).execute(caller_address=address)
 
+    @pytest.mark.asyncio
+    async def test_compute_pool_address(self):
+        user_position = await self.get_user_position_contract()
+        swap_pool_hash, swap_pool_proxy_hash = self.swap_pool_class.class_hash, self.swap_pool_proxy_class.class_hash
+
+        for token0, token1, pool_address in [(self.token0, self.token1, self.swap_pool_address), (self.token2, self.token1, self.swap_pool_address2)]:
+            res = await user_position.compute_pool_address(token0.contract_address, token1.contract_address, FeeAmount.MEDIUM).call()
+            self.assertEqual(res.call_info.result[0], pool_address)
+            res = await user_position.compute_pool_address(token1.contract_address, token0.contract_address, FeeAmount.MEDIUM).call()
+            self.assertEqual(res.call_info.result[0], pool_address)
+
+            address_computed = compute_pool_address(user_position.contract_address, swap_pool_proxy_hash, swap_pool_hash, token0.contract_address, token1.contract_address, FeeAmount.MEDIUM)
+            self.assertEqual(address_computed, pool_address)
+
+        # the address is known before the pool is created
+        address_computed = compute_pool_address(user_position.contract_address, swap_pool_proxy_hash, swap_pool_hash, self.token0.contract_address, self.token1.contract_address, FeeAmount.LOW)
+        res = await user_position.get_pool_address(self.token0.contract_address, self.token1.contract_address, FeeAmount.LOW).call()
+        self.assertEqual(res.call_info.result[0], 0)
+        res = await user_position.create_and_initialize_pool(self.token0.contract_address, self.token1.contract_address, FeeAmount.LOW, encode_price_sqrt(1, 1)).execute()
+        self.assertEqual(res.call_info.result[0], address_computed)
+
+        await assert_revert(
+            user_position.compute_pool_address(self.token0.contract_address, self.token1.contract_address, 100).call(),
+            "invalid fee level"
+        )
+
     @pytest.mark.asyncio
     async def test_get_compute(self):
         from starkware.cairo.lang.vm.crypto import pedersen_hash
@@ -5,8 +5,8 @@ import sys
 from pathlib import Path
 import math
 import time
-from starkware.starknet.public.abi import get_selector_from_name
-from starkware.starknet.compiler.compile import compile_starknet_files
+from starkware.starknet.public.abi import get_selector_from_name, get_storage_var_address
+from compile_cache import compile_cached
 from starkware.starkware_utils.error_handling import StarkException
 from starkware.starknet.testing.starknet import StarknetContract
 from starkware.starknet.business_logic.execution.objects import Event
@@ -35,11 +35,13 @@ class FeeAmount:
   LOW = 500
   MEDIUM = 3000
   HIGH = 10000
+  HIGHEST = 50000
 
 TICK_SPACINGS = {
   FeeAmount.LOW: 10,
   FeeAmount.MEDIUM: 60,
   FeeAmount.HIGH: 200,
+  FeeAmount.HIGHEST: 1000,
 }
 
 _root = Path(__file__).parent.parent
@@ -134,7 +136,7 @@ def assert_event_emitted(tx_exec_info, from_address, name, data):
 def get_contract_def(path):
     """Returns the contract definition from the contract path"""
     path = contract_path(path)
-    contract_def = compile_starknet_files(
+    contract_def = compile_cached(
         files=[path],
         debug_info=True
     )
@@ -238,7 +240,7 @@ async def init_contract(contract_file, constructor_calldata=None, starknet=None)
     if not starknet:
         starknet = await Starknet.empty()
     begin = time.time()
-    compiled_contract = compile_starknet_files(
+    compiled_contract = compile_cached(
         [contract_file], debug_info=True, disable_hint_validation=True
     )
     print('compile contract time:', time.time() - begin)
@@ -272,7 +274,7 @@ class Account:
     """
     #sys.path.append(os.path.join(Path(__file__).parent, 'library'))
     path = 'tests/mocks/Account.cairo'
-    get_class = compile_starknet_files(
+    get_class = compile_cached(
         files=[path],
         debug_info=True
     )
@@ -290,3 +292,84 @@ def compute_contract_address(salt, class_hash, deployer_address, constructor_cal
     address = calculate_contract_address_from_hash(salt=salt, class_hash=class_hash, deployer_address=deployer_address, constructor_calldata=constructor_calldata)
     print('address:', address)
     return address
+
+
+def compute_pool_address(user_position_mgr, swap_pool_proxy_hash, init_swap_pool_hash, token0, token1, fee):
+    """Returns the address of the pool of token0/token1/fee created by `user_position_mgr`, the python side of `PoolAddress.compute`
+
+    `swap_pool_proxy_hash` is the proxy class hash of the user position manager when the pool was created,
+    `init_swap_pool_hash` the swap pool class hash it was initialized with.
+    """
+    from starkware.cairo.lang.vm.crypto import pedersen_hash
+    from starkware.starknet.core.os.contract_address.contract_address import calculate_contract_address_from_hash
+    token0, token1 = min(token0, token1), max(token0, token1)
+    constructor_calldata = [init_swap_pool_hash, get_selector_from_name('initializer'), 5, TICK_SPACINGS[fee], fee, token0, token1, user_position_mgr]
+    return calculate_contract_address_from_hash(
+        salt=pedersen_hash(token0, token1),
+        class_hash=swap_pool_proxy_hash,
+        deployer_address=user_position_mgr,
+        constructor_calldata=constructor_calldata
+    )
+
+
+async def read_storage_var(contract, name, *keys, size=1):
+    """Reads `size` felts of a storage var straight from the contract state, without running the VM"""
+    storage_address = get_storage_var_address(name, *[int_to_felt(key) for key in keys])
+    state = contract.state.state
+    return [await state.get_storage_at(contract.contract_address, storage_address + i) for i in range(size)]
+
+async def load_swap_pool_simulator(swap_pool):
+    """Loads slot0, liquidity, fee growth, the tick bitmap and the initialized ticks of a deployed swap pool"""
+    from reference.swap_pool import SwapPoolSimulator
+    from reference.tick_bitmap import TickBitmap, position
+    from reference.tick_mgr import TickInfo, TickMgr
+    from reference.tickmath import MIN_TICK, MAX_TICK
+
+    sqrt_price_low, sqrt_price_high, tick = await read_storage_var(swap_pool, '_slot0', size=3)
+    (liquidity,) = await read_storage_var(swap_pool, '_liquidity')
+    (tick_spacing,) = await read_storage_var(swap_pool, '_tick_spacing')
+    (fee,) = await read_storage_var(swap_pool, '_fee')
+    (fee_protocol0,) = await read_storage_var(swap_pool, '_fee_protocol0')
+    (fee_protocol1,) = await read_storage_var(swap_pool, '_fee_protocol1')
+    fee_growth_global0 = await read_storage_var(swap_pool, '_fee_growth_global0_x128', size=2)
+    fee_growth_global1 = await read_storage_var(swap_pool, '_fee_growth_global1_x128', size=2)
+    (protocol_fee_token0,) = await read_storage_var(swap_pool, '_protocol_fee_token0')
+    (protocol_fee_token1,) = await read_storage_var(swap_pool, '_protocol_fee_token1')
+
+    words = {}
+    ticks = TickMgr()
+    word_min, _ = position(MIN_TICK // tick_spacing)
+    word_max, _ = position(MAX_TICK // tick_spacing)
+    for word_pos in range(word_min, word_max + 1):
+        word = from_uint(await read_storage_var(swap_pool, 'TickBitmap_data', word_pos, size=2))
+        if word == 0:
+            continue
+        words[word_pos] = word
+        for bit_pos in range(256):
+            if (word >> bit_pos) & 1:
+                t = (word_pos * 256 + bit_pos) * tick_spacing
+                info = await read_storage_var(swap_pool, 'TickMgr_data', t, size=7)
+                ticks.set_tick(t, TickInfo(
+                    liquidity_gross=info[0],
+                    liquidity_net=felt_to_int(info[1]),
+                    fee_growth_outside0_x128=from_uint(info[2:4]),
+                    fee_growth_outside1_x128=from_uint(info[4:6]),
+                    initialized=info[6] == TRUE,
+                ))
+
+    simulator = SwapPoolSimulator(
+        from_uint((sqrt_price_low, sqrt_price_high)),
+        felt_to_int(tick),
+        liquidity,
+        tick_spacing,
+        fee,
+        fee_protocol0=fee_protocol0,
+        fee_protocol1=fee_protocol1,
+        fee_growth_global0_x128=from_uint(fee_growth_global0),
+        fee_growth_global1_x128=from_uint(fee_growth_global1),
+        protocol_fee_token0=protocol_fee_token0,
+        protocol_fee_token1=protocol_fee_token1,
+        bitmap=TickBitmap(words),
+        ticks=ticks,
+    )
+    return simulator